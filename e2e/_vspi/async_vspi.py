@@ -0,0 +1,176 @@
+# autopep8: off
+import os
+import sys
+import time
+import asyncio
+import argparse
+sys.path.append(os.getcwd())
+from e2e._vspi.vspi import VSPI
+from e2e._vspi.ltd_driver import LtdDriver
+from e2e._vspi.stream_scheduler import (
+    MsgSource,
+    StreamScheduler,
+)
+from e2e.traffic_log import DIRECTION_TX
+from e2e.transport import (
+    Transport,
+    UnixTransport,
+)
+# autopep8: on
+
+
+class AsyncVSPI(VSPI):
+    ''' VSPI on asyncio streams, many devices can share one event loop '''
+    stream_reader: asyncio.StreamReader
+    stream_writer: asyncio.StreamWriter
+    stream_period: float = 0.2
+
+    def __init__(
+        self,
+        device_model: str,
+        device_driver: LtdDriver,
+        control_feedback_map: dict = {},
+        vspi_socket_host: str = '127.0.0.1',
+        vspi_socket_port: int = 6543,
+        transport: Transport = None,
+    ):
+        super().__init__(device_model, device_driver, control_feedback_map, vspi_socket_host, vspi_socket_port, transport=transport)
+        self.stream_reader = None
+        self.stream_writer = None
+
+    @classmethod
+    def from_vspi(cls, vspi: VSPI) -> 'AsyncVSPI':
+        async_vspi = cls(vspi.device_model, vspi.device_driver.copy(), vspi.control_feedback_map, *vspi.vspi_socket_addr, transport=vspi.transport)
+        async_vspi.device_cfg2 = vspi.device_cfg2
+        async_vspi.debug = vspi.debug
+        return async_vspi
+
+    async def connect(self):
+        print(self.log_tag, 'VSPI Connecting...')
+        try:
+            # only the address of the transport is used, asyncio owns the socket (TCP_NODELAY is its default)
+            if isinstance(self.transport, UnixTransport):
+                self.stream_reader, self.stream_writer = await asyncio.open_unix_connection(self.transport.path)
+            else:
+                self.stream_reader, self.stream_writer = await asyncio.open_connection(*self.vspi_socket_addr)
+            print(self.log_tag, 'VSPI Connecting...OK')
+
+        except Exception as e:
+            print(self.log_tag, 'VSPI Connecting...ERR')
+            if self.debug:
+                print(e)
+
+    async def disconnect(self):
+        print(self.log_tag, 'VSPI Disconnecting...')
+        self.control_loop_running = False
+        try:
+            if self.stream_writer:
+                self.stream_writer.close()
+                await self.stream_writer.wait_closed()
+            print(self.log_tag, 'VSPI Disconnecting...OK')
+
+        except Exception as e:
+            print(self.log_tag, 'VSPI Disconnecting...ERR')
+            if self.debug:
+                print(e)
+
+    def write_packet(self, packet: bytes, msg_type: int = None):
+        # buffered by the transport, flushed by drain(), copied since packet may be a view of tx_buffer
+        if self.debug:
+            print(' '.join([f"{hex(x).replace('0x', '').upper():0>2}" for x in packet]))
+        if self.traffic_recorder:
+            self._record_packet(DIRECTION_TX, packet, msg_type)
+        self.stream_writer.write(bytes(packet))
+
+    async def drain(self):
+        await self.stream_writer.drain()
+
+    async def feedback_control_loop(self):
+        if self.control_loop_running:
+            print(f"LtdDriver-{self.device_model} Control Loop Already Running")
+            return
+
+        self.control_loop_running = True
+        print(f"Listening for LtdDriver-{self.device_model} packet...")
+        while self.control_loop_running:
+            chunk = await self.stream_reader.read(VSPI.RX_BUFFER_SIZE)
+            if not chunk:
+                print(self.log_tag, 'VSPI Connection Closed')
+                self.control_loop_running = False
+                break
+            rx_ns = time.monotonic_ns()
+            for packet in self.ltd_framer.feed(chunk):
+                self._handle_device_packet(packet, rx_ns)
+            await self.drain()
+
+    async def _write_stream_items(self, items: list[tuple[int, int, int | float]]):
+        self.write_items(items)
+        await self.drain()
+
+    async def _run_stream(self, msg_source: MsgSource):
+        # msg_source ticks every stream_period, the StreamScheduler keeps the deadlines on this event loop
+        stream_scheduler = StreamScheduler()
+        stream_scheduler.add_stream(self.device_model, 1 / self.stream_period, msg_source, self._write_stream_items)
+        await stream_scheduler.run_on_event_loop()
+
+    async def stream_const_sequence(self):
+        await self._run_stream(self._const_msgs)
+
+    async def stream_rand_sequence(self):
+        await self._run_stream(self._rand_msgs)
+
+    async def run(self, stream_mode: str = 'rand'):
+        ''' connects then runs the feedback control loop and the stream task until the connection closes '''
+        await self.connect()
+        if not self.stream_writer:
+            return
+
+        stream_task = None
+        control_loop_task = asyncio.create_task(self.feedback_control_loop())
+        await asyncio.sleep(0)
+        if stream_mode == 'const':
+            stream_task = asyncio.create_task(self.stream_const_sequence())
+        elif stream_mode == 'rand':
+            stream_task = asyncio.create_task(self.stream_rand_sequence())
+
+        try:
+            await control_loop_task
+        finally:
+            if stream_task:
+                stream_task.cancel()
+            await self.disconnect()
+
+
+async def run_async_vspis(async_vspis: list[AsyncVSPI], stream_mode: str = 'rand'):
+    await asyncio.gather(*[async_vspi.run(stream_mode) for async_vspi in async_vspis])
+
+
+if __name__ == '__main__':
+    from e2e._vspi import test_vspis
+
+    parser = argparse.ArgumentParser(prog='async_vspi', description='Run LtdDriver VSPIs on One Event Loop', epilog='example: python -m e2e._vspi.async_vspi -d LT-HT103 LT-HT107 -s const')
+    parser.add_argument('--devices', '-d', help='Device Models, All Test VSPIs by Default', nargs='*', required=False)
+    parser.add_argument('--stream', '-s', help='Stream Mode', choices=['rand', 'const', 'none'], default='rand')
+    parser.add_argument('--period', '-p', help='Stream Period in Seconds', type=float, default=AsyncVSPI.stream_period)
+    parser.add_argument('--host', help='VSPI Socket Host', required=False)
+    parser.add_argument('--port', help='VSPI Socket Port', type=int, required=False)
+    parser.add_argument('--quiet', '-q', help='Disable Debug Logs', action='store_true')
+    args = parser.parse_args()
+
+    vspis = [x for x in vars(test_vspis).values() if isinstance(x, VSPI)]
+    if args.devices:
+        vspis = [x for x in vspis if x.device_model in args.devices]
+
+    async_vspis = []
+    for vspi in vspis:
+        async_vspi = AsyncVSPI.from_vspi(vspi)
+        async_vspi.stream_period = args.period
+        async_vspi.debug = not args.quiet
+        if args.host or args.port:
+            async_vspi.vspi_socket_addr = (args.host or async_vspi.vspi_socket_addr[0], args.port or async_vspi.vspi_socket_addr[1])
+        async_vspis.append(async_vspi)
+
+    try:
+        asyncio.run(run_async_vspis(async_vspis, args.stream))
+    except KeyboardInterrupt:
+        pass
@@ -1,6 +1,11 @@
-import math
 import sys
 import struct
+from array import array
+from e2e.crc16 import (
+    compute_crc16,
+    crc16_many,
+)
+from e2e.result import Result
 
 
 DATA_TYPE_INT = 0
@@ -8,31 +13,105 @@ DATA_TYPE_UINT = 1
 DATA_TYPE_FLOAT = 2
 DATA_TYPE_COMMAND = 3
 
-
-class Result:
-    def __init__(self, ok=None, err=None):
-        self.ok = ok
-        self.err = err
+# payload encodings, f16 half floats are plain DATA_TYPE_FLOAT with size_bytes=2
+ENCODING_RAW = 0
+ENCODING_SCALED = 1  # wire value = round(value / scale)
+ENCODING_DELTA = 2  # keyframes use the config type, deltas are i16 frames of round(delta / scale)
+
+PARSERS_MAP = {
+    1: {
+        DATA_TYPE_INT: 'b',
+        DATA_TYPE_UINT: 'B',
+        DATA_TYPE_COMMAND: 'B',
+    },
+    2: {
+        DATA_TYPE_INT: '<h',
+        DATA_TYPE_UINT: '<H',
+        DATA_TYPE_FLOAT: '<e',
+    },
+    4: {
+        DATA_TYPE_INT: '<l',
+        DATA_TYPE_UINT: '<L',
+        DATA_TYPE_FLOAT: '<f',
+    },
+    8: {
+        DATA_TYPE_INT: '<q',
+        DATA_TYPE_UINT: '<Q',
+        DATA_TYPE_FLOAT: '<d',
+    },
+}
+SIZE_BYTES_BITS = {1: 0, 2: 1, 4: 2, 8: 3}
+PACKET_TAIL_STRUCT = struct.Struct('<HBB')
+LTD_RECORD_FIELDS = [
+    ('seq_number', '<u2'),
+    ('msg_type', 'u1'),
+    ('cfg2', 'u1'),
+    ('value', '<f8'),
+    ('crc_ok', '?'),
+]
+DELTA_DATA_TYPE = DATA_TYPE_INT
+DELTA_SIZE_BYTES = 2
+DELTA_KEYFRAME_INTERVAL = 32
 
 
 class MsgTypeConfig:
-    def __init__(self, msg_type: int = None, msg_name: str = None, data_type: int = None, size_bytes: int = None, cfg2: int = None):
+    __slots__ = ('msg_type', 'msg_name', 'data_type', 'size_bytes', 'cfg2', 'encoding', 'scale')
+
+    def __init__(
+        self,
+        msg_type: int = None,
+        msg_name: str = None,
+        data_type: int = None,
+        size_bytes: int = None,
+        cfg2: int = None,
+        encoding: int = ENCODING_RAW,
+        scale: float = 1.0,
+    ):
         self.msg_type = msg_type
         self.msg_name = msg_name
         self.data_type = data_type
         self.size_bytes = size_bytes
         self.cfg2 = cfg2
+        self.encoding = encoding
+        self.scale = scale
 
     def __str__(self):
         return f"MsgTypeConfig(msg_type={self.msg_type}, msg_name='{self.msg_name}', data_type={self.data_type}, size_bytes={self.size_bytes}), cfg2={self.cfg2}"
 
 
+class FrozenMsgTypeConfig(MsgTypeConfig):
+    ''' read only MsgTypeConfig shared by every DeviceMsg decoded with the same cfg1 and cfg2 bytes '''
+    __slots__ = ()
+
+    def __init__(self, msg_type: int, msg_name: str, data_type: int, size_bytes: int, cfg2: int, encoding: int = ENCODING_RAW, scale: float = 1.0):
+        for attr_name, attr_value in zip(MsgTypeConfig.__slots__, (msg_type, msg_name, data_type, size_bytes, cfg2, encoding, scale)):
+            object.__setattr__(self, attr_name, attr_value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('FrozenMsgTypeConfig is Read Only')
+
+
 class DeviceMsg:
-    def __init__(self, seq_number: int = None, msg_value: int = None, b64_msg_value: str = None, config: MsgTypeConfig = MsgTypeConfig()):
-        self.config = config
+    __slots__ = ('config', 'seq_number', 'msg_value', '_b64_msg_value', '_packet')
+
+    def __init__(self, seq_number: int = None, msg_value: int = None, b64_msg_value: str = None, config: MsgTypeConfig = None, packet: bytes = None):
+        self.config = config if config is not None else MsgTypeConfig()
         self.seq_number = seq_number
         self.msg_value = msg_value
-        self.b64_msg_value = b64_msg_value
+        self._b64_msg_value = b64_msg_value
+        self._packet = packet
+
+    @property
+    def b64_msg_value(self) -> str:
+        # computed on first access from the raw packet
+        if self._b64_msg_value is None and self._packet is not None:
+            data_payload = self._packet[LtdDriver.DATA_START:LtdDriver.DATA_START + self.config.size_bytes]
+            self._b64_msg_value = LtdDriver._cx_b64encode(data_payload).decode('utf-8')
+        return self._b64_msg_value
+
+    @b64_msg_value.setter
+    def b64_msg_value(self, value: str):
+        self._b64_msg_value = value
 
     def __str__(self):
         return f"DeviceMsg(seq_number={self.seq_number}, msg_value={self.msg_value}, b64_msg_value='{self.b64_msg_value}', msg_name={self.config.msg_name}, cfg2={self.config.cfg2})"
@@ -41,6 +120,8 @@ class DeviceMsg:
 class LtdDriver:
     PACKET_MIN_SIZE = 11
     DATA_START = 7
+    FLTSQ_PACKET_MIN_SIZE = 7
+    FLTSQ_DATA_START = 3
 
     protocol_version = (0, 0)
     driver_msg_type_config_map: dict[int, MsgTypeConfig] = {}
@@ -50,12 +131,32 @@ class LtdDriver:
     msg_type_set = set()
     msg_name_set = set()
     data_type_set = {0, 1, 2, 3}
+    msg_name_type_map: dict[str, int] = {}
+    msg_type_name_map: dict[int, str] = {}
 
     def __init__(self, _protocol_version: tuple[int, int], _driver_msg_types: list[MsgTypeConfig]) -> None:
         self.protocol_version = _protocol_version
         self.msg_type_set = set(config.msg_type for config in _driver_msg_types)
         self.msg_name_set = set(config.msg_name for config in _driver_msg_types)
         self.driver_msg_type_config_map = {config.msg_type: config for config in _driver_msg_types}
+        self.msg_name_type_map = {config.msg_name: config.msg_type for config in _driver_msg_types}
+        self.msg_type_name_map = {config.msg_type: config.msg_name for config in _driver_msg_types}
+
+        # per msg_type state of delta encoded values: tx (reference value, frames since keyframe), rx reference value
+        self._delta_tx_state: dict[int, tuple[float, int]] = {}
+        self._delta_rx_state: dict[int, float] = {}
+
+        # precompiled codec tables
+        self._encoders = {config.msg_type: self._compile_encoder(config) for config in _driver_msg_types}
+        self._decoders = [self._compile_decoder(cfg1) for cfg1 in range(256)]
+        self._decoded_configs: dict[int, FrozenMsgTypeConfig] = {}
+
+    def copy(self) -> 'LtdDriver':
+        ''' driver with copies of the msg configs, so cfg2 and delta state are not shared '''
+        return LtdDriver(self.protocol_version, [
+            MsgTypeConfig(x.msg_type, x.msg_name, x.data_type, x.size_bytes, x.cfg2, x.encoding, x.scale)
+            for x in self.driver_msg_type_config_map.values()
+        ])
 
     @staticmethod
     def _cx_b64encode(data: bytes) -> bytes:
@@ -68,187 +169,280 @@ class LtdDriver:
 
     @staticmethod
     def _get_binary_parser(size_bytes: int, data_type: int) -> Result:
-        PARSERS_MAP = {
-            1: {
-                DATA_TYPE_INT: 'b',
-                DATA_TYPE_UINT: 'B',
-                DATA_TYPE_COMMAND: 'B',
-            },
-            2: {
-                DATA_TYPE_INT: '<h',
-                DATA_TYPE_UINT: '<H',
-            },
-            4: {
-                DATA_TYPE_INT: '<l',
-                DATA_TYPE_UINT: '<L',
-                DATA_TYPE_FLOAT: '<f',
-            },
-            8: {
-                DATA_TYPE_INT: '<q',
-                DATA_TYPE_UINT: '<Q',
-                DATA_TYPE_FLOAT: '<d',
-            },
-        }
-
         if size_bytes not in PARSERS_MAP:
             return Result(err=f"Data Size: ${size_bytes} Bytes is not Supported")
         map_lvl_2 = PARSERS_MAP[size_bytes]
         if data_type not in map_lvl_2:
             return Result(err=f"No Binary Parser was Found for: data_type={data_type}, size_bytes={size_bytes}")
-        return Result(ok=PARSERS_MAP[size_bytes][data_type])
+        return Result(ok=map_lvl_2[data_type])
 
-    @staticmethod
-    def _bin_byte(byte: int) -> str:
-        _bin_byte = bin(byte)[2:]
-        padded_bin_byte = _bin_byte.rjust(8, '0')
-        return padded_bin_byte
+    _compute_crc16 = staticmethod(compute_crc16)
 
-    @staticmethod
-    def _compute_crc16(buffer: bytes) -> int:
-        CRC16_POLYNOMIAL = [
-            0x0000, 0x1189, 0x2312, 0x329B, 0x4624, 0x57AD, 0x6536, 0x74BF,
-            0x8C48, 0x9DC1, 0xAF5A, 0xBED3, 0xCA6C, 0xDBE5, 0xE97E, 0xF8F7,
-            0x1081, 0x0108, 0x3393, 0x221A, 0x56A5, 0x472C, 0x75B7, 0x643E,
-            0x9CC9, 0x8D40, 0xBFDB, 0xAE52, 0xDAED, 0xCB64, 0xF9FF, 0xE876,
-            0x2102, 0x308B, 0x0210, 0x1399, 0x6726, 0x76AF, 0x4434, 0x55BD,
-            0xAD4A, 0xBCC3, 0x8E58, 0x9FD1, 0xEB6E, 0xFAE7, 0xC87C, 0xD9F5,
-            0x3183, 0x200A, 0x1291, 0x0318, 0x77A7, 0x662E, 0x54B5, 0x453C,
-            0xBDCB, 0xAC42, 0x9ED9, 0x8F50, 0xFBEF, 0xEA66, 0xD8FD, 0xC974,
-            0x4204, 0x538D, 0x6116, 0x709F, 0x0420, 0x15A9, 0x2732, 0x36BB,
-            0xCE4C, 0xDFC5, 0xED5E, 0xFCD7, 0x8868, 0x99E1, 0xAB7A, 0xBAF3,
-            0x5285, 0x430C, 0x7197, 0x601E, 0x14A1, 0x0528, 0x37B3, 0x263A,
-            0xDECD, 0xCF44, 0xFDDF, 0xEC56, 0x98E9, 0x8960, 0xBBFB, 0xAA72,
-            0x6306, 0x728F, 0x4014, 0x519D, 0x2522, 0x34AB, 0x0630, 0x17B9,
-            0xEF4E, 0xFEC7, 0xCC5C, 0xDDD5, 0xA96A, 0xB8E3, 0x8A78, 0x9BF1,
-            0x7387, 0x620E, 0x5095, 0x411C, 0x35A3, 0x242A, 0x16B1, 0x0738,
-            0xFFCF, 0xEE46, 0xDCDD, 0xCD54, 0xB9EB, 0xA862, 0x9AF9, 0x8B70,
-            0x8408, 0x9581, 0xA71A, 0xB693, 0xC22C, 0xD3A5, 0xE13E, 0xF0B7,
-            0x0840, 0x19C9, 0x2B52, 0x3ADB, 0x4E64, 0x5FED, 0x6D76, 0x7CFF,
-            0x9489, 0x8500, 0xB79B, 0xA612, 0xD2AD, 0xC324, 0xF1BF, 0xE036,
-            0x18C1, 0x0948, 0x3BD3, 0x2A5A, 0x5EE5, 0x4F6C, 0x7DF7, 0x6C7E,
-            0xA50A, 0xB483, 0x8618, 0x9791, 0xE32E, 0xF2A7, 0xC03C, 0xD1B5,
-            0x2942, 0x38CB, 0x0A50, 0x1BD9, 0x6F66, 0x7EEF, 0x4C74, 0x5DFD,
-            0xB58B, 0xA402, 0x9699, 0x8710, 0xF3AF, 0xE226, 0xD0BD, 0xC134,
-            0x39C3, 0x284A, 0x1AD1, 0x0B58, 0x7FE7, 0x6E6E, 0x5CF5, 0x4D7C,
-            0xC60C, 0xD785, 0xE51E, 0xF497, 0x8028, 0x91A1, 0xA33A, 0xB2B3,
-            0x4A44, 0x5BCD, 0x6956, 0x78DF, 0x0C60, 0x1DE9, 0x2F72, 0x3EFB,
-            0xD68D, 0xC704, 0xF59F, 0xE416, 0x90A9, 0x8120, 0xB3BB, 0xA232,
-            0x5AC5, 0x4B4C, 0x79D7, 0x685E, 0x1CE1, 0x0D68, 0x3FF3, 0x2E7A,
-            0xE70E, 0xF687, 0xC41C, 0xD595, 0xA12A, 0xB0A3, 0x8238, 0x93B1,
-            0x6B46, 0x7ACF, 0x4854, 0x59DD, 0x2D62, 0x3CEB, 0x0E70, 0x1FF9,
-            0xF78F, 0xE606, 0xD49D, 0xC514, 0xB1AB, 0xA022, 0x92B9, 0x8330,
-            0x7BC7, 0x6A4E, 0x58D5, 0x495C, 0x3DE3, 0x2C6A, 0x1EF1, 0x0F78,
-        ]
-
-        res = 0xffff
-        for b in buffer:
-            res = (res >> 8) ^ CRC16_POLYNOMIAL[(res ^ b) & 0xff]
-        return (~res) & 0xffff
+    def _gen_cfg1(self, data_type: int, size_bytes: int, msg_type: int) -> Result:
+        if size_bytes not in SIZE_BYTES_BITS:
+            return Result(err='Invalid Data Length Bits')
+        if msg_type not in self.msg_type_set:
+            return Result(err='Invalid Msg Type Bits')
+        return Result(ok=(data_type << 6) | (SIZE_BYTES_BITS[size_bytes] << 4) | msg_type)
 
-    @staticmethod
-    def _bin_parse(buffer: bytes, data_type: int) -> Result:
-        if data_type == DATA_TYPE_FLOAT and len(buffer) in [1, 2]:
-            return {"err": f"Can not Parse Buffer of Size [{len(buffer)}] to FLOAT"}
+    def _compile_encoder(self, config: MsgTypeConfig) -> tuple[struct.Struct, int, MsgTypeConfig] | Result:
+        # layout: version[2], packet_size, seq_number, cfg1, cfg2, data_payload
+        result = self._gen_cfg1(config.data_type, config.size_bytes, config.msg_type)
+        if result.err:
+            return result
+        cfg1 = result.ok
 
-        bin_parser_res = LtdDriver._get_binary_parser(len(buffer), data_type)
+        bin_parser_res = LtdDriver._get_binary_parser(config.size_bytes, config.data_type)
         if bin_parser_res.err:
             return bin_parser_res
-
-        format_specifier = bin_parser_res.ok
-        parsed_value = struct.unpack(format_specifier, buffer)[0]
-        return Result(ok=parsed_value)
+        seg_1_struct = struct.Struct('<BBBHBB' + bin_parser_res.ok.lstrip('<'))
+
+        value_encoder = None
+        if config.encoding == ENCODING_SCALED:
+            if config.data_type not in (DATA_TYPE_INT, DATA_TYPE_UINT):
+                return Result(err='Scaled Encoding Requires Integer Data Type')
+            value_encoder = LtdDriver._compile_scaled_encoder(seg_1_struct, cfg1, config)
+        elif config.encoding == ENCODING_DELTA:
+            if config.data_type != DATA_TYPE_FLOAT:
+                return Result(err='Delta Encoding Requires Float Data Type')
+            delta_struct = struct.Struct('<BBBHBB' + PARSERS_MAP[DELTA_SIZE_BYTES][DELTA_DATA_TYPE].lstrip('<'))
+            delta_cfg1 = (DELTA_DATA_TYPE << 6) | (SIZE_BYTES_BITS[DELTA_SIZE_BYTES] << 4) | config.msg_type
+            value_encoder = LtdDriver._compile_delta_encoder(seg_1_struct, cfg1, delta_struct, delta_cfg1, config)
+        return (seg_1_struct, cfg1, config, value_encoder)
 
     @staticmethod
-    def _u16_to_2u8(num: int) -> Result:
-        if num < 0 or num > 65535:
-            return Result(err='Number Is not Valid u16')
-
-        lsb = num & 0xFF
-        msb = (num >> 8) & 0xFF
-        byte_array = bytes([lsb, msb])
-        return Result(ok=byte_array)
-
-    def _gen_cfg1(self, data_type: int, size_bytes: int, msg_type: int) -> Result:
-        # data type bits
-        data_type_bits = '0' * (2 - len(bin(data_type)[2:])) + bin(data_type)[2:]
-
-        # data length bits
-        binary_parser_res = LtdDriver._get_binary_parser(size_bytes, DATA_TYPE_INT)
-        if binary_parser_res.err:
-            return Result(err='Invalid Data Length Bits')
-        data_length_bits = bin(int(math.log2(size_bytes)))[2:]
-        data_length_bits = '0' * (2 - len(data_length_bits)) + data_length_bits
+    def _compile_scaled_encoder(seg_1_struct: struct.Struct, cfg1: int, config: MsgTypeConfig):
+        value_bits = config.size_bytes * 8
+        if config.data_type == DATA_TYPE_INT:
+            value_min, value_max = -(1 << (value_bits - 1)), (1 << (value_bits - 1)) - 1
+        else:
+            value_min, value_max = 0, (1 << value_bits) - 1
+
+        def encode_scaled(msg_value: float, _tx_state) -> Result:
+            wire_value = round(msg_value / config.scale)
+            if wire_value < value_min or wire_value > value_max:
+                return Result(err='Value Out of Range')
+            return Result(ok=(seg_1_struct, cfg1, wire_value, None))
+        return encode_scaled
 
-        # msg type bits
-        if msg_type not in self.msg_type_set:
-            return Result(err='Invalid Msg Type Bits')
-        msg_type_bits = '0' * (4 - len(bin(msg_type)[2:])) + bin(msg_type)[2:]
-
-        # concatenate bits
-        cfg1_bits = data_type_bits + data_length_bits + msg_type_bits
-        return Result(ok=int(cfg1_bits, 2))
+    @staticmethod
+    def _compile_delta_encoder(seg_1_struct: struct.Struct, cfg1: int, delta_struct: struct.Struct, delta_cfg1: int, config: MsgTypeConfig):
+        value_struct = struct.Struct(PARSERS_MAP[config.size_bytes][DATA_TYPE_FLOAT])
+
+        def encode_delta(msg_value: float, tx_state: tuple[float, int] | None) -> Result:
+            if tx_state is not None and tx_state[1] < DELTA_KEYFRAME_INTERVAL:
+                wire_value = round((msg_value - tx_state[0]) / config.scale)
+                if -0x8000 <= wire_value <= 0x7FFF:
+                    return Result(ok=(delta_struct, delta_cfg1, wire_value, (tx_state[0] + wire_value * config.scale, tx_state[1] + 1)))
+
+            # keyframe, the reference is the value as the receiver decodes it
+            reference_value = value_struct.unpack(value_struct.pack(msg_value))[0]
+            return Result(ok=(seg_1_struct, cfg1, msg_value, (reference_value, 0)))
+        return encode_delta
+
+    def _compile_decoder(self, cfg1: int) -> tuple[int, int, int, struct.Struct | None, MsgTypeConfig | None]:
+        data_type = cfg1 >> 6
+        size_bytes = 1 << ((cfg1 >> 4) & 0x03)
+        msg_type = cfg1 & 0x0F
+        config = self.driver_msg_type_config_map.get(msg_type, None)
+
+        # layout: seq_number @ 3, cfg2 @ 6, data_payload @ 7, crc16
+        packet_struct = None
+        format_specifier = PARSERS_MAP[size_bytes].get(data_type, None)
+        if format_specifier:
+            packet_struct = struct.Struct('<3xHxB' + format_specifier.lstrip('<') + 'H')
+
+        value_decoder = None
+        if config is not None and config.encoding == ENCODING_SCALED:
+            value_decoder = self._compile_scaled_decoder(config)
+        elif config is not None and config.encoding == ENCODING_DELTA:
+            if data_type == DELTA_DATA_TYPE and size_bytes == DELTA_SIZE_BYTES:
+                value_decoder = self._compile_delta_decoder(config)
+            else:
+                value_decoder = self._compile_keyframe_decoder(config)
+        return (data_type, size_bytes, msg_type, packet_struct, config, value_decoder)
+
+    def _compile_scaled_decoder(self, config: MsgTypeConfig):
+        scale = config.scale
+
+        def decode_scaled(wire_value: int) -> float:
+            return wire_value * scale
+        return decode_scaled
+
+    def _compile_delta_decoder(self, config: MsgTypeConfig):
+        rx_state = self._delta_rx_state
+        msg_type = config.msg_type
+        scale = config.scale
+
+        def decode_delta(wire_value: int) -> float | None:
+            reference_value = rx_state.get(msg_type, None)
+            if reference_value is None:
+                return None
+            reference_value += wire_value * scale
+            rx_state[msg_type] = reference_value
+            return reference_value
+        return decode_delta
+
+    def _compile_keyframe_decoder(self, config: MsgTypeConfig):
+        rx_state = self._delta_rx_state
+        msg_type = config.msg_type
+
+        def decode_keyframe(wire_value: float) -> float:
+            rx_state[msg_type] = wire_value
+            return wire_value
+        return decode_keyframe
 
     def get_msg_type_by_name(self, msg_name: str) -> int:
-        ''' do not use this function extensively, complexity = O(N) '''
-        if msg_name not in self.msg_name_set:
-            return -1
-        target_config = [x for x in self.driver_msg_type_config_map.values() if x.msg_name == msg_name]
-        if not target_config:
-            return -1
-        return target_config[0].msg_type
+        return self.msg_name_type_map.get(msg_name, -1)
+
+    def get_msg_name_by_type(self, msg_type: int) -> str | None:
+        return self.msg_type_name_map.get(msg_type, None)
 
     def fltsq_encode(self, msg_sequence: list[float]) -> Result:
-        float_binary_parser = LtdDriver._get_binary_parser(4, DATA_TYPE_FLOAT).ok
-        packet_size = 7 + len(msg_sequence) * 4
-        packet = bytes([self.protocol_version[0], self.protocol_version[1], packet_size])
-        for fltsq_msg_value in msg_sequence:
-            packet += struct.pack(float_binary_parser, fltsq_msg_value)
-        packet += LtdDriver._u16_to_2u8(LtdDriver._compute_crc16(packet)).ok
-        packet += bytes([0x0D, 0x0A])
+        ''' msg_sequence can be a list, an array('f') or a numpy array, the payload is filled in one copy '''
+        packet_size = LtdDriver.FLTSQ_PACKET_MIN_SIZE + len(msg_sequence) * 4
+        if packet_size > 0xFF:
+            return Result(err='FLTSQ Sequence Too Long')
+
+        if hasattr(msg_sequence, 'astype'):
+            data_payload = msg_sequence.astype('<f4')
+        else:
+            data_payload = array('f', msg_sequence)
+            if sys.byteorder == 'big':
+                data_payload.byteswap()
+
+        packet = bytearray(packet_size)
+        packet[0] = self.protocol_version[0]
+        packet[1] = self.protocol_version[1]
+        packet[2] = packet_size
+        packet[LtdDriver.FLTSQ_DATA_START:packet_size - 4] = memoryview(data_payload).cast('B')
+        crc16 = LtdDriver._compute_crc16(memoryview(packet)[:packet_size - 4])
+        PACKET_TAIL_STRUCT.pack_into(packet, packet_size - 4, crc16, 0x0D, 0x0A)
         return Result(ok=packet)
 
-    def encode_packet(self, msg_seq_number: int, msg_type: int, msg_value: int) -> Result:
-        if msg_type not in self.msg_type_set:
-            return Result(err='Unknown msg_type')
+    def fltsq_decode(self, packet: bytes) -> Result:
+        ''' returns a zero-copy numpy float32 view over the packet data payload '''
+        import numpy as np
 
-        size_bytes = self.driver_msg_type_config_map[msg_type].size_bytes
-        data_type = self.driver_msg_type_config_map[msg_type].data_type
-        start_seg = bytes([self.protocol_version[0], self.protocol_version[1], (LtdDriver.PACKET_MIN_SIZE + size_bytes)])
+        packet_size = len(packet)
+        if packet_size < LtdDriver.FLTSQ_PACKET_MIN_SIZE or (packet_size - LtdDriver.FLTSQ_PACKET_MIN_SIZE) % 4 != 0:
+            return Result(err='Invalid Packet Size')
+        if packet_size != packet[2]:
+            return Result(err={
+                'msg': 'Invalid Packet Size Byte',
+                'detail': f'packet[2]={packet[2]}, packet.length={packet_size}',
+            })
 
-        result = LtdDriver._u16_to_2u8(msg_seq_number)
-        if result.err:
-            return result
-        seq_number_seg: bytes = result.ok
+        # packet start bytes
+        if self.protocol_version[0] != packet[0] or self.protocol_version[1] != packet[1]:
+            return Result(err='Invalid Version Bytes')
 
-        result = self._gen_cfg1(data_type, size_bytes, msg_type)
-        if result.err:
-            return result
-        cfg_seg = bytes([result.ok, self.driver_msg_type_config_map[msg_type].cfg2])
+        # CRC-16 check
+        packet_crc16 = packet[-4] | (packet[-3] << 8)
+        computed_crc16 = LtdDriver._compute_crc16(memoryview(packet)[:-4])
+        if packet_crc16 != computed_crc16:
+            return Result(err={
+                'msg': 'Invalid CRC-16',
+                'detail': f'packet_crc16={packet_crc16}, computed_crc16={computed_crc16}',
+            })
 
-        bin_parser_res = LtdDriver._get_binary_parser(size_bytes, data_type)
-        if bin_parser_res.err:
-            return bin_parser_res
-        data_payload = struct.pack(bin_parser_res.ok, msg_value)
+        msg_count = (packet_size - LtdDriver.FLTSQ_PACKET_MIN_SIZE) // 4
+        return Result(ok=np.frombuffer(packet, dtype='<f4', count=msg_count, offset=LtdDriver.FLTSQ_DATA_START))
 
-        seg_1 = start_seg + seq_number_seg + cfg_seg + data_payload
-        # compute crc16
-        crc16 = LtdDriver._compute_crc16(seg_1)
-        result = LtdDriver._u16_to_2u8(crc16)
-        if result.err:
-            return result
-        crc16_bytes: bytes = result.ok
-        # construct final packet
-        end_seg = bytes([0x0D, 0x0A])
-        packet = seg_1 + crc16_bytes + end_seg
-        return Result(ok=packet)
+    def encode_packet(self, msg_seq_number: int, msg_type: int, msg_value: int, cfg2: int = None) -> Result:
+        ''' cfg2 overrides the msg config cfg2, e.g. the device mode of a VSPI '''
+        encoder = self._encoders.get(msg_type, None)
+        if encoder is None:
+            return Result(err='Unknown msg_type')
+        if msg_seq_number < 0 or msg_seq_number > 65535:
+            return Result(err='Number Is not Valid u16')
+        if isinstance(encoder, Result):
+            return encoder
+
+        seg_1_struct, cfg1, config, value_encoder = encoder
+        if value_encoder is not None:
+            value_res = value_encoder(msg_value, self._delta_tx_state.get(msg_type, None))
+            if value_res.err:
+                return value_res
+            seg_1_struct, cfg1, msg_value, tx_state = value_res.ok
+            if tx_state is not None:
+                self._delta_tx_state[msg_type] = tx_state
+        seg_1 = seg_1_struct.pack(
+            self.protocol_version[0],
+            self.protocol_version[1],
+            seg_1_struct.size + 4,
+            msg_seq_number,
+            cfg1,
+            config.cfg2 if cfg2 is None else cfg2,
+            msg_value,
+        )
+        return Result(ok=seg_1 + PACKET_TAIL_STRUCT.pack(LtdDriver._compute_crc16(seg_1), 0x0D, 0x0A))
+
+    def encode_by_name(self, msg_seq_number: int, msg_name: str, msg_value: int) -> Result:
+        msg_type = self.msg_name_type_map.get(msg_name, None)
+        if msg_type is None:
+            return Result(err='Unknown msg_name')
+        return self.encode_packet(msg_seq_number, msg_type, msg_value)
+
+    def encode_many(self, items: list[tuple[int, int, int | float]], out: bytearray | memoryview = None, cfg2: int = None) -> Result:
+        ''' encodes (msg_seq_number, msg_type, msg_value) items back to back into out, returns the filled slice,
+        cfg2 overrides the msg configs cfg2 '''
+        encoders = []
+        delta_tx_state = {}
+        total_size = 0
+        for msg_seq_number, msg_type, msg_value in items:
+            encoder = self._encoders.get(msg_type, None)
+            if encoder is None:
+                return Result(err='Unknown msg_type')
+            if msg_seq_number < 0 or msg_seq_number > 65535:
+                return Result(err='Number Is not Valid u16')
+            if isinstance(encoder, Result):
+                return encoder
+
+            seg_1_struct, cfg1, config, value_encoder = encoder
+            if value_encoder is not None:
+                # delta state is committed only once the whole batch is encoded
+                tx_state = delta_tx_state[msg_type] if msg_type in delta_tx_state else self._delta_tx_state.get(msg_type, None)
+                value_res = value_encoder(msg_value, tx_state)
+                if value_res.err:
+                    return value_res
+                seg_1_struct, cfg1, msg_value, tx_state = value_res.ok
+                if tx_state is not None:
+                    delta_tx_state[msg_type] = tx_state
+            encoders.append((seg_1_struct, cfg1, config, msg_value))
+            total_size += seg_1_struct.size + 4
+
+        out_view = memoryview(bytearray(total_size) if out is None else out)
+        if len(out_view) < total_size:
+            return Result(err='Output Buffer Too Small')
+
+        offset = 0
+        for (msg_seq_number, _, _), (seg_1_struct, cfg1, config, msg_value) in zip(items, encoders):
+            seg_1_size = seg_1_struct.size
+            seg_1_struct.pack_into(
+                out_view,
+                offset,
+                self.protocol_version[0],
+                self.protocol_version[1],
+                seg_1_size + 4,
+                msg_seq_number,
+                cfg1,
+                config.cfg2 if cfg2 is None else cfg2,
+                msg_value,
+            )
+            crc16 = LtdDriver._compute_crc16(out_view[offset:offset + seg_1_size])
+            PACKET_TAIL_STRUCT.pack_into(out_view, offset + seg_1_size, crc16, 0x0D, 0x0A)
+            offset += seg_1_size + 4
+        self._delta_tx_state.update(delta_tx_state)
+        return Result(ok=out_view[:offset])
 
     def decode_packet(self, packet: bytearray) -> Result:
-        if len(packet) <= LtdDriver.PACKET_MIN_SIZE:
+        packet_size = len(packet)
+        if packet_size <= LtdDriver.PACKET_MIN_SIZE:
             return Result(err='Packet Too Small')
 
         # CRC-16 check
-        packet_crc16_bytes = packet[-4:-2]
-        packet_crc16 = int.from_bytes(packet_crc16_bytes, byteorder='little')
+        packet_crc16 = packet[-4] | (packet[-3] << 8)
         computed_crc16 = LtdDriver._compute_crc16(packet[:-4])
         if packet_crc16 != computed_crc16:
             return Result(err={
@@ -260,69 +454,198 @@ class LtdDriver:
         if self.protocol_version[0] != packet[0] or self.protocol_version[1] != packet[1]:
             return Result(err='Invalid Version Bytes')
 
-        device_msg = DeviceMsg()
-
         # packet size
-        if len(packet) != packet[2]:
+        if packet_size != packet[2]:
             return Result(err={
                 'msg': 'Packet Size Mismatch',
-                'detail': f'packet[2]={packet[2]}, packet.length={len(packet)}',
+                'detail': f'packet[2]={packet[2]}, packet.length={packet_size}',
             })
-        device_msg.config.size_bytes = packet[2]
-
-        # packet sequence number
-        seq_number_bytes = packet[3:5]
-        result = LtdDriver._bin_parse(seq_number_bytes, DATA_TYPE_UINT)
-        if result.err:
-            return result
-        device_msg.seq_number = result.ok
 
         # decode config byte 1
-        cfg1_bits = LtdDriver._bin_byte(packet[5])
-
-        # decode config byte 2
-        device_msg.config.cfg2 = packet[6]
-
-        # data type
-        data_type_bits = cfg1_bits[:2]
-        data_type = int(data_type_bits, 2)
-        if data_type not in self.data_type_set:
-            return Result(err={
-                'msg': 'Invalid Data Type Bits',
-                'detail': f'data_type_bits={data_type_bits}',
-            })
-        device_msg.config.data_type = data_type
-
-        # data length
-        size_bytes_bits = cfg1_bits[2:4]
-        size_bytes = 2 ** int(size_bytes_bits, 2)
-        if size_bytes != len(packet) - LtdDriver.PACKET_MIN_SIZE:
+        data_type, size_bytes, msg_type, packet_struct, config, value_decoder = self._decoders[packet[5]]
+        if size_bytes != packet_size - LtdDriver.PACKET_MIN_SIZE:
             return Result(err={
                 'msg': 'Invalid Data Length Bits',
-                'detail': f'data_length_bits={size_bytes}, Packet Data Size: {len(packet) - LtdDriver.PACKET_MIN_SIZE}',
+                'detail': f'data_length_bits={size_bytes}, Packet Data Size: {packet_size - LtdDriver.PACKET_MIN_SIZE}',
             })
-        device_msg.config.size_bytes = size_bytes
-
-        # msg type
-        msg_type_bits = cfg1_bits[4:8]
-        msg_type = int(msg_type_bits, 2)
-        if msg_type not in self.msg_type_set:
+        if config is None:
             return Result(err={
                 'msg': 'Invalid Msg Type Bits',
-                'detail': f'msg_type_bits={msg_type_bits}',
+                'detail': f'msg_type_bits={msg_type:04b}',
             })
-        device_msg.config.msg_type = msg_type
-        device_msg.config.msg_name = self.driver_msg_type_config_map[msg_type].msg_name
-
-        # parse data payload
-        data_payload = packet[LtdDriver.DATA_START:LtdDriver.DATA_START + size_bytes]
-
-        # base64 encode data payload
-        device_msg.b64_msg_value = LtdDriver._cx_b64encode(data_payload).decode('utf-8')
+        if packet_struct is None:
+            return Result(err=f"No Binary Parser was Found for: data_type={data_type}, size_bytes={size_bytes}")
 
-        result = LtdDriver._bin_parse(data_payload, data_type)
-        if result.err:
-            return result
-        device_msg.msg_value = result.ok
+        # parse sequence number, config byte 2 and data payload
+        seq_number, cfg2, msg_value, _ = packet_struct.unpack_from(packet)
+        if value_decoder is not None:
+            msg_value = value_decoder(msg_value)
+            if msg_value is None:
+                return Result(err='Missing Delta Keyframe')
+        decoded_config_key = (packet[5] << 8) | cfg2
+        decoded_config = self._decoded_configs.get(decoded_config_key, None)
+        if decoded_config is None:
+            decoded_config = FrozenMsgTypeConfig(msg_type, config.msg_name, data_type, size_bytes, cfg2, config.encoding, config.scale)
+            self._decoded_configs[decoded_config_key] = decoded_config
+
+        # keep a reference to immutable packets, copy mutable buffers, base64 is computed on access
+        return Result(ok=DeviceMsg(seq_number, msg_value, None, decoded_config, packet if isinstance(packet, bytes) else bytes(packet)))
+
+    def decode_to_dict(self, packet: bytes) -> Result:
+        ''' decodes packet into a plain dict keyed by field name '''
+        device_msg_res = self.decode_packet(packet)
+        if device_msg_res.err:
+            return device_msg_res
+        device_msg: DeviceMsg = device_msg_res.ok
+        return Result(ok={
+            'seq_number': device_msg.seq_number,
+            'msg_type': device_msg.config.msg_type,
+            'msg_name': device_msg.config.msg_name,
+            'msg_value': device_msg.msg_value,
+            'cfg2': device_msg.config.cfg2,
+        })
+
+    def decode_buffer(self, buffer: bytes) -> Result:
+        ''' decodes every LTD frame in a captured byte stream into a numpy structured array of LTD_RECORD_FIELDS '''
+        import numpy as np
+
+        stream = np.frombuffer(buffer, dtype=np.uint8)
+        records = np.zeros(0, dtype=LTD_RECORD_FIELDS)
+        if stream.size <= LtdDriver.PACKET_MIN_SIZE:
+            return Result(ok=records)
+
+        # header scan: version bytes, packet size byte and delimiter
+        packet_starts = np.flatnonzero((stream[:-2] == self.protocol_version[0]) & (stream[1:-1] == self.protocol_version[1]))
+        packet_sizes = stream[packet_starts + 2].astype(np.int64)
+        packet_ends = packet_starts + packet_sizes
+        valid = (packet_sizes > LtdDriver.PACKET_MIN_SIZE) & (packet_ends <= stream.size)
+        packet_starts, packet_sizes, packet_ends = packet_starts[valid], packet_sizes[valid], packet_ends[valid]
+        valid = (stream[packet_ends - 2] == 0x0D) & (stream[packet_ends - 1] == 0x0A)
+        packet_starts, packet_sizes, packet_ends = packet_starts[valid], packet_sizes[valid], packet_ends[valid]
+
+        # config byte 1: data length bits must match packet size, msg type must be known
+        cfg1 = stream[packet_starts + 5]
+        data_types = cfg1 >> 6
+        size_bytes = np.left_shift(1, (cfg1 >> 4) & 0x03).astype(np.int64)
+        msg_types = cfg1 & 0x0F
+        valid = (size_bytes == packet_sizes - LtdDriver.PACKET_MIN_SIZE) & np.isin(msg_types, list(self.msg_type_set))
+        packet_starts, packet_sizes, packet_ends = packet_starts[valid], packet_sizes[valid], packet_ends[valid]
+        data_types, size_bytes, msg_types = data_types[valid], size_bytes[valid], msg_types[valid]
 
-        return Result(ok=device_msg)
+        # CRC-16 check
+        packet_crc16 = stream[packet_ends - 4].astype(np.uint16) | (stream[packet_ends - 3].astype(np.uint16) << 8)
+        crc16_lengths = packet_sizes - 4
+        crc16_columns = np.minimum(packet_starts[:, None] + np.arange(int(crc16_lengths.max(initial=0)))[None, :], stream.size - 1)
+        crc_ok = crc16_many(stream[crc16_columns], crc16_lengths) == packet_crc16
+
+        # drop candidates that start inside a previous valid packet
+        valid_ends = np.maximum.accumulate(np.where(crc_ok, packet_ends, 0))
+        valid = packet_starts >= np.concatenate(([0], valid_ends[:-1]))
+        packet_starts, crc_ok = packet_starts[valid], crc_ok[valid]
+        data_types, size_bytes, msg_types = data_types[valid], size_bytes[valid], msg_types[valid]
+
+        records = np.zeros(packet_starts.size, dtype=LTD_RECORD_FIELDS)
+        records['seq_number'] = stream[packet_starts + 3].astype(np.uint16) | (stream[packet_starts + 4].astype(np.uint16) << 8)
+        records['msg_type'] = msg_types
+        records['cfg2'] = stream[packet_starts + 6]
+        records['crc_ok'] = crc_ok
+        records['value'] = np.nan
+
+        # parse data payloads grouped by binary parser
+        for _size_bytes, parsers in PARSERS_MAP.items():
+            for data_type in parsers:
+                group = (size_bytes == _size_bytes) & (data_types == data_type)
+                if not group.any():
+                    continue
+                payload_columns = packet_starts[group][:, None] + LtdDriver.DATA_START + np.arange(_size_bytes)[None, :]
+                payload_dtype = f"<{'f' if data_type == DATA_TYPE_FLOAT else 'i' if data_type == DATA_TYPE_INT else 'u'}{_size_bytes}"
+                records['value'][group] = np.ascontiguousarray(stream[payload_columns]).view(payload_dtype)[:, 0]
+
+        # compact encodings, delta values are the last keyframe plus every delta since, NaN before the first keyframe
+        for config in self.driver_msg_type_config_map.values():
+            if config.encoding == ENCODING_SCALED:
+                records['value'][msg_types == config.msg_type] *= config.scale
+            elif config.encoding == ENCODING_DELTA:
+                rows = np.flatnonzero((msg_types == config.msg_type) & crc_ok)
+                is_keyframe = (data_types[rows] != DELTA_DATA_TYPE) | (size_bytes[rows] != DELTA_SIZE_BYTES)
+                values = np.where(is_keyframe, records['value'][rows], records['value'][rows] * config.scale)
+                keyframe_idx = np.maximum.accumulate(np.where(is_keyframe, np.arange(rows.size), -1))
+                values_sum = np.cumsum(values)
+                base_idx = np.maximum(keyframe_idx, 0)
+                records['value'][rows] = np.where(keyframe_idx >= 0, values_sum - values_sum[base_idx] + values[base_idx], np.nan)
+
+        return Result(ok=records)
+
+
+class LtdFramer:
+    FRAME_MIN_SIZE = 7  # version[2], packet_size, crc16[2], delimiter[2]
+
+    protocol_version: tuple[int, int]
+    buffer: bytearray
+    start: int = 0
+    end: int = 0
+    dropped_bytes: int = 0
+
+    def __init__(self, _protocol_version: tuple[int, int], buffer_size: int = 4096):
+        self.protocol_version = (_protocol_version[0], _protocol_version[1])
+        self._version_bytes = bytes(self.protocol_version)
+        self.buffer = bytearray(buffer_size)
+
+    def _append(self, chunk: memoryview):
+        chunk_size = len(chunk)
+        if self.end + chunk_size > len(self.buffer):
+            # compact pending bytes to the start of the buffer, grow only if a single chunk does not fit
+            pending_size = self.end - self.start
+            if pending_size + chunk_size > len(self.buffer):
+                self.buffer.extend(bytes(pending_size + chunk_size - len(self.buffer)))
+            self.buffer[:pending_size] = self.buffer[self.start:self.end]
+            self.start = 0
+            self.end = pending_size
+        self.buffer[self.end:self.end + chunk_size] = chunk
+        self.end += chunk_size
+
+    def _resync(self):
+        # drop bytes until the next candidate version bytes
+        next_start = self.buffer.find(self._version_bytes, self.start + 1, self.end)
+        if next_start == -1:
+            # keep a trailing first version byte, it may be completed by the next chunk
+            next_start = self.end - 1 if self.buffer[self.end - 1] == self.protocol_version[0] else self.end
+        self.dropped_bytes += next_start - self.start
+        self.start = next_start
+
+    def feed(self, chunk: memoryview):
+        ''' buffers chunk and returns an iterator over every complete frame, the frame length is taken from packet[2] '''
+        if chunk:
+            self._append(chunk)
+        return self._frames()
+
+    def _frames(self):
+        buffer = self.buffer
+        while self.end - self.start >= 3:
+            start = self.start
+            if buffer[start] != self.protocol_version[0] or buffer[start + 1] != self.protocol_version[1]:
+                self._resync()
+                continue
+
+            packet_size = buffer[start + 2]
+            if packet_size < LtdFramer.FRAME_MIN_SIZE:
+                self._resync()
+                continue
+            if self.end - start < packet_size:
+                break
+
+            packet_end = start + packet_size
+            if buffer[packet_end - 2] != 0x0D or buffer[packet_end - 1] != 0x0A:
+                self._resync()
+                continue
+
+            self.start = packet_end
+            yield bytes(buffer[start:packet_end])
+
+        if self.start == self.end:
+            self.start = 0
+            self.end = 0
+
+    def reset(self):
+        self.start = 0
+        self.end = 0
@@ -0,0 +1,161 @@
+import math
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    import numpy as np  # imported where it is used, like in ltd_driver
+
+
+class SignalSource(ABC):
+    ''' maps an array of tick times in seconds to an array of values '''
+
+    @abstractmethod
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        pass
+
+
+class ConstSource(SignalSource):
+    def __init__(self, value: float):
+        self.value = value
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        return np.full(t.shape, self.value, dtype=np.float64)
+
+
+class SineSource(SignalSource):
+    def __init__(self, amplitude: float, frequency_hz: float, offset: float = 0, phase: float = 0):
+        self.amplitude = amplitude
+        self.frequency_hz = frequency_hz
+        self.offset = offset
+        self.phase = phase
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        return self.offset + self.amplitude * np.sin(2 * math.pi * self.frequency_hz * t + self.phase)
+
+
+class SquareSource(SignalSource):
+    def __init__(self, high: float, low: float, frequency_hz: float, duty: float = 0.5):
+        self.high = high
+        self.low = low
+        self.frequency_hz = frequency_hz
+        self.duty = duty
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        return np.where(np.mod(t * self.frequency_hz, 1.0) < self.duty, self.high, self.low)
+
+
+class RampSource(SignalSource):
+    ''' start + slope * t, wraps back to start every period seconds if period is set '''
+
+    def __init__(self, start: float, slope: float, period: float = None):
+        self.start = start
+        self.slope = slope
+        self.period = period
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        if self.period:
+            t = np.mod(t, self.period)
+        return self.start + self.slope * t
+
+
+class NoiseSource(SignalSource):
+    ''' uniform noise in [low, high) '''
+
+    def __init__(self, low: float, high: float, seed: int = None):
+        import numpy as np
+        self.low = low
+        self.high = high
+        self.rng = np.random.default_rng(seed)
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        return self.rng.uniform(self.low, self.high, t.shape)
+
+
+class StepSource(SignalSource):
+    def __init__(self, before: float, after: float, step_time: float):
+        self.before = before
+        self.after = after
+        self.step_time = step_time
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        return np.where(t < self.step_time, self.before, self.after)
+
+
+class CsvSource(SignalSource):
+    ''' replays one column of a recorded CSV file with a header line, sampled at sample_rate_hz '''
+
+    def __init__(self, csv_path: str, column: str, sample_rate_hz: float, loop: bool = True):
+        import numpy as np
+        with open(csv_path, 'r') as f:
+            csv_header = f.readline().strip().split(',')
+        if column not in csv_header:
+            raise Exception(f"CSV Column not Found: {column}")
+        self.values = np.atleast_1d(np.loadtxt(csv_path, delimiter=',', skiprows=1, usecols=csv_header.index(column), dtype=np.float64))
+        if self.values.size == 0:
+            raise Exception(f"CSV File is Empty: {csv_path}")
+        self.sample_rate_hz = sample_rate_hz
+        self.loop = loop
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        sample_idx = np.floor(t * self.sample_rate_hz + 1e-9).astype(np.int64)
+        if self.loop:
+            sample_idx = np.mod(sample_idx, self.values.size)
+        else:
+            sample_idx = np.minimum(sample_idx, self.values.size - 1)
+        return self.values[sample_idx]
+
+
+class ClipSource(SignalSource):
+    def __init__(self, source: SignalSource, low: float = None, high: float = None):
+        self.source = source
+        self.low = low
+        self.high = high
+
+    def block(self, t: 'np.ndarray') -> 'np.ndarray':
+        import numpy as np
+        return np.clip(self.source.block(t), self.low, self.high)
+
+
+class SignalEngine:
+    ''' computes values of N (msg_type, SignalSource) channels for M ticks at a time '''
+    rate_hz: float
+    msg_types: list[int]
+    sources: list[SignalSource]
+    block_ticks: int
+
+    def __init__(self, rate_hz: float, channels: list[tuple[int, SignalSource]], block_ticks: int = 1024):
+        self.rate_hz = rate_hz
+        self.msg_types = [msg_type for msg_type, _ in channels]
+        self.sources = [source for _, source in channels]
+        self.block_ticks = block_ticks
+        self._block_start = 0
+        self._block_rows: list[list[float]] = []
+
+    def block(self, start_tick: int, ticks: int) -> 'np.ndarray':
+        ''' returns a (ticks, channels) float64 array '''
+        import numpy as np
+        t = np.arange(start_tick, start_tick + ticks, dtype=np.float64) / self.rate_hz
+        values = np.empty((ticks, len(self.sources)), dtype=np.float64)
+        for idx, source in enumerate(self.sources):
+            values[:, idx] = source.block(t)
+        return values
+
+    def msg_source(self, tick: int) -> list[tuple[int, float]]:
+        ''' StreamScheduler msg source, values come from the cached block that holds tick '''
+        row_idx = tick - self._block_start
+        if row_idx < 0 or row_idx >= len(self._block_rows):
+            self._block_start = tick
+            self._block_rows = self.block(tick, self.block_ticks).tolist()
+            row_idx = 0
+        return list(zip(self.msg_types, self._block_rows[row_idx]))
+
+    def items(self, start_tick: int, ticks: int) -> list[tuple[int, int, float]]:
+        ''' (sn, msg_type, msg_value) items of ticks in tick order, ready for LtdDriver.encode_many '''
+        values = self.block(start_tick, ticks).tolist()
+        msg_types = self.msg_types
+        return [((start_tick + idx) & 0xFFFF, msg_type, msg_value) for idx, row in enumerate(values) for msg_type, msg_value in zip(msg_types, row)]
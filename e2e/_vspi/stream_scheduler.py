@@ -0,0 +1,182 @@
+import heapq
+import asyncio
+from threading import Thread
+from typing import Callable
+from e2e.clock import (
+    Clock,
+    real_clock,
+)
+
+
+MsgSource = Callable[[int], list[tuple[int, int | float]]]
+ItemsWriter = Callable[[list[tuple[int, int, int | float]]], None]
+
+
+class SchedulerStream:
+    name: str
+    rate_hz: float
+    period_ns: int
+    msg_source: MsgSource
+    write_items: ItemsWriter
+
+    tick: int = 0
+    ticks: int = 0
+    skipped_ticks: int = 0
+    lateness_sum_ns: int = 0
+    lateness_max_ns: int = 0
+
+    def __init__(self, name: str, rate_hz: float, msg_source: MsgSource, write_items: ItemsWriter):
+        self.name = name
+        self.rate_hz = rate_hz
+        self.period_ns = round(1e9 / rate_hz)
+        self.msg_source = msg_source
+        self.write_items = write_items
+
+
+class StreamScheduler:
+    ''' runs periodic msg streams on absolute monotonic deadlines, msgs due at the same time are written in one batch per writer '''
+    streams: list[SchedulerStream]
+    spin_ns: int
+    clock: Clock
+    running: bool = False
+    run_thread: Thread
+
+    start_ns: int = 0
+    stop_ns: int = 0
+    writes: int = 0
+
+    def __init__(self, spin_ns: int = 0, clock: Clock = None):
+        # sleep until spin_ns before a deadline then busy wait, trades CPU for lower lateness at kHz rates
+        self.streams = []
+        self.spin_ns = spin_ns
+        # a VirtualClock runs the streams as fast as the writers accept them, ticks and sequence numbers are unchanged
+        self.clock = clock or real_clock
+
+    def add_stream(self, name: str, rate_hz: float, msg_source: MsgSource, write_items: ItemsWriter) -> SchedulerStream:
+        ''' msg_source(tick) returns the [(msg_type, msg_value)] of one tick, write_items receives [(sn, msg_type, msg_value)] '''
+        if rate_hz <= 0:
+            raise Exception('Invalid Stream Rate')
+        stream = SchedulerStream(name, rate_hz, msg_source, write_items)
+        self.streams.append(stream)
+        return stream
+
+    def _wait_until(self, deadline_ns: int):
+        if deadline_ns - self.clock.monotonic_ns() > self.spin_ns:
+            self.clock.sleep_until(deadline_ns - self.spin_ns)
+        self.clock.spin_until(deadline_ns)
+
+    def _start(self, duration: float = None) -> tuple[int, list[tuple[int, int]]]:
+        self.running = True
+        self.start_ns = self.clock.monotonic_ns()
+        end_ns = None if duration is None else self.start_ns + round(duration * 1e9)
+        deadlines = [(self.start_ns, idx) for idx in range(len(self.streams))]
+        heapq.heapify(deadlines)
+        return end_ns, deadlines
+
+    def _collect_due(self, deadlines: list[tuple[int, int]], now_ns: int) -> dict[ItemsWriter, list]:
+        ''' ticks every stream that is due, returns their items grouped by writer '''
+        batches: dict[ItemsWriter, list] = {}
+        while deadlines and deadlines[0][0] <= now_ns:
+            deadline_ns, idx = heapq.heappop(deadlines)
+            stream = self.streams[idx]
+            lateness_ns = now_ns - deadline_ns
+            stream.lateness_sum_ns += lateness_ns
+            if lateness_ns > stream.lateness_max_ns:
+                stream.lateness_max_ns = lateness_ns
+
+            sn = stream.tick & 0xFFFF
+            items = batches.setdefault(stream.write_items, [])
+            items.extend((sn, msg_type, msg_value) for msg_type, msg_value in stream.msg_source(stream.tick))
+            stream.ticks += 1
+            stream.tick += 1
+
+            # next deadline is absolute, ticks that already passed are skipped instead of bursted
+            next_deadline_ns = deadline_ns + stream.period_ns
+            if next_deadline_ns <= now_ns:
+                missed_ticks = (now_ns - next_deadline_ns) // stream.period_ns + 1
+                stream.skipped_ticks += missed_ticks
+                stream.tick += missed_ticks
+                next_deadline_ns += missed_ticks * stream.period_ns
+            heapq.heappush(deadlines, (next_deadline_ns, idx))
+        return batches
+
+    def run(self, duration: float = None):
+        ''' runs until stop() is called or for duration seconds '''
+        if not self.streams:
+            return
+
+        clock = self.clock
+        end_ns, deadlines = self._start(duration)
+        try:
+            while self.running:
+                deadline_ns = deadlines[0][0]
+                if end_ns is not None and deadline_ns >= end_ns:
+                    break
+                now_ns = clock.monotonic_ns()
+                if deadline_ns > now_ns:
+                    self._wait_until(deadline_ns)
+                    continue
+
+                for write_items, items in self._collect_due(deadlines, now_ns).items():
+                    if items:
+                        write_items(items)
+                        self.writes += 1
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            self.running = False
+            self.stop_ns = clock.monotonic_ns()
+
+    async def run_on_event_loop(self, duration: float = None):
+        ''' run() for asyncio, waits with asyncio.sleep and awaits the writers, which are coroutine functions here '''
+        if not self.streams:
+            return
+
+        clock = self.clock
+        end_ns, deadlines = self._start(duration)
+        try:
+            while self.running:
+                deadline_ns = deadlines[0][0]
+                if end_ns is not None and deadline_ns >= end_ns:
+                    break
+                now_ns = clock.monotonic_ns()
+                if deadline_ns > now_ns:
+                    await asyncio.sleep((deadline_ns - now_ns) / 1e9)
+                    continue
+
+                for write_items, items in self._collect_due(deadlines, now_ns).items():
+                    if items:
+                        await write_items(items)
+                        self.writes += 1
+
+        finally:
+            self.running = False
+            self.stop_ns = clock.monotonic_ns()
+
+    def start_async(self, duration: float = None):
+        self.run_thread = Thread(target=self.run, args=(duration,))
+        self.run_thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def stop_async(self):
+        self.stop()
+        self.run_thread.join()
+
+    def stats(self) -> dict[str, dict]:
+        elapsed_ns = (self.stop_ns if not self.running else self.clock.monotonic_ns()) - self.start_ns
+        elapsed_s = max(elapsed_ns, 1) / 1e9
+        stats = {}
+        for stream in self.streams:
+            stats[stream.name] = {
+                'target_rate_hz': stream.rate_hz,
+                'achieved_rate_hz': round(stream.ticks / elapsed_s, 2),
+                'ticks': stream.ticks,
+                'skipped_ticks': stream.skipped_ticks,
+                'lateness_mean_us': round(stream.lateness_sum_ns / max(stream.ticks, 1) / 1e3, 2),
+                'lateness_max_us': round(stream.lateness_max_ns / 1e3, 2),
+            }
+        return stats
@@ -0,0 +1,68 @@
+from e2e._vspi.signal_engine import (
+    SignalEngine,
+    ConstSource,
+    SineSource,
+    SquareSource,
+    RampSource,
+    NoiseSource,
+    ClipSource,
+)
+from e2e._vspi.test_drivers import (
+    ltd_driver_lt_ch000,
+    ltd_driver_lt_ht103,
+    ltd_driver_lt_ht107,
+    ltd_driver_lt_ht113,
+    ltd_driver_lt_to101,
+)
+
+
+def signals_lt_ch000(rate_hz: float = 100) -> SignalEngine:
+    msg_type = ltd_driver_lt_ch000.get_msg_type_by_name
+    return SignalEngine(rate_hz, [
+        (msg_type('READ_WEIGHT'), SineSource(100, 3)),
+        (msg_type('READ_TEMPERATURE'), SquareSource(25, 0, 3)),
+        (msg_type('READ_PRESSURE'), ClipSource(SineSource(10, 3), low=0)),
+    ])
+
+
+def signals_lt_ht103(rate_hz: float = 5) -> SignalEngine:
+    msg_type = ltd_driver_lt_ht103.get_msg_type_by_name
+    return SignalEngine(rate_hz, [
+        (msg_type('READ_T1'), ConstSource(1)),
+        (msg_type('READ_T2'), ConstSource(2)),
+        (msg_type('READ_T_amb'), ConstSource(25)),
+        (msg_type('READ_T_c'), ConstSource(4)),
+        (msg_type('READ_T_h'), RampSource(25, 1, period=60)),
+        (msg_type('P_HEATER'), ConstSource(0)),
+        (msg_type('P_PELTIER'), ConstSource(0)),
+    ])
+
+
+def signals_lt_ht107(rate_hz: float = 5) -> SignalEngine:
+    msg_type = ltd_driver_lt_ht107.get_msg_type_by_name
+    return SignalEngine(rate_hz, [(msg_type(f"READ_T{x}"), NoiseSource(x * 10 - 0.5, x * 10 + 0.5)) for x in range(1, 10)] + [
+        (msg_type('READ_T_H'), ConstSource(75)),
+    ])
+
+
+def signals_lt_ht113(rate_hz: float = 5) -> SignalEngine:
+    msg_type = ltd_driver_lt_ht113.get_msg_type_by_name
+    return SignalEngine(rate_hz, [
+        (msg_type('READ_T_sam'), ConstSource(50)),
+        (msg_type('READ_T_amb'), ConstSource(25)),
+        (msg_type('READ_ref'), ConstSource(40)),
+        (msg_type('READ_W_flw'), SquareSource(325, 0, 0.05)),
+    ])
+
+
+def signals_lt_to101(rate_hz: float = 5) -> SignalEngine:
+    msg_type = ltd_driver_lt_to101.get_msg_type_by_name
+    return SignalEngine(rate_hz, [
+        (msg_type('READ_TC1'), SineSource(2, 0.1, offset=10)),
+        (msg_type('READ_TC2'), SineSource(2, 0.1, offset=20)),
+        (msg_type('READ_TC3'), SineSource(2, 0.1, offset=30)),
+        (msg_type('READ_LVL'), ConstSource(4)),
+        (msg_type('READ_PR1'), ConstSource(15)),
+        (msg_type('READ_PR2'), ConstSource(25)),
+        (msg_type('READ_PR3'), ConstSource(35)),
+    ])
@@ -1,14 +1,35 @@
 import time
-import socket
+import json
 import random
-import serial
 from enum import Enum
-from threading import Thread
+from threading import Thread, Event
+from typing import TYPE_CHECKING
 from e2e._vspi.ltd_driver import (
     LtdDriver,
+    LtdFramer,
     DeviceMsg,
     MsgTypeConfig
 )
+from e2e._vspi.stream_scheduler import StreamScheduler
+from e2e.latency_histogram import LatencyHistogram
+from e2e.clock import (
+    Clock,
+    real_clock,
+)
+from e2e.transport import (
+    Transport,
+    TcpTransport,
+    SerialTransport,
+)
+from e2e.traffic_log import (
+    TrafficRecorder,
+    TrafficReplayer,
+    DIRECTION_RX,
+    DIRECTION_TX,
+    MSG_TYPE_UNKNOWN,
+)
+if TYPE_CHECKING:
+    from e2e._vspi.signal_engine import SignalEngine  # numpy is only needed by signal streams
 
 
 class VSPICommMode(Enum):
@@ -27,15 +48,35 @@ class VSPI:
 
     vspi_mode: VSPICommMode
     vspi_socket_addr: tuple[str, int]
-    vspi_socket: socket.socket
 
     vspi_serial_port_name: str
     vspi_baud_rate: int
-    vspi_serial_port: serial.Serial
+
+    transport: Transport
+    # drives streams, replays and traffic log timestamps, latencies are always measured in real time
+    clock: Clock
 
     control_loop_running: bool = False
     control_loop_thread: Thread
 
+    RX_BUFFER_SIZE = 4096
+    RX_POLL_TIMEOUT = 0.2
+    rx_buffer: bytearray
+    rx_view: memoryview
+    ltd_framer: LtdFramer
+
+    TX_BUFFER_SIZE = 4096
+    tx_buffer: bytearray
+    read_msg_types: list[int]
+
+    traffic_recorder: TrafficRecorder = None
+    traffic_replayer: TrafficReplayer = None
+
+    # msg_type -> stage -> histogram, stages: decode (rx -> decoded), send (decoded -> feedback sent), total (rx -> feedback sent)
+    LATENCY_STAGES = ('decode', 'send', 'total')
+    latency_histograms: dict[int, dict[str, LatencyHistogram]]
+    stats_dump_stop: Event = None
+
     def __init__(
         self,
         device_model: str,
@@ -47,6 +88,8 @@ class VSPI:
         vspi_baud_rate: int = 115200,
         vspi_comm_mode: VSPICommMode = VSPICommMode.NETWORK,
         auto_connect: bool = False,
+        transport: Transport = None,
+        clock: Clock = None,
     ):
         self.device_model = device_model
         self.device_driver = device_driver
@@ -54,20 +97,29 @@ class VSPI:
         self.control_feedback_map = control_feedback_map
         self.vspi_mode = vspi_comm_mode
         self.vspi_socket_addr = (vspi_socket_host, vspi_socket_port)
-        self.vspi_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.vspi_serial_port_name = vspi_serial_port_name
         self.vspi_baud_rate = vspi_baud_rate
+        if transport is None:
+            if vspi_comm_mode == VSPICommMode.WIRED:
+                transport = SerialTransport(vspi_serial_port_name, vspi_baud_rate)
+            else:
+                transport = TcpTransport(vspi_socket_host, vspi_socket_port)
+        self.transport = transport
+        self.clock = clock or real_clock
         self.log_tag = f"[VSPI-{self.device_model}]"
+        self.rx_buffer = bytearray(VSPI.RX_BUFFER_SIZE)
+        self.rx_view = memoryview(self.rx_buffer)
+        self.ltd_framer = LtdFramer(device_driver.protocol_version)
+        self.tx_buffer = bytearray(VSPI.TX_BUFFER_SIZE)
+        self.latency_histograms = {}
+        self.read_msg_types = [msg_type for msg_type, msg_name in device_driver.msg_type_name_map.items() if msg_name.startswith('READ_')]
         if auto_connect:
             self.connect()
 
     def connect(self):
         print(self.log_tag, 'VSPI Connecting...')
         try:
-            if self.vspi_mode == VSPICommMode.NETWORK:
-                self.vspi_socket.connect(self.vspi_socket_addr)
-            elif self.vspi_mode == VSPICommMode.WIRED:
-                self.vspi_serial_port = serial.Serial(port=self.vspi_serial_port_name, baudrate=self.vspi_baud_rate)
+            self.transport.open()
             print(self.log_tag, 'VSPI Connecting...OK')
 
         except Exception as e:
@@ -78,10 +130,7 @@ class VSPI:
     def disconnect(self):
         print(self.log_tag, 'VSPI Disconnecting...')
         try:
-            if self.vspi_mode == VSPICommMode.NETWORK:
-                self.vspi_socket.close()
-            elif self.vspi_mode == VSPICommMode.WIRED:
-                self.vspi_serial_port.close()
+            self.transport.close()
             print(self.log_tag, 'VSPI Disconnecting...OK')
 
         except Exception as e:
@@ -89,55 +138,99 @@ class VSPI:
             if self.debug:
                 print(e)
 
-    def write_packet(self, packet: bytes):
-        self.vspi_socket.send(packet)
+    def _record_packet(self, direction: int, packet: bytes, msg_type: int = None):
+        # msg_type=None splits packet into LTD frames
+        if msg_type is None:
+            self.traffic_recorder.record_ltd(direction, packet)
+        else:
+            self.traffic_recorder.record(direction, packet, msg_type)
 
-    def write_msg(self, msg_type: int, msg_value: int, sn: int = 0):
-        self.device_driver.driver_msg_type_config_map[msg_type].cfg2 = self.device_cfg2
-        packet = self.device_driver.encode_packet(sn, msg_type, msg_value).ok
+    def write_packet(self, packet: bytes, msg_type: int = None):
         if self.debug:
             print(' '.join([f"{hex(x).replace('0x', '').upper():0>2}" for x in packet]))
-        if self.vspi_mode == VSPICommMode.NETWORK:
-            self.vspi_socket.send(packet)
-        elif self.vspi_mode == VSPICommMode.WIRED:
-            self.vspi_serial_port.write(packet)
+        if self.traffic_recorder:
+            self._record_packet(DIRECTION_TX, packet, msg_type)
+        self.transport.send(packet)
+
+    def write_msg(self, msg_type: int, msg_value: int, sn: int = 0):
+        packet_res = self.device_driver.encode_packet(sn, msg_type, msg_value, self.device_cfg2)
+        if packet_res.err:
+            print(self.log_tag, '[ERROR]', f"Encoding msg_type={msg_type}: {packet_res.err}")
+            return
+        self.write_packet(packet_res.ok)
+
+    def write_msg_by_name(self, msg_name: str, msg_value: int, sn: int = 0):
+        msg_type = self.device_driver.get_msg_type_by_name(msg_name)
+        if msg_type == -1:
+            print(self.log_tag, f"Unknown msg_name: {msg_name}")
+            return
+        self.write_msg(msg_type, msg_value, sn=sn)
 
     def fltsq_write_msg(self, msg_types: list[int], msg_values: list[int], msg_count: int):
         msg_sequence = [0] * msg_count
         for idx, _t in enumerate(msg_types):
             msg_sequence[_t] = msg_values[idx]
         packet = self.device_driver.fltsq_encode(msg_sequence).ok
-        if self.debug:
-            print(' '.join([f"{hex(x).replace('0x', '').upper():0>2}" for x in packet]))
-        if self.vspi_mode == VSPICommMode.NETWORK:
-            self.vspi_socket.send(packet)
-        elif self.vspi_mode == VSPICommMode.WIRED:
-            self.vspi_serial_port.write(packet)
+        self.write_packet(packet, MSG_TYPE_UNKNOWN)
+
+    def start_recording(self, log_path: str):
+        ''' records every frame written and received until stop_recording() '''
+        self.stop_recording()
+        self.traffic_recorder = TrafficRecorder(log_path, self.device_model, self.clock)
+
+    def stop_recording(self):
+        if self.traffic_recorder:
+            self.traffic_recorder.close()
+            self.traffic_recorder = None
+
+    def replay_traffic(self, log_path: str, speed: float = 1.0, loop: bool = False, msg_types: set[int] = None, rewrite_seq_numbers: bool = False) -> int:
+        ''' writes the recorded device frames of log_path again, speed=0 replays as fast as possible '''
+        self.traffic_replayer = TrafficReplayer(log_path)
+        return self.traffic_replayer.replay(self.write_packet, speed, loop, DIRECTION_TX, msg_types, rewrite_seq_numbers=rewrite_seq_numbers, clock=self.clock)
+
+    def stop_replay(self):
+        if self.traffic_replayer:
+            self.traffic_replayer.stop()
 
     def switch_device_mode(self, device_mode_cfg2: int):
         self.device_cfg2 = device_mode_cfg2
         self.write_msg(0, 11)
 
     def _handle_control_packet(self):
-        packet = b''
-        while True:
-            try:
-                byte = self.vspi_socket.recv(1)
-            except BlockingIOError:
-                continue
-            packet += byte
-            if packet[-2:] == b'\r\n':
-                if packet[0] == self.device_driver.protocol_version[0] and packet[1] == self.device_driver.protocol_version[1]:
-                    break
-                else:
-                    print(f"Invalid LtdDriver-{self.device_model} packet")
-                    packet = b''
+        try:
+            rx_size = self.transport.recv_into(self.rx_buffer)
+        except BlockingIOError:
+            # non-blocking transport without data, wait for it instead of spinning
+            self.transport.wait_readable(VSPI.RX_POLL_TIMEOUT)
+            return
+        if rx_size == 0:
+            print(self.log_tag, 'VSPI Connection Closed')
+            self.control_loop_running = False
+            return
+
+        rx_ns = time.monotonic_ns()
+        for packet in self.ltd_framer.feed(self.rx_view[:rx_size]):
+            self._handle_device_packet(packet, rx_ns)
 
+    def _record_latency(self, msg_type: int, stage: str, latency_ns: int):
+        msg_type_histograms = self.latency_histograms.get(msg_type, None)
+        if msg_type_histograms is None:
+            msg_type_histograms = {x: LatencyHistogram() for x in VSPI.LATENCY_STAGES}
+            self.latency_histograms[msg_type] = msg_type_histograms
+        msg_type_histograms[stage].record(latency_ns)
+
+    def _handle_device_packet(self, packet: bytes, rx_ns: int = None):
+        if rx_ns is None:
+            rx_ns = time.monotonic_ns()
+        if self.traffic_recorder:
+            self._record_packet(DIRECTION_RX, packet)
         device_msg_res = self.device_driver.decode_packet(packet)
         if device_msg_res.err:
             print(f"Invalid LtdDriver-{self.device_model} packet")
             return
         device_msg: DeviceMsg = device_msg_res.ok
+        decode_ns = time.monotonic_ns()
+        self._record_latency(device_msg.config.msg_type, 'decode', decode_ns - rx_ns)
         # DEVICE_HEART_BEAT
         if device_msg.config.msg_type == 15:
             return
@@ -146,8 +239,46 @@ class VSPI:
             print('MSG:', device_msg)
 
         if device_msg.config.msg_type in self.control_feedback_map:
-            feedback_packet = self.device_driver.encode_packet(0, self.control_feedback_map[device_msg.config.msg_type], device_msg.msg_value).ok
-            self.vspi_socket.send(feedback_packet)
+            feedback_type = self.control_feedback_map[device_msg.config.msg_type]
+            feedback_packet_res = self.device_driver.encode_packet(0, feedback_type, device_msg.msg_value, self.device_cfg2)
+            if feedback_packet_res.err:
+                print(self.log_tag, '[ERROR]', f"Encoding msg_type={feedback_type}: {feedback_packet_res.err}")
+                return
+            self.write_packet(feedback_packet_res.ok)
+            send_ns = time.monotonic_ns()
+            self._record_latency(device_msg.config.msg_type, 'send', send_ns - decode_ns)
+            self._record_latency(device_msg.config.msg_type, 'total', send_ns - rx_ns)
+
+    def stats(self) -> dict[str, dict[str, dict]]:
+        ''' latency percentiles per received msg_name and stage '''
+        stats = {}
+        for msg_type, msg_type_histograms in list(self.latency_histograms.items()):
+            msg_name = self.device_driver.get_msg_name_by_type(msg_type) or str(msg_type)
+            stats[msg_name] = {stage: histogram.stats() for stage, histogram in msg_type_histograms.items() if histogram.count}
+        return stats
+
+    def reset_stats(self):
+        for msg_type_histograms in self.latency_histograms.values():
+            for histogram in msg_type_histograms.values():
+                histogram.reset()
+
+    def dump_stats(self):
+        print(self.log_tag, 'Latency Stats:', json.dumps(self.stats()))
+
+    def start_stats_dump_async(self, period: float = 5.0):
+        self.stop_stats_dump_async()
+        stats_dump_stop = Event()
+        self.stats_dump_stop = stats_dump_stop
+
+        def stats_dump_loop():
+            while not stats_dump_stop.wait(period):
+                self.dump_stats()
+        Thread(target=stats_dump_loop, daemon=True).start()
+
+    def stop_stats_dump_async(self):
+        if self.stats_dump_stop:
+            self.stats_dump_stop.set()
+            self.stats_dump_stop = None
 
     def start_feedback_control_loop_sync(self):
         if self.control_loop_running:
@@ -162,37 +293,47 @@ class VSPI:
             except KeyboardInterrupt:
                 self.control_loop_running = False
 
+    def _const_msgs(self, _tick: int = 0, offset: int = 20) -> list[tuple[int, int | float]]:
+        return [(msg_type, offset + (msg_type + 1) * 10) for msg_type in self.read_msg_types]
+
+    def _rand_msgs(self, _tick: int = 0) -> list[tuple[int, int | float]]:
+        return [(msg_type, random.uniform(1, 10)) for msg_type in self.read_msg_types]
+
     def _burst_const_msgs(self, offset: int = 20, sn: int = 0):
-        for msg_type in self.device_driver.driver_msg_type_config_map:
-            if not self.device_driver.driver_msg_type_config_map[msg_type].msg_name.startswith('READ_'):
-                continue
-            msg_value = offset + (msg_type + 1) * 10
-            self.write_msg(msg_type, msg_value, sn=sn)
+        self.burst_sequence(self._const_msgs(offset=offset), sn=sn)
 
     def _burst_rand_msgs(self, sn: int = 0):
-        for msg_type in self.device_driver.driver_msg_type_config_map:
-            if not self.device_driver.driver_msg_type_config_map[msg_type].msg_name.startswith('READ_'):
-                continue
-            msg_value = random.uniform(1, 10)
-            self.write_msg(msg_type, msg_value, sn=sn)
-
-    def stream_const_sequence_sync(self):
-        c = 0
-        while True:
-            self._burst_const_msgs(sn=c)
-            c += 1
-            time.sleep(0.2)
-
-    def stream_rand_sequence_sync(self):
-        c = 0
-        while True:
-            self._burst_rand_msgs(sn=c)
-            c += 1
-            time.sleep(0.2)
+        self.burst_sequence(self._rand_msgs(), sn=sn)
+
+    def stream_const_sequence_sync(self, rate_hz: float = 5, duration: float = None):
+        stream_scheduler = StreamScheduler(clock=self.clock)
+        stream_scheduler.add_stream(self.device_model, rate_hz, self._const_msgs, self.write_items)
+        stream_scheduler.run(duration)
+
+    def stream_rand_sequence_sync(self, rate_hz: float = 5, duration: float = None):
+        stream_scheduler = StreamScheduler(clock=self.clock)
+        stream_scheduler.add_stream(self.device_model, rate_hz, self._rand_msgs, self.write_items)
+        stream_scheduler.run(duration)
+
+    def stream_signals_sync(self, signal_engine: 'SignalEngine', duration: float = None):
+        stream_scheduler = StreamScheduler(clock=self.clock)
+        stream_scheduler.add_stream(self.device_model, signal_engine.rate_hz, signal_engine.msg_source, self.write_items)
+        stream_scheduler.run(duration)
 
     def burst_sequence(self, sequence: list[tuple[int, int | float]], sn: int = 0):
-        for msg_type, msg_value in sequence:
-            self.write_msg(msg_type, msg_value, sn)
+        self.write_items([(sn, msg_type, msg_value) for msg_type, msg_value in sequence])
+
+    def write_items(self, items: list[tuple[int, int, int | float]]):
+        ''' encodes (sn, msg_type, msg_value) items with the device cfg2 and writes them at once '''
+        if not items:
+            return
+        result = self.device_driver.encode_many(items, self.tx_buffer, self.device_cfg2)
+        if result.err == 'Output Buffer Too Small':
+            result = self.device_driver.encode_many(items, cfg2=self.device_cfg2)
+        if result.ok is None:
+            print(self.log_tag, '[ERROR]', f"Encoding {len(items)} Items: {result.err}")
+            return
+        self.write_packet(result.ok)
 
     def start_feedback_control_loop_async(self):
         if self.control_loop_running:
@@ -0,0 +1,370 @@
+# autopep8: off
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+sys.path.append(os.getcwd())
+from e2e._vspi import test_drivers
+from e2e._vspi.ltd_driver import (
+    LtdDriver,
+    LtdFramer,
+)
+from e2e.lt_bus_vspi.lt_bus_utils import (
+    READ_FC,
+    READ_RESP_FC,
+    WRITE_FC,
+    encode_lt_bus_request,
+    LtBusFramer,
+    LT_BUS_HEADER_SIZE,
+    LT_BUS_TRAILER_SIZE,
+)
+from e2e.crc16 import compute_crc16
+from e2e.latency_histogram import LatencyHistogram
+# autopep8: on
+
+
+PROTOCOL_LTD = 'LTD'
+PROTOCOL_LT_BUS = 'LT-Bus'
+PROTOCOL_UNKNOWN = 'Unknown'
+
+
+class LtBusPoll:
+    slave_id: int
+    fc: int
+    register_address: int
+    size: int
+    data: bytes
+
+    def __init__(self, slave_id: int, fc: int, register_address: int, size: int, data: bytes = b''):
+        self.slave_id = slave_id
+        self.fc = fc
+        self.register_address = register_address
+        self.size = size
+        self.data = data
+        self.request_packet = encode_lt_bus_request(slave_id, fc, register_address, size, data)
+
+
+class HostSession:
+    ''' one accepted VSPI connection '''
+    peer: str
+    protocol: str = PROTOCOL_UNKNOWN
+    device_driver: LtdDriver = None
+
+    rx_msgs: int = 0
+    rx_bytes: int = 0
+    rx_errors: int = 0
+    # CRC valid frames the driver has no msg_type for, e.g. the FLTSQ sequences of LT-RE600
+    rx_unknown_frames: int = 0
+    tx_requests: int = 0
+    timeouts: int = 0
+    msg_counts: dict[str, int]
+    lt_bus_regions: dict[int, bytes]
+    # stages: decode (chunk received -> LTD frame decoded), poll_rtt (LT-Bus READ sent -> READ_RESP received)
+    latency_histograms: dict[str, LatencyHistogram]
+
+    def __init__(self, peer: str):
+        self.peer = peer
+        self.msg_counts = {}
+        self.lt_bus_regions = {}
+        self.latency_histograms = {'decode': LatencyHistogram(), 'poll_rtt': LatencyHistogram()}
+        self.start_ns = time.monotonic_ns()
+        self.stop_ns = None
+
+    def stats(self) -> dict:
+        elapsed_s = max((self.stop_ns or time.monotonic_ns()) - self.start_ns, 1) / 1e9
+        return {
+            'peer': self.peer,
+            'protocol': self.protocol,
+            'protocol_version': list(self.device_driver.protocol_version) if self.device_driver else None,
+            'elapsed_s': round(elapsed_s, 3),
+            'rx_msgs': self.rx_msgs,
+            'rx_bytes': self.rx_bytes,
+            'rx_msgs_per_s': round(self.rx_msgs / elapsed_s, 2),
+            'rx_kbytes_per_s': round(self.rx_bytes / elapsed_s / 1e3, 2),
+            'rx_errors': self.rx_errors,
+            'rx_unknown_frames': self.rx_unknown_frames,
+            'tx_requests': self.tx_requests,
+            'timeouts': self.timeouts,
+            'msg_counts': dict(self.msg_counts),
+            'latency': {stage: histogram.stats() for stage, histogram in self.latency_histograms.items() if histogram.count},
+        }
+
+
+class ChxHost:
+    ''' headless stand-in for the CHX app serial adapter socket, serves one protocol or tells LTD and LT-Bus VSPIs apart by their first bytes '''
+    log_tag: str = '[CHX-HOST]'
+    debug: bool = False
+
+    host: str
+    port: int
+    unix_path: str
+    ltd_drivers: dict[tuple[int, int], LtdDriver]
+    lt_bus_polls: list[LtBusPoll]
+    poll_rate_hz: float
+    protocol: str
+    detect_timeout: float
+    poll_timeout: float
+
+    sessions: list[HostSession]
+    server: asyncio.AbstractServer = None
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 6543,
+        ltd_drivers: list[LtdDriver] = None,
+        lt_bus_polls: list[LtBusPoll] = None,
+        poll_rate_hz: float = 10,
+        detect_timeout: float = 0.5,
+        poll_timeout: float = 0.5,
+        unix_path: str = None,
+        protocol: str = None,
+    ):
+        if ltd_drivers is None:
+            ltd_drivers = [x for x in vars(test_drivers).values() if isinstance(x, LtdDriver)]
+        self.host = host
+        self.port = port
+        # listens on a unix socket instead of TCP when set
+        self.unix_path = unix_path
+        self.ltd_drivers = {tuple(x.protocol_version): x for x in ltd_drivers}
+        self.lt_bus_polls = lt_bus_polls or []
+        self.poll_rate_hz = poll_rate_hz
+        # PROTOCOL_LTD or PROTOCOL_LT_BUS for every connection, None detects it from the first bytes
+        # an LT-Bus device never talks first, so it is only polled when protocol is PROTOCOL_LT_BUS
+        if protocol not in (None, PROTOCOL_LTD, PROTOCOL_LT_BUS):
+            raise Exception(f"Unknown Protocol: {protocol}")
+        self.protocol = protocol
+        # a detected connection that stays silent for detect_timeout is reported, it is not assumed to be LT-Bus
+        self.detect_timeout = detect_timeout
+        self.poll_timeout = poll_timeout
+        self.sessions = []
+        self._session_tasks = set()
+
+    async def start(self):
+        if self.unix_path:
+            self.server = await asyncio.start_unix_server(self._handle_connection, self.unix_path)
+            print(self.log_tag, f"Listening on {self.unix_path}")
+            return
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(self.log_tag, f"Listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for session_task in list(self._session_tasks):
+            session_task.cancel()
+        await asyncio.gather(*self._session_tasks, return_exceptions=True)
+
+    async def serve(self, duration: float = None, report_period: float = None):
+        ''' serves until duration elapses or the task is cancelled, prints the totals every report_period seconds '''
+        await self.start()
+        end_s = None if duration is None else time.monotonic() + duration
+        try:
+            while end_s is None or time.monotonic() < end_s:
+                sleep_s = report_period or 1.0
+                if end_s is not None:
+                    sleep_s = max(min(sleep_s, end_s - time.monotonic()), 0)
+                await asyncio.sleep(sleep_s)
+                if report_period:
+                    self.print_stats()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        session = HostSession(f"{peer[0]}:{peer[1]}" if peer else f"unix-{len(self.sessions)}")
+        self.sessions.append(session)
+        self._session_tasks.add(asyncio.current_task())
+        try:
+            if self.protocol == PROTOCOL_LT_BUS:
+                session.protocol = PROTOCOL_LT_BUS
+                print(self.log_tag, f"{session.peer} LT-Bus Connected")
+                await self._lt_bus_session(session, reader, writer, b'')
+                return
+
+            try:
+                first_chunk = await asyncio.wait_for(reader.read(4096), self.detect_timeout)
+            except asyncio.TimeoutError:
+                if self.protocol is None:
+                    print(self.log_tag, '[WARN]', f"{session.peer} Silent Connection, LT-Bus Devices are only Polled with protocol={PROTOCOL_LT_BUS}")
+                first_chunk = await reader.read(4096)
+            if not first_chunk:
+                return
+
+            device_driver = self.ltd_drivers.get(tuple(first_chunk[:2]), None)
+            if device_driver:
+                # copy, delta decoding keeps per connection state
+                session.device_driver = device_driver.copy()
+                session.protocol = PROTOCOL_LTD
+                print(self.log_tag, f"{session.peer} LTD {first_chunk[0]:02X}{first_chunk[1]:02X} Connected")
+                await self._ltd_session(session, reader, first_chunk)
+            elif self.protocol is None and first_chunk[0] == ord('{'):
+                session.protocol = PROTOCOL_LT_BUS
+                print(self.log_tag, f"{session.peer} LT-Bus Connected")
+                await self._lt_bus_session(session, reader, writer, first_chunk)
+            else:
+                print(self.log_tag, '[WARN]', f"{session.peer} Unknown Protocol: {first_chunk[:8].hex(' ').upper()}")
+                session.rx_bytes += len(first_chunk)
+                while chunk := await reader.read(4096):
+                    session.rx_bytes += len(chunk)
+
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # cancelled by stop(), the session ends like a closed connection
+            pass
+
+        finally:
+            session.stop_ns = time.monotonic_ns()
+            self._session_tasks.discard(asyncio.current_task())
+            writer.close()
+            print(self.log_tag, f"{session.peer} Disconnected")
+
+    async def _ltd_session(self, session: HostSession, reader: asyncio.StreamReader, chunk: bytes):
+        device_driver = session.device_driver
+        ltd_framer = LtdFramer(device_driver.protocol_version)
+        decode_histogram = session.latency_histograms['decode']
+        while chunk:
+            rx_ns = time.monotonic_ns()
+            session.rx_bytes += len(chunk)
+            for packet in ltd_framer.feed(chunk):
+                device_msg_res = device_driver.decode_packet(packet)
+                if device_msg_res.err:
+                    if compute_crc16(packet[:-4]) == packet[-4] | (packet[-3] << 8):
+                        session.rx_unknown_frames += 1
+                        continue
+                    session.rx_errors += 1
+                    if self.debug:
+                        print(self.log_tag, '[ERROR]', session.peer, device_msg_res.err)
+                    continue
+                decode_histogram.record(time.monotonic_ns() - rx_ns)
+                msg_name = device_msg_res.ok.config.msg_name
+                session.msg_counts[msg_name] = session.msg_counts.get(msg_name, 0) + 1
+                session.rx_msgs += 1
+            chunk = await reader.read(4096)
+
+    async def _read_lt_bus_frame(self, session: HostSession, reader: asyncio.StreamReader, lt_bus_framer: LtBusFramer) -> memoryview:
+        chunk = b''
+        while True:
+            bad_frames = lt_bus_framer.bad_frames
+            dropped_bytes = lt_bus_framer.dropped_bytes
+            frame = next(lt_bus_framer.feed(chunk), None)
+            if lt_bus_framer.bad_frames != bad_frames or lt_bus_framer.dropped_bytes != dropped_bytes:
+                session.rx_errors += 1
+            if frame is not None:
+                return frame
+            chunk = await reader.read(4096)
+            if not chunk:
+                raise ConnectionError('LT-Bus Connection Closed')
+            session.rx_bytes += len(chunk)
+
+    async def _lt_bus_session(self, session: HostSession, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, first_chunk: bytes):
+        if not self.lt_bus_polls:
+            print(self.log_tag, '[WARN]', f"{session.peer} No LT-Bus Polls Configured")
+            while await reader.read(4096):
+                pass
+            return
+
+        lt_bus_framer = LtBusFramer()
+        lt_bus_framer.feed(first_chunk)
+        session.rx_bytes += len(first_chunk)
+        poll_rtt_histogram = session.latency_histograms['poll_rtt']
+        period_ns = round(1e9 / self.poll_rate_hz)
+        deadline_ns = time.monotonic_ns()
+        poll_idx = 0
+        while True:
+            now_ns = time.monotonic_ns()
+            if deadline_ns > now_ns:
+                await asyncio.sleep((deadline_ns - now_ns) / 1e9)
+            deadline_ns = max(deadline_ns + period_ns, time.monotonic_ns())
+
+            lt_bus_poll = self.lt_bus_polls[poll_idx]
+            poll_idx = (poll_idx + 1) % len(self.lt_bus_polls)
+            tx_ns = time.monotonic_ns()
+            writer.write(lt_bus_poll.request_packet)
+            await writer.drain()
+            session.tx_requests += 1
+            if lt_bus_poll.fc != READ_FC:
+                continue  # WRITE requests are not acknowledged
+
+            # the bus has one outstanding request, stale responses of timed out polls are skipped
+            try:
+                while True:
+                    frame = await asyncio.wait_for(self._read_lt_bus_frame(session, reader, lt_bus_framer), self.poll_timeout)
+                    if frame[2] == READ_RESP_FC and int.from_bytes(frame[3:5], 'little') == lt_bus_poll.register_address:
+                        break
+            except asyncio.TimeoutError:
+                session.timeouts += 1
+                continue
+
+            poll_rtt_histogram.record(time.monotonic_ns() - tx_ns)
+            session.lt_bus_regions[lt_bus_poll.register_address] = bytes(frame[LT_BUS_HEADER_SIZE:-LT_BUS_TRAILER_SIZE])
+            session.msg_counts[f"0x{lt_bus_poll.register_address:04X}"] = session.msg_counts.get(f"0x{lt_bus_poll.register_address:04X}", 0) + 1
+            session.rx_msgs += 1
+
+    def stats(self) -> dict:
+        sessions_stats = [session.stats() for session in self.sessions]
+        latency_histograms = {'decode': LatencyHistogram(), 'poll_rtt': LatencyHistogram()}
+        for session in self.sessions:
+            for stage, histogram in session.latency_histograms.items():
+                latency_histograms[stage].merge(histogram)
+        return {
+            'sessions': sessions_stats,
+            'connected': sum(1 for session in self.sessions if session.stop_ns is None),
+            'rx_msgs': sum(x['rx_msgs'] for x in sessions_stats),
+            'rx_bytes': sum(x['rx_bytes'] for x in sessions_stats),
+            'rx_msgs_per_s': round(sum(x['rx_msgs_per_s'] for x in sessions_stats if x['elapsed_s']), 2),
+            'rx_errors': sum(x['rx_errors'] for x in sessions_stats),
+            'rx_unknown_frames': sum(x['rx_unknown_frames'] for x in sessions_stats),
+            'timeouts': sum(x['timeouts'] for x in sessions_stats),
+            'latency': {stage: histogram.stats() for stage, histogram in latency_histograms.items() if histogram.count},
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(self.log_tag, 'Stats:', json.dumps({key: value for key, value in stats.items() if key != 'sessions'}), flush=True)
+
+
+def parse_lt_bus_polls(poll_args: list[str], slave_id: int) -> list[LtBusPoll]:
+    ''' ADDRESS:SIZE for READ polls, ADDRESS=HEX_DATA for WRITE polls, ADDRESS in hex '''
+    lt_bus_polls = []
+    for poll_arg in poll_args:
+        if '=' in poll_arg:
+            register_address, data = poll_arg.split('=', 1)
+            data = bytes.fromhex(data)
+            lt_bus_polls.append(LtBusPoll(slave_id, WRITE_FC, int(register_address, 16), len(data), data))
+        else:
+            register_address, size = poll_arg.split(':', 1)
+            lt_bus_polls.append(LtBusPoll(slave_id, READ_FC, int(register_address, 16), int(size)))
+    return lt_bus_polls
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='chx_host', description='Headless CHX Host Stand-in for VSPI and LT-Bus VSPI Emulators', epilog='example: python -m e2e.chx_host --protocol LT-Bus -t 60 -l 0xA000:7 0xD000:4 0xD07E=00004842 -o host.json')
+    parser.add_argument('--host', help='Listen Host', default='127.0.0.1')
+    parser.add_argument('--port', help='Listen Port', type=int, default=6543)
+    parser.add_argument('--protocol', help='Protocol of every Connection, Detected from the First Bytes by Default (LT-Bus Devices never Talk First)', choices=[PROTOCOL_LTD, PROTOCOL_LT_BUS], required=False)
+    parser.add_argument('--unix', help='Listen on this Unix Socket Path Instead of TCP', required=False)
+    parser.add_argument('--duration', '-t', help='Duration in Seconds, Runs Until Ctrl+C by Default', type=float, required=False)
+    parser.add_argument('--lt-bus-polls', '-l', help='LT-Bus Polls as ADDRESS:SIZE (READ) or ADDRESS=HEX_DATA (WRITE)', nargs='*', default=['0xA000:7', '0xD000:4'])
+    parser.add_argument('--slave-id', '-s', help='LT-Bus Slave ID', type=lambda x: int(x, 0), default=0x01)
+    parser.add_argument('--poll-rate', '-r', help='LT-Bus Polls per Second per Connection', type=float, default=10)
+    parser.add_argument('--report-period', '-p', help='Stats Period in Seconds', type=float, default=1.0)
+    parser.add_argument('--output', '-o', help='Write JSON Stats to this File', required=False)
+    parser.add_argument('--debug', help='Print Decode Errors', action='store_true')
+    args = parser.parse_args()
+
+    chx_host = ChxHost(args.host, args.port, lt_bus_polls=parse_lt_bus_polls(args.lt_bus_polls, args.slave_id), poll_rate_hz=args.poll_rate, unix_path=args.unix, protocol=args.protocol)
+    chx_host.debug = args.debug
+    try:
+        asyncio.run(chx_host.serve(args.duration, args.report_period))
+    except KeyboardInterrupt:
+        pass
+
+    print(chx_host.log_tag, 'Summary:', json.dumps(chx_host.stats(), indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(chx_host.stats(), f, indent=2)
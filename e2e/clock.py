@@ -0,0 +1,80 @@
+import time
+from abc import ABC, abstractmethod
+from threading import Lock
+
+
+class Clock(ABC):
+    ''' time source of the emulators, monotonic_ns drives deadlines and time_ns stamps logs '''
+
+    @abstractmethod
+    def monotonic_ns(self) -> int:
+        pass
+
+    @abstractmethod
+    def time_ns(self) -> int:
+        pass
+
+    @abstractmethod
+    def sleep_until(self, deadline_ns: int):
+        pass
+
+    @abstractmethod
+    def spin_until(self, deadline_ns: int):
+        ''' busy waits until deadline_ns, lower wake up jitter than sleep_until at the cost of a CPU core '''
+
+    def sleep(self, seconds: float):
+        self.sleep_until(self.monotonic_ns() + round(seconds * 1e9))
+
+
+class RealClock(Clock):
+    def monotonic_ns(self) -> int:
+        return time.monotonic_ns()
+
+    def time_ns(self) -> int:
+        return time.time_ns()
+
+    def sleep_until(self, deadline_ns: int):
+        remaining_ns = deadline_ns - time.monotonic_ns()
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+
+    def spin_until(self, deadline_ns: int):
+        while time.monotonic_ns() < deadline_ns:
+            pass
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    ''' discrete event clock, sleeping jumps straight to the deadline so scenarios run as fast as the CPU allows,
+    meant to be driven by one scheduling thread '''
+    now_ns: int
+    wall_start_ns: int
+
+    def __init__(self, start_ns: int = 0, wall_start_ns: int = None):
+        self.now_ns = start_ns
+        # wall clock at virtual time 0, timestamps stay reproducible when it is fixed
+        self.wall_start_ns = time.time_ns() if wall_start_ns is None else wall_start_ns
+        self._lock = Lock()
+
+    def monotonic_ns(self) -> int:
+        return self.now_ns
+
+    def time_ns(self) -> int:
+        return self.wall_start_ns + self.now_ns
+
+    def sleep_until(self, deadline_ns: int):
+        with self._lock:
+            if deadline_ns > self.now_ns:
+                self.now_ns = deadline_ns
+
+    spin_until = sleep_until
+
+    def advance(self, ns: int):
+        with self._lock:
+            self.now_ns += ns
+
+
+real_clock = RealClock()
@@ -0,0 +1,269 @@
+# autopep8: off
+import os
+import sys
+import gc
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from threading import Thread
+sys.path.append(os.getcwd())
+from e2e.crc16 import compute_crc16
+from e2e._vspi.ltd_driver import (
+    LtdDriver,
+    DATA_TYPE_FLOAT,
+)
+from e2e._vspi.test_drivers import (
+    ltd_driver_lt_ch000,
+    ltd_driver_lt_ht103,
+    ltd_driver_lt_ht113,
+    ltd_driver_lt_to101,
+    ltd_driver_lt_ev574,
+)
+from e2e.lt_bus_vspi.lt_bus_utils import (
+    READ_FC,
+    WRITE_FC,
+    encode_lt_bus_request,
+)
+from e2e.lt_bus_vspi.lt_bus_vspi import (
+    LTBusVSPI,
+    DeviceBuffer,
+)
+from e2e.transport import (
+    Transport,
+    SocketTransport,
+    TcpTransport,
+    UnixTransport,
+    FdTransport,
+    PtyTransport,
+)
+from e2e.lt_bus_vspi.device_buffers import (
+    lt_re850_config_buffer,
+    lt_re850_data_buffer,
+)
+# autopep8: on
+
+
+BENCH_LTD_DRIVERS: dict[str, LtdDriver] = {
+    'LT-CH000': ltd_driver_lt_ch000,
+    'LT-HT103': ltd_driver_lt_ht103,
+    'LT-HT113': ltd_driver_lt_ht113,
+    'LT-TO101': ltd_driver_lt_to101,
+    'LT-EV574': ltd_driver_lt_ev574,
+}
+BENCH_CRC16_SIZES = [8, 64, 256]
+
+
+def measure(func, calls: list[tuple], number: int) -> dict:
+    ''' runs func over calls until number packets were processed '''
+    rounds = max(1, number // len(calls))
+    packets = rounds * len(calls)
+    for args in calls:
+        func(*args)
+
+    # timing pass
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    t0 = time.perf_counter_ns()
+    for _ in range(rounds):
+        for args in calls:
+            func(*args)
+    elapsed_ns = time.perf_counter_ns() - t0
+
+    # allocation pass, results are kept alive so their blocks stay counted
+    results = [None] * len(calls)
+    tracemalloc.start()
+    blocks_0 = sys.getallocatedblocks()
+    bytes_0 = tracemalloc.get_traced_memory()[0]
+    for idx, args in enumerate(calls):
+        results[idx] = func(*args)
+    bytes_1 = tracemalloc.get_traced_memory()[0]
+    blocks_1 = sys.getallocatedblocks()
+    tracemalloc.stop()
+    del results
+    if gc_enabled:
+        gc.enable()
+
+    return {
+        'packets': packets,
+        'packets_per_sec': round(packets * 1e9 / elapsed_ns, 1),
+        'ns_per_packet': round(elapsed_ns / packets, 1),
+        'blocks_per_packet': round((blocks_1 - blocks_0) / len(calls), 2),
+        'bytes_per_packet': round((bytes_1 - bytes_0) / len(calls), 1),
+    }
+
+
+def ltd_bench_cases(device_model: str, ltd_driver: LtdDriver) -> dict:
+    encode_calls = []
+    for config in ltd_driver.driver_msg_type_config_map.values():
+        msg_value = 1.5 if config.data_type == DATA_TYPE_FLOAT else 1
+        encode_calls.append((0, config.msg_type, msg_value))
+    decode_calls = [(ltd_driver.encode_packet(*args).ok,) for args in encode_calls]
+    fltsq_calls = [([x * 0.5 for x in range(len(encode_calls))],)]
+    return {
+        f"ltd.encode_packet[{device_model}]": (ltd_driver.encode_packet, encode_calls),
+        f"ltd.decode_packet[{device_model}]": (ltd_driver.decode_packet, decode_calls),
+        f"ltd.fltsq_encode[{device_model}]": (ltd_driver.fltsq_encode, fltsq_calls),
+    }
+
+
+def copy_device_buffer(device_buffer: DeviceBuffer) -> DeviceBuffer:
+    ''' private copy of a fixture buffer, the WRITE requests of the benchmark must not change the shared one '''
+    device_buffer_copy = DeviceBuffer(device_buffer.base_address, list(device_buffer.registers_config.values()))
+    device_buffer_copy.write_region(device_buffer.base_address, bytes(device_buffer.buffer))
+    return device_buffer_copy
+
+
+def lt_bus_bench_cases(lt_bus_vspi: LTBusVSPI) -> dict:
+    config_buffer = lt_bus_vspi.device_buffers[0xA000]
+    data_buffer = lt_bus_vspi.device_buffers[0xD000]
+    data_buffer_size = len(data_buffer.buffer)
+    READ_RESP_calls = [
+        (0xA000, bytes(config_buffer.buffer[:7])),
+        (0xD000, bytes(data_buffer.buffer[:4])),
+        (0xD000, bytes(data_buffer.buffer)),
+    ]
+    request_calls = [
+        (encode_lt_bus_request(lt_bus_vspi.lt_bus_slave_id, READ_FC, 0xA000, 7),),
+        (encode_lt_bus_request(lt_bus_vspi.lt_bus_slave_id, READ_FC, 0xD000, 4),),
+        (encode_lt_bus_request(lt_bus_vspi.lt_bus_slave_id, READ_FC, 0xD000, data_buffer_size),),
+        (encode_lt_bus_request(lt_bus_vspi.lt_bus_slave_id, WRITE_FC, 0xD07E, 4, bytes(4)),),
+    ]
+    read_register_calls = [(register_name,) for register_name in data_buffer.registers_config]
+    read_region_calls = [(0xD000, 4), (0xD000, data_buffer_size)]
+    return {
+        'lt_bus.read_register[LT-RE850]': (data_buffer.read_register, read_register_calls),
+        'lt_bus.read_region[LT-RE850]': (data_buffer.read_region, read_region_calls),
+        'lt_bus.encode_READ_RESP_packet[LT-RE850]': (lt_bus_vspi.encode_READ_RESP_packet, READ_RESP_calls),
+        'lt_bus.handle_lt_bus_request[LT-RE850]': (lt_bus_vspi.handle_lt_bus_request, request_calls),
+    }
+
+
+def open_transport_pairs(tmp_dir: str) -> dict[str, tuple[Transport, Transport]]:
+    ''' connected (device, host) transport pairs of every local backend '''
+    transport_pairs = {}
+
+    tcp_listener = socket.create_server(('127.0.0.1', 0))
+    tcp_transport = TcpTransport(*tcp_listener.getsockname())
+    tcp_transport.open()
+    transport_pairs['tcp'] = (tcp_transport, SocketTransport(tcp_listener.accept()[0]))
+    tcp_listener.close()
+
+    unix_path = os.path.join(tmp_dir, 'bench.sock')
+    unix_listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    unix_listener.bind(unix_path)
+    unix_listener.listen(1)
+    unix_transport = UnixTransport(unix_path)
+    unix_transport.open()
+    transport_pairs['unix'] = (unix_transport, SocketTransport(unix_listener.accept()[0]))
+    unix_listener.close()
+
+    pty_transport = PtyTransport()
+    pty_transport.open()
+    transport_pairs['pty'] = (pty_transport, FdTransport(os.open(pty_transport.port_name, os.O_RDWR | os.O_NOCTTY)))
+    return transport_pairs
+
+
+def _transport_send_recv(device_transport: Transport, host_transport: Transport, segments: list[bytes], rx_view: memoryview, size: int):
+    device_transport.sendmsg(segments)
+    rx_size = 0
+    while rx_size < size:
+        rx_size += host_transport.recv_into(rx_view[rx_size:size])
+
+
+def transport_bench_cases(lt_bus_vspi: LTBusVSPI, transport_pairs: dict[str, tuple[Transport, Transport]]) -> dict:
+    # one READ_RESP of the whole data buffer, written as 3 segments and read back on the host side
+    segments = lt_bus_vspi.encode_READ_RESP_segments(0xD000, bytes(lt_bus_vspi.device_buffers[0xD000].buffer))
+    size = sum(len(x) for x in segments)
+    rx_view = memoryview(bytearray(size))
+    return {
+        f"transport.sendmsg[{name}]": (_transport_send_recv, [(device_transport, host_transport, segments, rx_view, size)])
+        for name, (device_transport, host_transport) in transport_pairs.items()
+    }
+
+
+def _drain_socket(_socket: socket.socket):
+    while _socket.recv(65536):
+        pass
+
+
+def run_benchmarks(number: int = 20000, name_filter: str = '') -> dict:
+    # LT-Bus VSPI over a local socket pair, responses are drained by a background thread
+    vspi_socket, host_socket = socket.socketpair()
+    lt_bus_vspi = LTBusVSPI('LT-RE850', [copy_device_buffer(lt_re850_config_buffer), copy_device_buffer(lt_re850_data_buffer)], lt_bus_slave_id=0x01)
+    lt_bus_vspi.debug = False
+    lt_bus_vspi.transport = SocketTransport(vspi_socket)
+    drain_thread = Thread(target=_drain_socket, args=(host_socket,), daemon=True)
+    drain_thread.start()
+
+    bench_cases = {}
+    for device_model, ltd_driver in BENCH_LTD_DRIVERS.items():
+        bench_cases.update(ltd_bench_cases(device_model, ltd_driver))
+    for size in BENCH_CRC16_SIZES:
+        bench_cases[f"crc16.compute_crc16[{size}B]"] = (compute_crc16, [(bytes(x & 0xFF for x in range(size)),)])
+    bench_cases.update(lt_bus_bench_cases(lt_bus_vspi))
+    tmp_dir = tempfile.TemporaryDirectory()
+    transport_pairs = open_transport_pairs(tmp_dir.name)
+    bench_cases.update(transport_bench_cases(lt_bus_vspi, transport_pairs))
+
+    results = {}
+    try:
+        for case_name, (func, calls) in bench_cases.items():
+            if name_filter not in case_name:
+                continue
+            results[case_name] = measure(func, calls, number)
+    finally:
+        for device_transport, host_transport in transport_pairs.values():
+            device_transport.close()
+            host_transport.close()
+        tmp_dir.cleanup()
+        vspi_socket.close()
+        drain_thread.join()
+        host_socket.close()
+
+    return {
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'implementation': sys.implementation.name,
+        'machine': platform.machine(),
+        'number': number,
+        'results': results,
+    }
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    header = f"{'case':<48} {'pkt/s':>12} {'ns/pkt':>10} {'blocks':>8} {'bytes':>8}"
+    print(header if baseline is None else f"{header} {'vs base':>9}")
+    for case_name, result in report['results'].items():
+        line = f"{case_name:<48} {result['packets_per_sec']:>12.0f} {result['ns_per_packet']:>10.1f} {result['blocks_per_packet']:>8.2f} {result['bytes_per_packet']:>8.1f}"
+        if baseline is not None:
+            base_result = baseline['results'].get(case_name, None)
+            if base_result:
+                change = (result['ns_per_packet'] / base_result['ns_per_packet'] - 1) * 100
+                line += f" {change:>+8.1f}%"
+            else:
+                line += f" {'n/a':>9}"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='codec_bench', description='LtdDriver and LT-Bus Codec Micro Benchmarks', epilog='example: python -m e2e.codec_bench -o bench.json -b bench_base.json')
+    parser.add_argument('--number', '-n', help='Packets per Benchmark Case', type=int, default=20000)
+    parser.add_argument('--filter', '-f', help='Only Run Cases Containing this Substring', default='')
+    parser.add_argument('--output', '-o', help='Write JSON Report to this File', required=False)
+    parser.add_argument('--baseline', '-b', help='JSON Report to Compare Against', required=False)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    report = run_benchmarks(args.number, args.filter)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
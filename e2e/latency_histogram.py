@@ -0,0 +1,85 @@
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+MAX_VALUE_BITS = 40  # ~18 minutes in ns
+BUCKET_COUNT = SUB_BUCKET_COUNT + (MAX_VALUE_BITS - SUB_BUCKET_BITS) * SUB_BUCKET_HALF
+
+
+def bucket_index(value: int) -> int:
+    ''' log-linear bucket of value, exact below SUB_BUCKET_COUNT then 16 buckets per power of 2, reported bounds are at most 1/16 (~6%) above the value '''
+    if value < SUB_BUCKET_COUNT:
+        return value if value > 0 else 0
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    index = SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value >> shift) - SUB_BUCKET_HALF
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+
+def bucket_upper_bound(index: int) -> int:
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+    mantissa = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    ''' fixed size HDR style histogram of ns latencies '''
+    counts: list[int]
+    count: int
+    total: int
+    min: int
+    max: int
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.reset()
+
+    def reset(self):
+        for idx in range(BUCKET_COUNT):
+            self.counts[idx] = 0
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value_ns: int):
+        self.counts[bucket_index(value_ns)] += 1
+        if self.count == 0 or value_ns < self.min:
+            self.min = value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+        self.count += 1
+        self.total += value_ns
+
+    def merge(self, other: 'LatencyHistogram'):
+        if other.count == 0:
+            return
+        for idx, count in enumerate(other.counts):
+            if count:
+                self.counts[idx] += count
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, q: float) -> int:
+        ''' upper bound of the bucket holding the q-th percentile, q in [0, 100] '''
+        if self.count == 0:
+            return 0
+        target = max(1, -(-self.count * q // 100))
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_upper_bound(idx), self.max)
+        return self.max
+
+    def stats(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_us': round(self.total / self.count / 1e3, 2) if self.count else 0,
+            'p50_us': round(self.percentile(50) / 1e3, 2),
+            'p95_us': round(self.percentile(95) / 1e3, 2),
+            'p99_us': round(self.percentile(99) / 1e3, 2),
+            'max_us': round(self.max / 1e3, 2),
+        }
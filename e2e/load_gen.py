@@ -0,0 +1,297 @@
+# autopep8: off
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import asyncio
+import argparse
+import multiprocessing
+sys.path.append(os.getcwd())
+from e2e._vspi.vspi import VSPI
+from e2e._vspi.async_vspi import AsyncVSPI
+from e2e._vspi.stream_scheduler import (
+    SchedulerStream,
+    StreamScheduler,
+)
+from e2e.latency_histogram import LatencyHistogram
+# autopep8: on
+
+
+LOG_TAG = '[LOAD-GEN]'
+COUNTER_NAMES = ('tx_msgs', 'tx_bytes', 'tx_stalls', 'tx_stall_ns', 'skipped_ticks')
+
+
+def device_templates() -> dict[str, VSPI]:
+    ''' test VSPIs that stream at least one READ_ msg, by device model '''
+    from e2e._vspi import test_vspis
+    return {x.device_model: x for x in vars(test_vspis).values() if isinstance(x, VSPI) and x.read_msg_types}
+
+
+class LoadGenVSPI(AsyncVSPI):
+    ''' AsyncVSPI streaming random READ_ msgs from a StreamScheduler, counts throughput and send buffer stalls '''
+    tx_msgs: int = 0
+    tx_bytes: int = 0
+    tx_stalls: int = 0
+    tx_stall_ns: int = 0
+    scheduler_stream: SchedulerStream = None
+
+    @property
+    def skipped_ticks(self) -> int:
+        return self.scheduler_stream.skipped_ticks if self.scheduler_stream else 0
+
+    def write_packet(self, packet: bytes, msg_type: int = None):
+        self.tx_bytes += len(packet)
+        super().write_packet(packet, msg_type)
+
+    async def drain(self):
+        # drain() only blocks once the transport buffer is above its high water mark, i.e. the host is not keeping up
+        transport = self.stream_writer.transport
+        if transport.get_write_buffer_size() <= transport.get_write_buffer_limits()[1]:
+            await self.stream_writer.drain()
+            return
+        self.tx_stalls += 1
+        stall_start_ns = time.monotonic_ns()
+        await self.stream_writer.drain()
+        self.tx_stall_ns += time.monotonic_ns() - stall_start_ns
+
+    async def write_stream_items(self, items: list[tuple[int, int, int | float]]):
+        ''' StreamScheduler writer, ticks of a device that is not connected are dropped '''
+        if not self.control_loop_running:
+            return
+        self.write_items(items)
+        self.tx_msgs += len(items)
+        await self.drain()
+
+    async def run_control(self):
+        ''' feedback control loop of a connected device until the connection closes '''
+        if not self.stream_writer:
+            return
+        try:
+            await self.feedback_control_loop()
+        finally:
+            await self.disconnect()
+
+    def counters(self) -> dict[str, int]:
+        return {x: getattr(self, x) for x in COUNTER_NAMES}
+
+    def feedback_histogram(self) -> LatencyHistogram:
+        ''' rx -> feedback sent latency of every msg_type '''
+        histogram = LatencyHistogram()
+        for msg_type_histograms in self.latency_histograms.values():
+            histogram.merge(msg_type_histograms['total'])
+        return histogram
+
+
+def worker_snapshot(load_gen_vspis: list[LoadGenVSPI]) -> dict:
+    snapshot = {x: 0 for x in COUNTER_NAMES}
+    snapshot['devices'] = len(load_gen_vspis)
+    snapshot['connected'] = 0
+    snapshot['feedback'] = LatencyHistogram()
+    for load_gen_vspi in load_gen_vspis:
+        for counter_name, value in load_gen_vspi.counters().items():
+            snapshot[counter_name] += value
+        snapshot['connected'] += load_gen_vspi.control_loop_running
+        snapshot['feedback'].merge(load_gen_vspi.feedback_histogram())
+    return snapshot
+
+
+async def _run_worker(devices: list[tuple[str, str, int]], rate_hz: float, duration: float, report_period: float, report):
+    templates = device_templates()
+    load_gen_vspis = []
+    for device_model, host, port in devices:
+        template = templates[device_model]
+        load_gen_vspi = LoadGenVSPI(device_model, template.device_driver.copy(), template.control_feedback_map, host, port)
+        load_gen_vspi.device_cfg2 = template.device_cfg2
+        load_gen_vspi.debug = False
+        load_gen_vspis.append(load_gen_vspi)
+
+    # one scheduler per worker drives the streams of every device on its event loop
+    stream_scheduler = StreamScheduler()
+    for idx, load_gen_vspi in enumerate(load_gen_vspis):
+        load_gen_vspi.scheduler_stream = stream_scheduler.add_stream(f"{load_gen_vspi.device_model}-{idx}", rate_hz, load_gen_vspi._rand_msgs, load_gen_vspi.write_stream_items)
+
+    await asyncio.gather(*[x.connect() for x in load_gen_vspis])
+    run_tasks = [asyncio.create_task(x.run_control()) for x in load_gen_vspis]
+    stream_task = asyncio.create_task(stream_scheduler.run_on_event_loop(duration))
+    end_s = None if duration is None else time.monotonic() + duration
+    try:
+        while not all(x.done() for x in run_tasks):
+            if end_s is not None and time.monotonic() >= end_s:
+                break
+            await asyncio.sleep(report_period if end_s is None else max(min(report_period, end_s - time.monotonic()), 0))
+            if not report(worker_snapshot(load_gen_vspis), False):
+                break
+    finally:
+        stream_scheduler.stop()
+        stream_task.cancel()
+        for run_task in run_tasks:
+            run_task.cancel()
+        await asyncio.gather(stream_task, *run_tasks, return_exceptions=True)
+    report(worker_snapshot(load_gen_vspis), True)
+
+
+def run_worker(worker_id: int, devices: list[tuple[str, str, int]], rate_hz: float, duration: float, report_period: float, stats_queue, stop_event):
+    ''' pool worker, hosts its shard of devices on one event loop and reports (worker_id, snapshot, final) to stats_queue '''
+    def report(snapshot: dict, final: bool) -> bool:
+        stats_queue.put((worker_id, snapshot, final))
+        return not stop_event.is_set()
+
+    asyncio.run(_run_worker(devices, rate_hz, duration, report_period, report))
+
+
+def _ignore_sigint():
+    # Ctrl+C is handled by the parent, which stops the workers through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def shard_devices(device_models: list[str], hosts: list[tuple[str, int]], workers: int) -> list[list[tuple[str, str, int]]]:
+    ''' assigns devices round robin to hosts, then round robin to workers '''
+    shards = [[] for _ in range(min(workers, len(device_models)))]
+    for idx, device_model in enumerate(device_models):
+        host, port = hosts[idx % len(hosts)]
+        shards[idx % len(shards)].append((device_model, host, port))
+    return shards
+
+
+def aggregate_snapshots(snapshots: dict[int, dict]) -> dict:
+    aggregate = {x: 0 for x in COUNTER_NAMES}
+    aggregate['devices'] = 0
+    aggregate['connected'] = 0
+    aggregate['feedback'] = LatencyHistogram()
+    for snapshot in snapshots.values():
+        for key in COUNTER_NAMES + ('devices', 'connected'):
+            aggregate[key] += snapshot[key]
+        aggregate['feedback'].merge(snapshot['feedback'])
+    return aggregate
+
+
+def print_live_stats(elapsed_s: float, aggregate: dict, previous: dict, interval_s: float):
+    interval_s = max(interval_s, 1e-9)
+    feedback = aggregate['feedback'].stats()
+    print(
+        LOG_TAG,
+        f"t={elapsed_s:.1f}s",
+        f"devices={aggregate['connected']}/{aggregate['devices']}",
+        f"tx={(aggregate['tx_msgs'] - previous['tx_msgs']) / interval_s:.0f}msg/s",
+        f"{(aggregate['tx_bytes'] - previous['tx_bytes']) / interval_s / 1e3:.1f}KB/s",
+        f"stalls={aggregate['tx_stalls']}(+{aggregate['tx_stalls'] - previous['tx_stalls']})",
+        f"skipped={aggregate['skipped_ticks']}",
+        f"feedback n={feedback['count']} p50={feedback['p50_us']}us p99={feedback['p99_us']}us",
+        flush=True,
+    )
+
+
+def run_load_gen(
+    device_models: list[str],
+    hosts: list[tuple[str, int]],
+    rate_hz: float,
+    workers: int,
+    duration: float = None,
+    report_period: float = 1.0,
+    quiet: bool = False,
+) -> dict:
+    ''' runs until duration elapses, every device disconnects or Ctrl+C, returns the aggregated stats '''
+    templates = device_templates()
+    for device_model in device_models:
+        if device_model not in templates:
+            raise Exception(f"Unknown Device Model: {device_model}")
+    if rate_hz <= 0:
+        raise Exception('Invalid Stream Rate')
+
+    shards = shard_devices(device_models, hosts, workers)
+    snapshots: dict[int, dict] = {}
+    final_worker_ids = set()
+    start_s = time.monotonic()
+    with multiprocessing.Manager() as manager, multiprocessing.Pool(len(shards), initializer=_ignore_sigint) as pool:
+        stats_queue = manager.Queue()
+        stop_event = manager.Event()
+        result = pool.starmap_async(run_worker, [(idx, shard, rate_hz, duration, report_period, stats_queue, stop_event) for idx, shard in enumerate(shards)])
+
+        previous = aggregate_snapshots({})
+        previous_s = start_s
+        try:
+            while len(final_worker_ids) < len(shards):
+                try:
+                    worker_id, snapshot, final = stats_queue.get(timeout=report_period)
+                    snapshots[worker_id] = snapshot
+                    if final:
+                        final_worker_ids.add(worker_id)
+                except queue.Empty:
+                    pass
+                if result.ready() and not result.successful():
+                    result.get()  # raises the worker error
+
+                now_s = time.monotonic()
+                if now_s - previous_s >= report_period:
+                    aggregate = aggregate_snapshots(snapshots)
+                    if not quiet:
+                        print_live_stats(now_s - start_s, aggregate, previous, now_s - previous_s)
+                    previous, previous_s = aggregate, now_s
+
+        except KeyboardInterrupt:
+            stop_event.set()
+            while len(final_worker_ids) < len(shards) and not result.ready():
+                try:
+                    worker_id, snapshot, final = stats_queue.get(timeout=report_period)
+                    snapshots[worker_id] = snapshot
+                    if final:
+                        final_worker_ids.add(worker_id)
+                except queue.Empty:
+                    pass
+
+        result.wait()
+
+    elapsed_s = max(time.monotonic() - start_s, 1e-9)
+    aggregate = aggregate_snapshots(snapshots)
+    return {
+        'devices': aggregate['devices'],
+        'workers': len(shards),
+        'rate_hz': rate_hz,
+        'elapsed_s': round(elapsed_s, 3),
+        'tx_msgs': aggregate['tx_msgs'],
+        'tx_bytes': aggregate['tx_bytes'],
+        'tx_msgs_per_s': round(aggregate['tx_msgs'] / elapsed_s, 2),
+        'tx_kbytes_per_s': round(aggregate['tx_bytes'] / elapsed_s / 1e3, 2),
+        'tx_stalls': aggregate['tx_stalls'],
+        'tx_stall_ms': round(aggregate['tx_stall_ns'] / 1e6, 3),
+        'skipped_ticks': aggregate['skipped_ticks'],
+        'feedback_latency': aggregate['feedback'].stats(),
+    }
+
+
+def parse_devices(device_args: list[str]) -> list[str]:
+    ''' MODEL or MODEL:COUNT '''
+    device_models = []
+    for device_arg in device_args:
+        device_model, _, count = device_arg.partition(':')
+        device_models.extend([device_model] * int(count or 1))
+    return device_models
+
+
+def parse_hosts(host_args: list[str]) -> list[tuple[str, int]]:
+    ''' HOST:PORT or PORT on 127.0.0.1 '''
+    hosts = []
+    for host_arg in host_args:
+        host, _, port = host_arg.rpartition(':')
+        hosts.append((host or '127.0.0.1', int(port)))
+    return hosts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='load_gen', description='Multi Device VSPI Load Generator', epilog='example: python -m e2e.load_gen -d LT-HT103:32 LT-TO101:32 -r 50 -H 6543 6544 -w 4 -t 60')
+    parser.add_argument('--devices', '-d', help='Device Models as MODEL or MODEL:COUNT', nargs='+', required=True)
+    parser.add_argument('--rate', '-r', help='Stream Rate per Device in Hz', type=float, default=5)
+    parser.add_argument('--hosts', '-H', help='Host Ports as HOST:PORT or PORT, Devices are Spread Round Robin', nargs='+', default=['127.0.0.1:6543'])
+    parser.add_argument('--workers', '-w', help='Worker Processes', type=int, default=os.cpu_count())
+    parser.add_argument('--duration', '-t', help='Duration in Seconds, Runs Until Ctrl+C by Default', type=float, required=False)
+    parser.add_argument('--report-period', '-p', help='Live Stats Period in Seconds', type=float, default=1.0)
+    parser.add_argument('--output', '-o', help='Write JSON Summary to this File', required=False)
+    args = parser.parse_args()
+
+    summary = run_load_gen(parse_devices(args.devices), parse_hosts(args.hosts), args.rate, args.workers, args.duration, args.report_period)
+    print(LOG_TAG, 'Summary:', json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
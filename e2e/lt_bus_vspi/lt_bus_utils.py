@@ -1,3 +1,7 @@
+import struct
+from e2e.crc16 import compute_crc16
+
+
 READ_FC = 0xAA
 READ_RESP_FC = 0xAB
 WRITE_FC = 0xEA
@@ -12,91 +16,173 @@ DATA_TYPES = {
     'u8': {
         'size': 1,
         'bin_decoder': 'B',
+        'np_dtype': 'u1',
     },
     'u16': {
         'size': 2,
         'bin_decoder': '<H',
+        'np_dtype': '<u2',
     },
     'u32': {
         'size': 4,
         'bin_decoder': '<L',
+        'np_dtype': '<u4',
     },
     'u64': {
         'size': 8,
         'bin_decoder': '<Q',
+        'np_dtype': '<u8',
     },
 
     'i8': {
         'size': 1,
         'bin_decoder': 'b',
+        'np_dtype': 'i1',
     },
     'i16': {
         'size': 2,
         'bin_decoder': '<h',
+        'np_dtype': '<i2',
     },
     'i32': {
         'size': 4,
         'bin_decoder': '<l',
+        'np_dtype': '<i4',
     },
     'i64': {
         'size': 8,
         'bin_decoder': '<q',
+        'np_dtype': '<i8',
     },
 
     'f32': {
         'size': 4,
         'bin_decoder': '<f',
+        'np_dtype': '<f4',
     },
     'f64': {
         'size': 8,
         'bin_decoder': '<d',
+        'np_dtype': '<f8',
     }
 }
-
-
-def compute_crc16(buffer: bytes) -> int:
-    CRC16_POLYNOMIAL = [
-        0x0000, 0x1189, 0x2312, 0x329B, 0x4624, 0x57AD, 0x6536, 0x74BF,
-        0x8C48, 0x9DC1, 0xAF5A, 0xBED3, 0xCA6C, 0xDBE5, 0xE97E, 0xF8F7,
-        0x1081, 0x0108, 0x3393, 0x221A, 0x56A5, 0x472C, 0x75B7, 0x643E,
-        0x9CC9, 0x8D40, 0xBFDB, 0xAE52, 0xDAED, 0xCB64, 0xF9FF, 0xE876,
-        0x2102, 0x308B, 0x0210, 0x1399, 0x6726, 0x76AF, 0x4434, 0x55BD,
-        0xAD4A, 0xBCC3, 0x8E58, 0x9FD1, 0xEB6E, 0xFAE7, 0xC87C, 0xD9F5,
-        0x3183, 0x200A, 0x1291, 0x0318, 0x77A7, 0x662E, 0x54B5, 0x453C,
-        0xBDCB, 0xAC42, 0x9ED9, 0x8F50, 0xFBEF, 0xEA66, 0xD8FD, 0xC974,
-        0x4204, 0x538D, 0x6116, 0x709F, 0x0420, 0x15A9, 0x2732, 0x36BB,
-        0xCE4C, 0xDFC5, 0xED5E, 0xFCD7, 0x8868, 0x99E1, 0xAB7A, 0xBAF3,
-        0x5285, 0x430C, 0x7197, 0x601E, 0x14A1, 0x0528, 0x37B3, 0x263A,
-        0xDECD, 0xCF44, 0xFDDF, 0xEC56, 0x98E9, 0x8960, 0xBBFB, 0xAA72,
-        0x6306, 0x728F, 0x4014, 0x519D, 0x2522, 0x34AB, 0x0630, 0x17B9,
-        0xEF4E, 0xFEC7, 0xCC5C, 0xDDD5, 0xA96A, 0xB8E3, 0x8A78, 0x9BF1,
-        0x7387, 0x620E, 0x5095, 0x411C, 0x35A3, 0x242A, 0x16B1, 0x0738,
-        0xFFCF, 0xEE46, 0xDCDD, 0xCD54, 0xB9EB, 0xA862, 0x9AF9, 0x8B70,
-        0x8408, 0x9581, 0xA71A, 0xB693, 0xC22C, 0xD3A5, 0xE13E, 0xF0B7,
-        0x0840, 0x19C9, 0x2B52, 0x3ADB, 0x4E64, 0x5FED, 0x6D76, 0x7CFF,
-        0x9489, 0x8500, 0xB79B, 0xA612, 0xD2AD, 0xC324, 0xF1BF, 0xE036,
-        0x18C1, 0x0948, 0x3BD3, 0x2A5A, 0x5EE5, 0x4F6C, 0x7DF7, 0x6C7E,
-        0xA50A, 0xB483, 0x8618, 0x9791, 0xE32E, 0xF2A7, 0xC03C, 0xD1B5,
-        0x2942, 0x38CB, 0x0A50, 0x1BD9, 0x6F66, 0x7EEF, 0x4C74, 0x5DFD,
-        0xB58B, 0xA402, 0x9699, 0x8710, 0xF3AF, 0xE226, 0xD0BD, 0xC134,
-        0x39C3, 0x284A, 0x1AD1, 0x0B58, 0x7FE7, 0x6E6E, 0x5CF5, 0x4D7C,
-        0xC60C, 0xD785, 0xE51E, 0xF497, 0x8028, 0x91A1, 0xA33A, 0xB2B3,
-        0x4A44, 0x5BCD, 0x6956, 0x78DF, 0x0C60, 0x1DE9, 0x2F72, 0x3EFB,
-        0xD68D, 0xC704, 0xF59F, 0xE416, 0x90A9, 0x8120, 0xB3BB, 0xA232,
-        0x5AC5, 0x4B4C, 0x79D7, 0x685E, 0x1CE1, 0x0D68, 0x3FF3, 0x2E7A,
-        0xE70E, 0xF687, 0xC41C, 0xD595, 0xA12A, 0xB0A3, 0x8238, 0x93B1,
-        0x6B46, 0x7ACF, 0x4854, 0x59DD, 0x2D62, 0x3CEB, 0x0E70, 0x1FF9,
-        0xF78F, 0xE606, 0xD49D, 0xC514, 0xB1AB, 0xA022, 0x92B9, 0x8330,
-        0x7BC7, 0x6A4E, 0x58D5, 0x495C, 0x3DE3, 0x2C6A, 0x1EF1, 0x0F78,
-    ]
-
-    res = 0xffff
-    for b in buffer:
-        res = (res >> 8) ^ CRC16_POLYNOMIAL[(res ^ b) & 0xff]
-    return (~res) & 0xffff
+# compiled once, registers of the same type share them
+DATA_TYPE_STRUCTS = {data_type: struct.Struct(info['bin_decoder']) for data_type, info in DATA_TYPES.items()}
 
 
 def u16_to_2u8(num: int) -> bytes:
     lsb = num & 0xFF
     msb = (num >> 8) & 0xFF
     return bytes([lsb, msb])
+
+
+def encode_lt_bus_request(slave_id: int, fc: int, register_address: int, size: int, data: bytes = b'') -> bytes:
+    request_packet = bytes([ord('{'), slave_id, fc])
+    request_packet += register_address.to_bytes(2, 'little')
+    request_packet += size.to_bytes(2, 'little')
+    request_packet += data
+    request_packet += u16_to_2u8(compute_crc16(request_packet))
+    request_packet += b'}'
+    return request_packet
+
+
+LT_BUS_HEADER_SIZE = 7  # '{', slave_id, fc, register_address[2], size[2]
+LT_BUS_TRAILER_SIZE = 3  # crc16[2], '}'
+# far above any emulated register map, a larger size is taken as a corrupted header
+LT_BUS_MAX_DATA_SIZE = 0x1000
+
+
+class LtBusFramer:
+    ''' splits an LT-Bus byte stream into frames, the frame length is taken from the header fc and size,
+    bytes before '{' and frames with a bad CRC-16 or delimiter are dropped and parsing resyncs on the next '{' '''
+    RECV_MIN_SIZE = LT_BUS_HEADER_SIZE + LT_BUS_MAX_DATA_SIZE + LT_BUS_TRAILER_SIZE
+
+    buffer: bytearray
+    start: int = 0
+    end: int = 0
+    dropped_bytes: int = 0
+    bad_frames: int = 0
+
+    def __init__(self, buffer_size: int = 65536):
+        self.buffer = bytearray(max(buffer_size, LtBusFramer.RECV_MIN_SIZE))
+
+    def _reserve(self, size: int):
+        if self.end + size <= len(self.buffer):
+            return
+        pending_size = self.end - self.start
+        if pending_size + size > len(self.buffer):
+            # a new buffer, frames handed out before keep pointing to the old one
+            buffer = bytearray(pending_size + size)
+            buffer[:pending_size] = self.buffer[self.start:self.end]
+            self.buffer = buffer
+        else:
+            self.buffer[:pending_size] = self.buffer[self.start:self.end]
+        self.start = 0
+        self.end = pending_size
+
+    def recv_into(self, transport) -> int:
+        ''' reads as much as the free buffer space allows straight from transport, returns 0 on EOF '''
+        self._reserve(LtBusFramer.RECV_MIN_SIZE)
+        rx_size = transport.recv_into(memoryview(self.buffer)[self.end:])
+        self.end += rx_size
+        return rx_size
+
+    def feed(self, chunk: bytes | memoryview):
+        ''' buffers chunk and returns an iterator over every complete frame '''
+        if chunk:
+            chunk_size = len(chunk)
+            self._reserve(chunk_size)
+            self.buffer[self.end:self.end + chunk_size] = chunk
+            self.end += chunk_size
+        return self.frames()
+
+    def _resync(self, start: int):
+        next_start = self.buffer.find(b'{', start + 1, self.end)
+        if next_start == -1:
+            next_start = self.end
+        self.dropped_bytes += next_start - start
+        self.start = next_start
+
+    def frames(self):
+        ''' yields memoryviews of the buffered frames, a frame is only valid until the next recv_into or feed '''
+        buffer = self.buffer
+        buffer_view = memoryview(buffer)
+        while self.end - self.start >= LT_BUS_HEADER_SIZE:
+            start = self.start
+            if buffer[start] != 0x7B:  # '{'
+                self._resync(start)
+                continue
+
+            fc = buffer[start + 2]
+            if fc in (READ_RESP_FC, WRITE_FC):
+                data_size = buffer[start + 5] | (buffer[start + 6] << 8)
+                if data_size > LT_BUS_MAX_DATA_SIZE:
+                    self.bad_frames += 1
+                    self._resync(start)
+                    continue
+            elif fc in fc_set:
+                data_size = 0
+            else:
+                self.bad_frames += 1
+                self._resync(start)
+                continue
+
+            frame_end = start + LT_BUS_HEADER_SIZE + data_size + LT_BUS_TRAILER_SIZE
+            if frame_end > self.end:
+                break
+            packet_crc16 = buffer[frame_end - 3] | (buffer[frame_end - 2] << 8)
+            if buffer[frame_end - 1] != 0x7D or packet_crc16 != compute_crc16(buffer_view[start:frame_end - 3]):  # '}'
+                self.bad_frames += 1
+                self._resync(start)
+                continue
+
+            self.start = frame_end
+            yield buffer_view[start:frame_end]
+
+        if self.start == self.end:
+            self.start = 0
+            self.end = 0
+
+    def reset(self):
+        self.start = 0
+        self.end = 0
@@ -1,18 +1,43 @@
-import serial
+import os
+import mmap
+import time
 import struct
-import socket
+import bisect
 from enum import Enum
+from collections import OrderedDict
+from multiprocessing import (
+    shared_memory,
+    resource_tracker,
+)
 
+from e2e.crc16 import Crc16
+from e2e.result import Result
+from e2e.clock import (
+    Clock,
+    real_clock,
+)
 from e2e.lt_bus_vspi.lt_bus_utils import (
     DATA_TYPES,
+    DATA_TYPE_STRUCTS,
     REQUEST_PACKET_MIN_SIZE,
     compute_crc16,
     fc_set,
     READ_RESP_FC,
     u16_to_2u8,
     READ_FC,
-    WRITE_FC,
     LT_BUS_PACKET_DATA_START,
+    LtBusFramer,
+)
+from e2e.transport import (
+    Transport,
+    TcpTransport,
+    SerialTransport,
+)
+from e2e.traffic_log import (
+    TrafficRecorder,
+    DIRECTION_RX,
+    DIRECTION_TX,
+    MSG_TYPE_UNKNOWN,
 )
 
 
@@ -27,6 +52,8 @@ class DeviceRegisterConfig:
     data_type: str
     size: int
     binary_decoder: str
+    # None for u8[] registers, they are read and written as raw bytes
+    binary_struct: struct.Struct
 
     def __init__(
         self,
@@ -42,29 +69,49 @@ class DeviceRegisterConfig:
         if data_type == 'u8[]':
             self.size = size
             self.binary_decoder = 'B[]'
+            self.binary_struct = None
 
         else:
             data_type_info = DATA_TYPES[data_type]
             self.size = data_type_info['size']
             self.binary_decoder = data_type_info['bin_decoder']
+            self.binary_struct = DATA_TYPE_STRUCTS[data_type]
 
     def copy(self) -> 'DeviceRegisterConfig':
         clone_object = DeviceRegisterConfig(self.register_name, self.offset, self.data_type)
         clone_object.size = self.size
         clone_object.binary_decoder = self.binary_decoder
+        clone_object.binary_struct = self.binary_struct
         return clone_object
 
 
+# seqlock word in front of the registers of shared buffers, odd while a write is in progress
+SEQLOCK_HEADER_SIZE = 8
+
+
 class DeviceBuffer:
+    ''' registers of a device, the buffer is a local bytearray or lives in shared memory / a memory-mapped file
+    so other processes can attach to it by name, one process should write at a time '''
     base_address: int
     registers_config: dict[str, DeviceRegisterConfig]
 
-    buffer: bytearray
+    buffer: bytearray | memoryview
+    shared_memory_name: str = None
+    mmap_path: str = None
+    _shm: shared_memory.SharedMemory = None
+    _mmap: mmap.mmap = None
+    _owner: bool = False
+    # seqlock word, a single u64
+    _seq: memoryview
+    _view: 'DeviceRegisterView' = None
 
     def __init__(
         self,
         base_address: int,
         device_registers: list[DeviceRegisterConfig],
+        shared_memory_name: str = None,
+        mmap_path: str = None,
+        attach: bool = False,
     ):
         self.base_address = base_address
         self.registers_config = {}
@@ -73,19 +120,111 @@ class DeviceBuffer:
         for dr in device_registers:
             buffer_size += dr.size
             self.registers_config[dr.register_name] = dr
-        self.buffer = bytearray(buffer_size)
 
-    def read_register(self, register_name: str):
+        if shared_memory_name is not None:
+            self.shared_memory_name = shared_memory_name
+            if attach:
+                self._shm = shared_memory.SharedMemory(shared_memory_name)
+                # the creating process owns the segment, the resource tracker must not unlink it when this one exits
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+            else:
+                self._shm = shared_memory.SharedMemory(shared_memory_name, create=True, size=SEQLOCK_HEADER_SIZE + buffer_size)
+                self._owner = True
+            self._map_shared(self._shm.buf, buffer_size)
+
+        elif mmap_path is not None:
+            self.mmap_path = mmap_path
+            with open(mmap_path, 'r+b' if attach else 'w+b') as f:
+                if not attach:
+                    f.truncate(SEQLOCK_HEADER_SIZE + buffer_size)
+                    self._owner = True
+                self._mmap = mmap.mmap(f.fileno(), 0)
+            self._map_shared(memoryview(self._mmap), buffer_size)
+
+        else:
+            self._seq = memoryview(bytearray(SEQLOCK_HEADER_SIZE)).cast('Q')
+            self.buffer = bytearray(buffer_size)
+
+    def _map_shared(self, shared_buffer: memoryview, buffer_size: int):
+        if len(shared_buffer) < SEQLOCK_HEADER_SIZE + buffer_size:
+            if self._shm is not None:
+                self._shm.close()
+            else:
+                shared_buffer.release()
+                self._mmap.close()
+            raise Exception('Shared Device Buffer too Small')
+        self._seq = shared_buffer[:SEQLOCK_HEADER_SIZE].cast('Q')
+        self.buffer = shared_buffer[SEQLOCK_HEADER_SIZE:SEQLOCK_HEADER_SIZE + buffer_size]
+
+    @property
+    def is_shared(self) -> bool:
+        return self._shm is not None or self._mmap is not None
+
+    @property
+    def version(self) -> int:
+        ''' completed writes through write_region, write_register and view assignments,
+        writes through read_region views are not tracked '''
+        return self._seq[0] >> 1
+
+    def begin_write(self):
+        self._seq[0] += 1
+
+    def end_write(self):
+        self._seq[0] += 1
+
+    def read_consistent(self, read_func, timeout: float = 1.0):
+        ''' retries read_func until no write ran during it, snapshots of several registers are never torn,
+        raises if a write stays in progress past timeout, e.g. its process died mid-write '''
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = self._seq[0]
+            if not seq & 1:
+                value = read_func()
+                if self._seq[0] == seq:
+                    return value
+            if time.monotonic() > deadline:
+                raise Exception('Device Buffer Write in Progress Timeout')
+            # let the writer run
+            time.sleep(0)
+
+    def snapshot(self, start_address: int = None, size: int = None) -> bytes:
+        ''' consistent copy of a region, the whole buffer by default '''
+        if start_address is None:
+            return self.read_consistent(lambda: bytes(self.buffer))
+        return self.read_consistent(lambda: bytes(self.read_region(start_address, size)))
+
+    def close(self):
+        ''' detaches a shared buffer, the creating process also removes it, views handed out must be released first '''
+        if not self.is_shared:
+            return
+        self._view = None
+        self.buffer.release()
+        self._seq.release()
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+        else:
+            self._mmap.close()
+            if self._owner:
+                os.remove(self.mmap_path)
+            self._mmap = None
+
+    def read_register(self, register_name: str) -> int | float | memoryview:
+        ''' u8[] registers are returned as a memoryview of the buffer, like read_region '''
         register_config = self.registers_config.get(register_name, None)
         if not register_config:
             raise Exception('Register Name not Found')
 
-        register_buffer = self.buffer[register_config.offset:register_config.offset + register_config.size]
-        return struct.unpack(register_config.binary_decoder, register_buffer)[0]
+        if register_config.binary_struct is None:
+            return memoryview(self.buffer)[register_config.offset:register_config.offset + register_config.size]
+        return register_config.binary_struct.unpack_from(self.buffer, register_config.offset)[0]
 
-    def read_region(self, start_address: int, size: int) -> bytes:
+    def read_region(self, start_address: int, size: int) -> memoryview:
+        ''' live view of the buffer without copying it, later writes show through '''
         offset = start_address - self.base_address
-        buffer_data = self.buffer[offset: offset + size]
+        buffer_data = memoryview(self.buffer)[offset: offset + size]
         # # TODO: handle device error message ACK packet
         # if offset == 0x007:
         #     self.buffer[offset: offset + size] = bytes(size)
@@ -94,20 +233,54 @@ class DeviceBuffer:
 
     def write_region(self, start_address: int, data: bytes):
         offset = start_address - self.base_address
-        self.buffer[offset: offset + len(data)] = data
+        if offset < 0 or offset + len(data) > len(self.buffer):
+            raise Exception('Register Region Out of Range')
+        self.begin_write()
+        try:
+            self.buffer[offset: offset + len(data)] = data
+        finally:
+            self.end_write()
 
     def write_register(self, register_name: str, value: int | float | bytes) -> int | float | bytes:
         register_config = self.registers_config.get(register_name, None)
         if not register_config:
             raise Exception('Register Name not Found')
 
-        if register_config.data_type == 'u8[]':
-            self.buffer[register_config.offset:register_config.offset + len(value)] = value
-            return value
+        binary_struct = register_config.binary_struct
+        if binary_struct is None:
+            if len(value) > register_config.size:
+                raise Exception('Register Value too Large')
+            value_buffer = value
+        else:
+            # packed before the write starts, a bad value must not leave the seqlock odd
+            value_buffer = binary_struct.pack(value)
 
-        value_buffer = struct.pack(register_config.binary_decoder, value)
-        self.buffer[register_config.offset:register_config.offset + register_config.size] = value_buffer
-        return struct.unpack(register_config.binary_decoder, self.buffer[register_config.offset:register_config.offset + register_config.size])[0]
+        self.begin_write()
+        try:
+            self.buffer[register_config.offset:register_config.offset + len(value_buffer)] = value_buffer
+        finally:
+            self.end_write()
+        if binary_struct is None:
+            return value
+        # the stored value, e.g. f32 rounding
+        return binary_struct.unpack_from(self.buffer, register_config.offset)[0]
+
+    def register_dtype(self):
+        ''' numpy structured dtype of the registers, field offsets match the buffer layout '''
+        import numpy as np
+        names, formats, offsets = [], [], []
+        for rc in self.registers_config.values():
+            names.append(rc.register_name)
+            formats.append(('u1', (rc.size,)) if rc.data_type == 'u8[]' else DATA_TYPES[rc.data_type]['np_dtype'])
+            offsets.append(rc.offset)
+        return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': len(self.buffer)})
+
+    @property
+    def view(self) -> 'DeviceRegisterView':
+        ''' zero-copy numpy access to the registers, see DeviceRegisterView '''
+        if self._view is None:
+            self._view = DeviceRegisterView(self)
+        return self._view
 
     def get_register_address(self, register_name: str) -> str:
         register_config = self.registers_config.get(register_name, None)
@@ -118,6 +291,60 @@ class DeviceBuffer:
         return f"0x{register_address:04X}"
 
 
+class DeviceRegisterView:
+    ''' numpy views over a DeviceBuffer indexed by a register name, a list of names or an inclusive 'FIRST':'LAST' slice,
+    a slice of contiguous registers of one data type is a plain 1-D array, e.g. view['TMP1':'TMP20'] '''
+    device_buffer: DeviceBuffer
+    registers: list[DeviceRegisterConfig]
+
+    def __init__(self, device_buffer: DeviceBuffer):
+        import numpy as np
+        self.device_buffer = device_buffer
+        self.registers = sorted(device_buffer.registers_config.values(), key=lambda rc: rc.offset)
+        self._register_idx = {rc.register_name: idx for idx, rc in enumerate(self.registers)}
+        self.array = np.ndarray((), dtype=device_buffer.register_dtype(), buffer=device_buffer.buffer)
+
+    def _slice(self, key: slice):
+        import numpy as np
+        if key.step is not None:
+            raise Exception('Register Slice Step not Supported')
+        first_idx = self._register_idx[key.start] if key.start is not None else 0
+        last_idx = self._register_idx[key.stop] if key.stop is not None else len(self.registers) - 1
+        registers = self.registers[first_idx:last_idx + 1]
+        if not registers:
+            raise Exception('Empty Register Slice')
+
+        first = registers[0]
+        if first.data_type != 'u8[]' and all(rc.data_type == first.data_type and rc.offset == first.offset + x * first.size for x, rc in enumerate(registers)):
+            return np.ndarray((len(registers),), dtype=DATA_TYPES[first.data_type]['np_dtype'], buffer=self.device_buffer.buffer, offset=first.offset)
+        return self.array[[rc.register_name for rc in registers]]
+
+    def __getitem__(self, key: str | list[str] | slice):
+        ''' writes through the returned arrays do not bump the buffer version, assign through the view instead '''
+        if isinstance(key, slice):
+            return self._slice(key)
+        return self.array[key]
+
+    def __setitem__(self, key: str | list[str] | slice, value):
+        self.device_buffer.begin_write()
+        try:
+            self[key][...] = value
+        finally:
+            self.device_buffer.end_write()
+
+    def to_dict(self) -> dict[str, int | float | bytes]:
+        ''' consistent snapshot of every register value '''
+        snapshot = {}
+        values = self.device_buffer.read_consistent(self.array[[rc.register_name for rc in self.registers]].item)
+        for rc, value in zip(self.registers, values):
+            snapshot[rc.register_name] = value.tobytes() if rc.data_type == 'u8[]' else value
+        return snapshot
+
+    def copy(self):
+        ''' consistent snapshot of every register as a 0-d structured array '''
+        return self.device_buffer.read_consistent(self.array.copy)
+
+
 class LTBusVSPI:
     device_model: str
     debug: bool = True
@@ -126,17 +353,36 @@ class LTBusVSPI:
     comm_mode: LTBusVSPICommMode
 
     v_socket_addr: tuple[str, int]
-    v_socket: socket.socket
 
-    serial_port_name: tuple[str, int]
-    baud_rate: serial.Serial
-    serial_port: serial.Serial
+    serial_port_name: str
+    baud_rate: int
+
+    transport: Transport
+    lt_bus_framer: LtBusFramer
 
     is_connected: bool
     lt_bus_slave_id: int
     device_buffers: dict[int, DeviceBuffer]
+    # interval index over device_buffers, sorted by base address
+    buffer_bases: list[int]
+    buffer_ends: list[int]
+    sorted_buffers: list[DeviceBuffer]
     registers_config: dict[str, DeviceRegisterConfig]
 
+    traffic_recorder: TrafficRecorder = None
+    # stamps traffic logs, a VirtualClock keeps them consistent with a virtual time VSPI scenario
+    clock: Clock
+
+    # below this READ_RESP data size one joined write is cheaper than a vectored one
+    SENDMSG_MIN_DATA_SIZE = 2048
+    # encoded READ_RESP packets of the last polled regions, 0 disables the cache
+    READ_RESP_CACHE_SIZE = 64
+
+    # (register_address, size) -> (device buffers versions, device buffers, READ_RESP packet), least recently used first
+    READ_RESP_cache: OrderedDict[tuple[int, int], tuple[list[int], list[DeviceBuffer], bytes]]
+    READ_RESP_cache_hits: int
+    READ_RESP_cache_misses: int
+
     def __init__(
         self,
         device_model: str,
@@ -148,14 +394,23 @@ class LTBusVSPI:
         baud_rate: int = 115200,
         auto_connect: bool = False,
         lt_bus_slave_id: int = 0x00,
+        transport: Transport = None,
+        clock: Clock = None,
     ):
         self.device_model = device_model
         self.comm_mode = comm_mode
         self.log_tag = f"[LT-BUS-VSPI-{self.device_model}]"
         self.v_socket_addr = (socket_host, socket_port)
-        self.v_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.serial_port = serial_port
+        self.serial_port_name = serial_port
         self.baud_rate = baud_rate
+        if transport is None:
+            if comm_mode == LTBusVSPICommMode.WIRED:
+                transport = SerialTransport(serial_port, baud_rate)
+            else:
+                transport = TcpTransport(socket_host, socket_port)
+        self.transport = transport
+        self.lt_bus_framer = LtBusFramer()
+        self.clock = clock or real_clock
         self.is_connected = False
         self.lt_bus_slave_id = lt_bus_slave_id
 
@@ -168,6 +423,17 @@ class LTBusVSPI:
                 new_rc.offset += d_buff.base_address
                 self.registers_config[rn] = new_rc
 
+        self.READ_RESP_cache = OrderedDict()
+        self.READ_RESP_cache_hits = 0
+        self.READ_RESP_cache_misses = 0
+
+        self.sorted_buffers = sorted(device_buffers, key=lambda x: x.base_address)
+        self.buffer_bases = [d_buff.base_address for d_buff in self.sorted_buffers]
+        self.buffer_ends = [d_buff.base_address + len(d_buff.buffer) for d_buff in self.sorted_buffers]
+        for idx in range(1, len(self.sorted_buffers)):
+            if self.buffer_bases[idx] < self.buffer_ends[idx - 1]:
+                raise Exception(f"Device Buffers Overlap: 0x{self.buffer_bases[idx - 1]:04X}-0x{self.buffer_ends[idx - 1] - 1:04X} and 0x{self.buffer_bases[idx]:04X}")
+
         if auto_connect:
             self.connect()
             self.lt_bus_loop()
@@ -175,10 +441,7 @@ class LTBusVSPI:
     def connect(self):
         print(self.log_tag, 'Connecting...')
         try:
-            if self.comm_mode == LTBusVSPICommMode.NETWORK:
-                self.v_socket.connect(self.v_socket_addr)
-            elif self.comm_mode == LTBusVSPICommMode.WIRED:
-                self.serial_port = serial.Serial(self.serial_port_name, self.baud_rate)
+            self.transport.open()
             print(self.log_tag, 'Connecting...OK')
             self.is_connected = True
 
@@ -190,10 +453,7 @@ class LTBusVSPI:
     def disconnect(self):
         print(self.log_tag, 'Disconnecting...')
         try:
-            if self.comm_mode == LTBusVSPICommMode.NETWORK:
-                self.v_socket.close()
-            elif self.comm_mode == LTBusVSPICommMode.WIRED:
-                self.serial_port.close()
+            self.transport.close()
             print(self.log_tag, 'Disconnecting...OK')
             self.is_connected = False
 
@@ -229,50 +489,122 @@ class LTBusVSPI:
 
         return READ_RESP_packet
 
+    def encode_READ_RESP_segments(self, register_address: int, data: bytes) -> list[bytes]:
+        ''' [header, data, trailer] of a READ_RESP packet for a vectored write, data is not copied '''
+        header = bytes([ord('{'), self.lt_bus_slave_id, READ_RESP_FC]) + register_address.to_bytes(2, 'little') + len(data).to_bytes(2, 'little')
+        crc16 = Crc16(header).update(data).digest()
+        return [header, data, u16_to_2u8(crc16) + b'}']
+
+    def map_region(self, register_address: int, size: int) -> Result:
+        ''' splits a register region over the device buffers it spans, ok is a list of (device_buffer, start_address, size) '''
+        idx = bisect.bisect_right(self.buffer_bases, register_address) - 1
+        region_end = register_address + size
+        segments = []
+        address = register_address
+        while True:
+            if idx < 0 or idx >= len(self.buffer_bases) or address >= self.buffer_ends[idx] or address < self.buffer_bases[idx]:
+                return Result(err=f"Unmapped Register Region 0x{register_address:04X}-0x{region_end - 1:04X}: no Device Buffer at 0x{address:04X}")
+            segment_end = min(region_end, self.buffer_ends[idx])
+            segments.append((self.sorted_buffers[idx], address, segment_end - address))
+            if segment_end == region_end:
+                return Result(ok=segments)
+            # continues in the next buffer only if it starts right where this one ends
+            address = segment_end
+            idx += 1
+
+    def _encode_READ_RESP_cached(self, register_address: int, register_size: int) -> Result:
+        ''' READ_RESP packet of a region from the cache while its device buffers are unchanged, ok is a list of segments '''
+        cache_key = (register_address, register_size)
+        READ_RESP_cache_entry = self.READ_RESP_cache.get(cache_key, None)
+        if READ_RESP_cache_entry is not None:
+            versions, device_buffers, READ_RESP_packet = READ_RESP_cache_entry
+            if versions == [d_buff.version for d_buff in device_buffers]:
+                self.READ_RESP_cache.move_to_end(cache_key)
+                self.READ_RESP_cache_hits += 1
+                return Result(ok=[READ_RESP_packet])
+
+        segments_res = self.map_region(register_address, register_size)
+        if segments_res.err:
+            return segments_res
+
+        segments = segments_res.ok
+        device_buffers = [device_buffer for device_buffer, _, _ in segments]
+        # taken before the read, a write racing with it leaves a stale version and the next poll encodes again
+        versions = [d_buff.version for d_buff in device_buffers]
+        if len(segments) == 1 and not segments[0][0].is_shared:
+            device_buffer, start_address, size = segments[0]
+            register_data = device_buffer.read_region(start_address, size)
+        else:
+            # other processes may write to shared buffers while they are read
+            register_data = b''.join([device_buffer.snapshot(start_address, size) for device_buffer, start_address, size in segments])
+
+        if register_size < LTBusVSPI.SENDMSG_MIN_DATA_SIZE:
+            READ_RESP_segments = [self.encode_READ_RESP_packet(register_address, register_data)]
+        else:
+            READ_RESP_segments = self.encode_READ_RESP_segments(register_address, register_data)
+
+        self.READ_RESP_cache_misses += 1
+        if LTBusVSPI.READ_RESP_CACHE_SIZE:
+            READ_RESP_packet = READ_RESP_segments[0] if len(READ_RESP_segments) == 1 else b''.join(READ_RESP_segments)
+            self.READ_RESP_cache[cache_key] = (versions, device_buffers, READ_RESP_packet)
+            self.READ_RESP_cache.move_to_end(cache_key)
+            if len(self.READ_RESP_cache) > LTBusVSPI.READ_RESP_CACHE_SIZE:
+                self.READ_RESP_cache.popitem(last=False)
+        return Result(ok=READ_RESP_segments)
+
     def _handle_lt_bus_read_request(self, request_packet: bytes):
         register_address = int.from_bytes(request_packet[3:5], 'little')
-        buffer_base_address = register_address & 0xF000
-        device_buffer = self.device_buffers.get(buffer_base_address, None)
-        if not device_buffer:
-            print(self.log_tag, '[ERROR]', f"Unknown Register Base Address 0x{buffer_base_address:02X}")
-            return
-
         register_size = int.from_bytes(request_packet[5:7], 'little')
-        register_data = device_buffer.read_region(register_address, register_size)
+        READ_RESP_res = self._encode_READ_RESP_cached(register_address, register_size)
+        if READ_RESP_res.err:
+            print(self.log_tag, '[ERROR]', READ_RESP_res.err)
+            return
 
-        READ_RESP_packet = self.encode_READ_RESP_packet(register_address, register_data)
-        if self.comm_mode == LTBusVSPICommMode.NETWORK:
-            print(self.log_tag, '[DEBUG]', f"Sending Packet: {READ_RESP_packet}")
-            self.v_socket.send(READ_RESP_packet)
-        elif self.comm_mode == LTBusVSPICommMode.WIRED:
-            pass  # IGNORE
+        READ_RESP_segments = READ_RESP_res.ok
+        if self.traffic_recorder or self.debug:
+            READ_RESP_packet = b''.join(READ_RESP_segments)
+            if self.traffic_recorder:
+                self.traffic_recorder.record(DIRECTION_TX, READ_RESP_packet, READ_RESP_FC)
+            if self.debug:
+                print(self.log_tag, '[DEBUG]', f"Sending Packet: {READ_RESP_packet}")
+        if len(READ_RESP_segments) == 1:
+            self.transport.send(READ_RESP_segments[0])
+        else:
+            self.transport.sendmsg(READ_RESP_segments)
 
     def _handle_lt_bus_write_request(self, request_packet: bytes):
         register_address = int.from_bytes(request_packet[3:5], 'little')
-        buffer_base_address = register_address & 0xF000
-        device_buffer = self.device_buffers.get(buffer_base_address, None)
-        if not device_buffer:
-            print(self.log_tag, '[ERROR]', f"Unknown Register Base Address 0x{buffer_base_address:02X}")
+        register_size = int.from_bytes(request_packet[5:7], 'little')
+        segments_res = self.map_region(register_address, register_size)
+        if segments_res.err:
+            print(self.log_tag, '[ERROR]', segments_res.err)
             return
 
-        register_size = int.from_bytes(request_packet[5:7], 'little')
-        register_data = request_packet[LT_BUS_PACKET_DATA_START:LT_BUS_PACKET_DATA_START + register_size]
-        device_buffer.write_region(register_address, register_data)
+        register_data = memoryview(request_packet)[LT_BUS_PACKET_DATA_START:LT_BUS_PACKET_DATA_START + register_size]
+        data_offset = 0
+        for device_buffer, start_address, size in segments_res.ok:
+            device_buffer.write_region(start_address, register_data[data_offset:data_offset + size])
+            data_offset += size
 
-    def handle_lt_bus_request(self, request_packet: bytes):
-        print(self.log_tag, '[DEBUG]', f"Received Packet: {request_packet}")
+    def handle_lt_bus_request(self, request_packet: bytes | memoryview, crc_checked: bool = False):
+        ''' crc_checked skips the CRC-16 check of frames that already went through an LtBusFramer '''
+        if self.debug:
+            print(self.log_tag, '[DEBUG]', f"Received Packet: {bytes(request_packet)}")
+        if self.traffic_recorder:
+            self.traffic_recorder.record(DIRECTION_RX, request_packet, request_packet[2] if len(request_packet) > 2 else MSG_TYPE_UNKNOWN)
 
         if len(request_packet) < REQUEST_PACKET_MIN_SIZE:
             print(self.log_tag, '[ERROR]', 'Request Packet too Small')
             return
 
         # CRC-16 check
-        packet_crc16_bytes = request_packet[-3:-1]
-        packet_crc16 = int.from_bytes(packet_crc16_bytes, 'little')
-        computed_crc16 = compute_crc16(request_packet[:-3])
-        if packet_crc16 != computed_crc16:
-            print(self.log_tag, '[ERROR]', f"Invalid CRC-16: packet_crc16={packet_crc16}, computed_crc16={computed_crc16}")
-            return
+        if not crc_checked:
+            packet_crc16_bytes = request_packet[-3:-1]
+            packet_crc16 = int.from_bytes(packet_crc16_bytes, 'little')
+            computed_crc16 = compute_crc16(request_packet[:-3])
+            if packet_crc16 != computed_crc16:
+                print(self.log_tag, '[ERROR]', f"Invalid CRC-16: packet_crc16={packet_crc16}, computed_crc16={computed_crc16}")
+                return
 
         # check lt_bus_slave_id
         packet_slave_id = request_packet[1]
@@ -292,6 +624,16 @@ class LTBusVSPI:
         elif packet_fc == 0xEA:
             self._handle_lt_bus_write_request(request_packet)
 
+    def start_recording(self, log_path: str):
+        ''' records every request received and response sent until stop_recording(), msg_type holds the function code '''
+        self.stop_recording()
+        self.traffic_recorder = TrafficRecorder(log_path, self.device_model, self.clock)
+
+    def stop_recording(self):
+        if self.traffic_recorder:
+            self.traffic_recorder.close()
+            self.traffic_recorder = None
+
     def device_read_register(self, register_name: str) -> bytes:
         if self.comm_mode != LTBusVSPICommMode.WIRED:
             print(self.log_tag, '[ERROR]', 'This Function Requires LTBusVSPICommMode.WIRED')
@@ -304,35 +646,22 @@ class LTBusVSPI:
         register_address = register_config.offset
         READ_packet = self.encode_READ_packet(register_address, register_config.size)
         if self.is_connected:
-            self.serial_port.write(READ_packet)
+            self.transport.send(READ_packet)
 
         return READ_packet
 
     def lt_bus_loop(self):
-        request_buffer = b''
+        ''' serves requests until the connection is closed, frames are handed over as views of the framer buffer '''
+        lt_bus_framer = self.lt_bus_framer
+        lt_bus_framer.reset()
         while True:
-            if self.comm_mode == LTBusVSPICommMode.NETWORK:
-                packet_header = self.v_socket.recv(7)
-            elif self.comm_mode == LTBusVSPICommMode.WIRED:
-                pass  # IGNORE
-
-            if packet_header[0] != ord('{'):
-                print(self.log_tag, '[WARN]', f"Ignored Packet Header: {packet_header}")
-                continue
-
-            packet_fc = packet_header[2]
-            if packet_fc == READ_FC:
-                packet_remain = self.v_socket.recv(3)
-                request_buffer = packet_header + packet_remain
-
-            elif packet_fc == WRITE_FC:
-                data_size = int.from_bytes(packet_header[-2:], 'little')
-                packet_remain = self.v_socket.recv(data_size + 3)
-                request_buffer = packet_header + packet_remain
-
-            if request_buffer[-1] == ord('}'):
-                self.handle_lt_bus_request(request_buffer)
-            else:
-                print(self.log_tag, '[WARN]', f"Ignored Packet: {request_buffer}")
-
-            request_buffer = b''
+            dropped_bytes = lt_bus_framer.dropped_bytes
+            if not lt_bus_framer.recv_into(self.transport):
+                print(self.log_tag, 'Connection Closed')
+                self.is_connected = False
+                return
+
+            for request_packet in lt_bus_framer.frames():
+                self.handle_lt_bus_request(request_packet, crc_checked=True)
+            if lt_bus_framer.dropped_bytes != dropped_bytes:
+                print(self.log_tag, '[WARN]', f"Ignored {lt_bus_framer.dropped_bytes - dropped_bytes} Bytes")
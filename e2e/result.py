@@ -0,0 +1,6 @@
+class Result:
+    ''' ok value or err message, shared by the LtdDriver and LT-Bus codecs '''
+
+    def __init__(self, ok=None, err=None):
+        self.ok = ok
+        self.err = err
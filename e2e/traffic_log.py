@@ -0,0 +1,200 @@
+import os
+import struct
+import bisect
+from threading import Lock
+from typing import Callable, Iterator
+from e2e.crc16 import compute_crc16
+from e2e.clock import (
+    Clock,
+    real_clock,
+)
+
+
+# layout: magic, version, flags, reserved, wall clock start ns, device model
+TRAFFIC_LOG_MAGIC = b'LTTL'
+TRAFFIC_LOG_VERSION = 1
+TRAFFIC_LOG_HEADER = struct.Struct('<4sBBHQ32s')
+# layout: ns since start, direction, msg_type, payload length, payload
+TRAFFIC_LOG_RECORD = struct.Struct('<QBBH')
+# layout: ns since start, record file offset
+TRAFFIC_LOG_INDEX_ENTRY = struct.Struct('<QQ')
+TRAFFIC_LOG_INDEX_INTERVAL = 64
+
+DIRECTION_RX = 0  # host -> device
+DIRECTION_TX = 1  # device -> host
+MSG_TYPE_UNKNOWN = 0xFF
+
+LTD_PACKET_MIN_SIZE = 11
+
+
+def ltd_frames(packet: bytes) -> Iterator[tuple[int, bytes]]:
+    ''' splits back to back LTD frames using their size byte, yields (msg_type, frame) '''
+    offset = 0
+    packet_size = len(packet)
+    while offset + 3 <= packet_size:
+        frame_size = packet[offset + 2]
+        if frame_size < LTD_PACKET_MIN_SIZE or offset + frame_size > packet_size:
+            yield MSG_TYPE_UNKNOWN, packet[offset:]
+            return
+        yield packet[offset + 5] & 0x0F, packet[offset:offset + frame_size]
+        offset += frame_size
+    if offset < packet_size:
+        yield MSG_TYPE_UNKNOWN, packet[offset:]
+
+
+def rewrite_ltd_seq_number(frame: bytes, seq_number: int) -> bytes:
+    ''' replaces the LTD sequence number and recomputes the CRC-16 '''
+    frame = bytearray(frame)
+    frame[3:5] = seq_number.to_bytes(2, 'little')
+    frame[-4:-2] = compute_crc16(memoryview(frame)[:-4]).to_bytes(2, 'little')
+    return bytes(frame)
+
+
+class TrafficRecorder:
+    ''' appends timestamped frames to a binary traffic log, an index entry is written to log_path.idx every TRAFFIC_LOG_INDEX_INTERVAL records '''
+    log_path: str
+    records: int = 0
+
+    def __init__(self, log_path: str, device_model: str = '', clock: Clock = None):
+        self.log_path = log_path
+        self.records = 0
+        self.clock = clock or real_clock
+        self._lock = Lock()
+        self._log_file = open(log_path, 'wb')
+        self._index_file = open(log_path + '.idx', 'wb')
+        self._log_file.write(TRAFFIC_LOG_HEADER.pack(TRAFFIC_LOG_MAGIC, TRAFFIC_LOG_VERSION, 0, 0, self.clock.time_ns(), device_model.encode('utf-8')[:32]))
+        self._offset = TRAFFIC_LOG_HEADER.size
+        self._start_ns = self.clock.monotonic_ns()
+
+    def record(self, direction: int, frame: bytes, msg_type: int = MSG_TYPE_UNKNOWN):
+        t_ns = self.clock.monotonic_ns() - self._start_ns
+        with self._lock:
+            if self._log_file is None:
+                return
+            if self.records % TRAFFIC_LOG_INDEX_INTERVAL == 0:
+                self._index_file.write(TRAFFIC_LOG_INDEX_ENTRY.pack(t_ns, self._offset))
+            self._log_file.write(TRAFFIC_LOG_RECORD.pack(t_ns, direction, msg_type, len(frame)))
+            self._log_file.write(frame)
+            self._offset += TRAFFIC_LOG_RECORD.size + len(frame)
+            self.records += 1
+
+    def record_ltd(self, direction: int, packet: bytes):
+        ''' records every LTD frame of packet separately '''
+        for msg_type, frame in ltd_frames(packet):
+            self.record(direction, frame, msg_type)
+
+    def close(self):
+        with self._lock:
+            if self._log_file is None:
+                return
+            self._log_file.close()
+            self._index_file.close()
+            self._log_file = None
+            self._index_file = None
+
+
+class TrafficReplayer:
+    log_path: str
+    wall_start_ns: int
+    device_model: str
+    index: list[tuple[int, int]]
+    running: bool = False
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        with open(log_path, 'rb') as f:
+            header = f.read(TRAFFIC_LOG_HEADER.size)
+        if len(header) < TRAFFIC_LOG_HEADER.size:
+            raise Exception('Invalid Traffic Log Header')
+        magic, version, _, _, self.wall_start_ns, device_model = TRAFFIC_LOG_HEADER.unpack(header)
+        if magic != TRAFFIC_LOG_MAGIC or version != TRAFFIC_LOG_VERSION:
+            raise Exception('Invalid Traffic Log Header')
+        self.device_model = device_model.rstrip(b'\x00').decode('utf-8')
+        self.index = self._load_index()
+
+    def _load_index(self) -> list[tuple[int, int]]:
+        index_path = self.log_path + '.idx'
+        if not os.path.exists(index_path):
+            return [(0, TRAFFIC_LOG_HEADER.size)]
+        with open(index_path, 'rb') as f:
+            index_data = f.read()
+        index_data = index_data[:len(index_data) - len(index_data) % TRAFFIC_LOG_INDEX_ENTRY.size]
+        return list(TRAFFIC_LOG_INDEX_ENTRY.iter_unpack(index_data)) or [(0, TRAFFIC_LOG_HEADER.size)]
+
+    def records(self, start_ns: int = 0, direction: int = None, msg_types: set[int] = None) -> Iterator[tuple[int, int, int, bytes]]:
+        ''' yields (t_ns, direction, msg_type, frame) records from start_ns, seeking with the index '''
+        index_pos = max(bisect.bisect_right(self.index, (start_ns, float('inf'))) - 1, 0)
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.index[index_pos][1])
+            while True:
+                record_header = f.read(TRAFFIC_LOG_RECORD.size)
+                if len(record_header) < TRAFFIC_LOG_RECORD.size:
+                    return
+                t_ns, record_direction, msg_type, frame_size = TRAFFIC_LOG_RECORD.unpack(record_header)
+                frame = f.read(frame_size)
+                if len(frame) < frame_size:
+                    return  # truncated tail of a log that is still being written
+                if t_ns < start_ns:
+                    continue
+                if direction is not None and record_direction != direction:
+                    continue
+                if msg_types is not None and msg_type not in msg_types:
+                    continue
+                yield t_ns, record_direction, msg_type, frame
+
+    def replay(
+        self,
+        write_packet: Callable[[bytes], None],
+        speed: float = 1.0,
+        loop: bool = False,
+        direction: int = DIRECTION_TX,
+        msg_types: set[int] = None,
+        start_ns: int = 0,
+        rewrite_seq_numbers: bool = False,
+        clock: Clock = None,
+    ) -> int:
+        ''' writes recorded frames with their original spacing divided by speed, speed=0 writes as fast as possible,
+        rewrite_seq_numbers shifts LTD sequence numbers on every loop pass so they keep increasing '''
+        clock = clock or real_clock
+        self.running = True
+        frames_count = 0
+        seq_number_offset = 0
+        loop_offset_ns = 0
+        replay_start_ns = clock.monotonic_ns()
+        while self.running:
+            first_t_ns = None
+            last_t_ns = 0
+            pass_frames_count = 0
+            first_seq_number = last_seq_number = None
+            for t_ns, _, msg_type, frame in self.records(start_ns, direction, msg_types):
+                if not self.running:
+                    break
+                if first_t_ns is None:
+                    first_t_ns = t_ns
+                last_t_ns = t_ns
+
+                if speed:
+                    clock.sleep_until(replay_start_ns + round((loop_offset_ns + t_ns - first_t_ns) / speed))
+
+                if rewrite_seq_numbers and msg_type != MSG_TYPE_UNKNOWN:
+                    last_seq_number = frame[3] | (frame[4] << 8)
+                    if first_seq_number is None:
+                        first_seq_number = last_seq_number
+                    if seq_number_offset:
+                        frame = rewrite_ltd_seq_number(frame, (last_seq_number + seq_number_offset) & 0xFFFF)
+                write_packet(frame)
+                pass_frames_count += 1
+            frames_count += pass_frames_count
+
+            if not loop or first_t_ns is None:
+                break
+            # next pass starts one average frame gap after the last frame
+            loop_offset_ns += last_t_ns - first_t_ns + max((last_t_ns - first_t_ns) // pass_frames_count, 1)
+            if first_seq_number is not None:
+                seq_number_offset += ((last_seq_number - first_seq_number) & 0xFFFF) + 1
+
+        self.running = False
+        return frames_count
+
+    def stop(self):
+        self.running = False
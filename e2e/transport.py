@@ -0,0 +1,272 @@
+import os
+import tty
+import select
+import socket
+import serial
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse, parse_qs
+
+
+class Transport(ABC):
+    ''' byte stream shared by VSPI and LTBusVSPI, recv_into returns 0 on EOF and raises BlockingIOError
+    when the transport is non-blocking and has no data '''
+    name: str = 'transport'
+    is_open: bool = False
+
+    @abstractmethod
+    def open(self):
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    @abstractmethod
+    def fileno(self) -> int:
+        pass
+
+    def set_blocking(self, blocking: bool):
+        os.set_blocking(self.fileno(), blocking)
+
+    @abstractmethod
+    def recv_into(self, buffer: bytearray | memoryview, nbytes: int = 0) -> int:
+        pass
+
+    @abstractmethod
+    def _send_once(self, buffers: list[bytes | memoryview]) -> int:
+        ''' one vectored write, may be partial '''
+
+    def sendmsg(self, buffers: list[bytes | memoryview]) -> int:
+        ''' writes every buffer with as few vectored writes as possible, partial writes are resumed
+        and a non-blocking transport waits until it is writable '''
+        try:
+            sent_size = self._send_once(buffers)
+        except BlockingIOError:
+            sent_size = 0
+        total_size = 0
+        for x in buffers:
+            total_size += len(x)
+        if sent_size == total_size:
+            return total_size
+        return self._send_pending(buffers, sent_size, total_size)
+
+    def _send_pending(self, buffers: list[bytes | memoryview], sent_size: int, total_size: int) -> int:
+        pending = [memoryview(x).cast('B') for x in buffers]
+        while True:
+            # drop the bytes that were already written
+            while pending and sent_size >= len(pending[0]):
+                sent_size -= len(pending.pop(0))
+            if not pending:
+                return total_size
+            if sent_size:
+                pending[0] = pending[0][sent_size:]
+            try:
+                sent_size = self._send_once(pending)
+            except BlockingIOError:
+                self.wait_writable()
+                sent_size = 0
+
+    def send(self, data: bytes | memoryview) -> int:
+        buffers = [data]
+        try:
+            sent_size = self._send_once(buffers)
+        except BlockingIOError:
+            sent_size = 0
+        if sent_size == len(data):
+            return sent_size
+        return self._send_pending(buffers, sent_size, len(data))
+
+    def wait_readable(self, timeout: float = None) -> bool:
+        return bool(select.select([self.fileno()], [], [], timeout)[0])
+
+    def wait_writable(self, timeout: float = None) -> bool:
+        return bool(select.select([], [self.fileno()], [], timeout)[1])
+
+    def __str__(self):
+        return self.name
+
+
+class SocketTransport(Transport):
+    ''' connected stream socket, also wraps sockets created elsewhere e.g. by socket.socketpair() '''
+    sock: socket.socket = None
+
+    def __init__(self, sock: socket.socket = None):
+        self.sock = sock
+        self.is_open = sock is not None
+        if sock is not None:
+            self.name = f"socket:{sock.fileno()}"
+            self._bind_socket()
+
+    def _bind_socket(self):
+        # hot path methods go straight to the socket, one python call less per packet
+        self.recv_into = self.sock.recv_into
+        self._send_once = self.sock.sendmsg
+
+    def open(self):
+        # wrapped sockets are already connected
+        self.is_open = self.sock is not None
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+        self.is_open = False
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def set_blocking(self, blocking: bool):
+        self.sock.setblocking(blocking)
+
+    def recv_into(self, buffer: bytearray | memoryview, nbytes: int = 0) -> int:
+        return self.sock.recv_into(buffer, nbytes)
+
+    def _send_once(self, buffers: list[bytes | memoryview]) -> int:
+        return self.sock.sendmsg(buffers)
+
+
+class TcpTransport(SocketTransport):
+    host: str
+    port: int
+    nodelay: bool
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 6543, nodelay: bool = True):
+        super().__init__()
+        self.host = host
+        self.port = port
+        # small frames are written as soon as they are encoded, Nagle would hold them back for an ACK
+        self.nodelay = nodelay
+        self.name = f"tcp://{host}:{port}"
+
+    def open(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            self.sock.connect((self.host, self.port))
+        except OSError:
+            self.sock.close()
+            raise
+        if self.nodelay:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._bind_socket()
+        self.is_open = True
+
+
+class UnixTransport(SocketTransport):
+    path: str
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.name = f"unix://{path}"
+
+    def open(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(self.path)
+        except OSError:
+            self.sock.close()
+            raise
+        self._bind_socket()
+        self.is_open = True
+
+
+class FdTransport(Transport):
+    ''' file descriptor of a tty or pipe, vectored writes with os.writev '''
+    fd: int = -1
+
+    def __init__(self, fd: int = -1):
+        self.fd = fd
+        self.is_open = fd >= 0
+        self.name = f"fd:{fd}"
+
+    def open(self):
+        self.is_open = self.fd >= 0
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+        self.fd = -1
+        self.is_open = False
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def recv_into(self, buffer: bytearray | memoryview, nbytes: int = 0) -> int:
+        if nbytes:
+            buffer = memoryview(buffer)[:nbytes]
+        return os.readv(self.fd, [buffer])
+
+    def _send_once(self, buffers: list[bytes | memoryview]) -> int:
+        return os.writev(self.fd, buffers)
+
+
+class PtyTransport(FdTransport):
+    ''' device side of an os.openpty() pair, the host opens port_name (or link_path) like a serial port '''
+    link_path: str
+    port_name: str = None
+
+    def __init__(self, link_path: str = None):
+        super().__init__()
+        self.link_path = link_path
+        self.name = f"pty://{link_path or ''}"
+        self._slave_fd = -1
+
+    def open(self):
+        self.fd, self._slave_fd = os.openpty()
+        # raw mode, the line discipline must not echo, translate CR/LF or buffer lines
+        tty.setraw(self._slave_fd)
+        tty.setraw(self.fd)
+        self.port_name = os.ttyname(self._slave_fd)
+        if self.link_path:
+            if os.path.islink(self.link_path):
+                os.unlink(self.link_path)
+            os.symlink(self.port_name, self.link_path)
+        self.is_open = True
+
+    def close(self):
+        super().close()
+        # the slave fd is kept open until here so the master does not see EIO between host sessions
+        if self._slave_fd >= 0:
+            os.close(self._slave_fd)
+            self._slave_fd = -1
+        if self.link_path and os.path.islink(self.link_path):
+            os.unlink(self.link_path)
+
+
+class SerialTransport(FdTransport):
+    ''' real serial port through pyserial, reads and writes go straight to its file descriptor '''
+    port_name: str
+    baud_rate: int
+    serial_port: serial.Serial = None
+
+    def __init__(self, port_name: str = '/dev/ttyACM0', baud_rate: int = 115200):
+        super().__init__()
+        self.port_name = port_name
+        self.baud_rate = baud_rate
+        self.name = f"serial://{port_name}?baud={baud_rate}"
+
+    def open(self):
+        self.serial_port = serial.Serial(port=self.port_name, baudrate=self.baud_rate)
+        self.fd = self.serial_port.fileno()
+        self.is_open = True
+
+    def close(self):
+        if self.serial_port is not None:
+            self.serial_port.close()
+            self.serial_port = None
+        self.fd = -1
+        self.is_open = False
+
+
+def transport_from_url(url: str) -> Transport:
+    ''' tcp://HOST:PORT, unix:///PATH, pty:// or pty:///LINK_PATH, serial:///DEV?baud=BAUD '''
+    parsed_url = urlparse(url)
+    if parsed_url.scheme == 'tcp':
+        return TcpTransport(parsed_url.hostname or '127.0.0.1', parsed_url.port or 6543)
+    elif parsed_url.scheme == 'unix':
+        return UnixTransport(parsed_url.path)
+    elif parsed_url.scheme == 'pty':
+        return PtyTransport(parsed_url.path or None)
+    elif parsed_url.scheme == 'serial':
+        baud_rate = parse_qs(parsed_url.query).get('baud', ['115200'])[0]
+        return SerialTransport(parsed_url.path, int(baud_rate))
+    raise Exception(f"Unknown Transport: {url}")
@@ -0,0 +1,71 @@
+import asyncio
+from e2e._vspi.async_vspi import (
+    AsyncVSPI,
+    run_async_vspis,
+)
+from e2e._vspi.ltd_driver import (
+    LtdDriver,
+    LtdFramer,
+)
+from e2e._vspi.test_drivers import (
+    DRIVER_CONFIG_LT_HT103,
+    DRIVER_CONFIG_LT_HT107,
+)
+
+
+async def _host_session(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host_driver: LtdDriver, write_msg_type: int, received: list):
+    framer = LtdFramer(host_driver.protocol_version)
+    # wait for two stream bursts
+    while len(received) < 2 * len(host_driver.msg_type_set):
+        for packet in framer.feed(await reader.read(4096)):
+            received.append(host_driver.decode_packet(packet).ok)
+
+    # control message, expect the mapped feedback msg
+    writer.write(host_driver.encode_packet(0, write_msg_type, 42.5).ok)
+    await writer.drain()
+    feedback_msg = None
+    while feedback_msg is None:
+        for packet in framer.feed(await reader.read(4096)):
+            device_msg = host_driver.decode_packet(packet).ok
+            if device_msg.config.msg_name == 'P_HEATER':
+                feedback_msg = device_msg
+    received.append(feedback_msg)
+    writer.close()
+
+
+def test_async_vspis_share_event_loop():
+    lt_ht103_driver = LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103)
+    lt_ht107_driver = LtdDriver([0x13, 0x14], DRIVER_CONFIG_LT_HT107)
+    lt_ht103_received, lt_ht107_received = [], []
+
+    async def main():
+        lt_ht103_server = await asyncio.start_server(lambda r, w: _host_session(r, w, lt_ht103_driver, 12, lt_ht103_received), '127.0.0.1', 0)
+        lt_ht107_server = await asyncio.start_server(lambda r, w: _host_session(r, w, lt_ht107_driver, 12, lt_ht107_received), '127.0.0.1', 0)
+        async_vspis = [
+            AsyncVSPI('LT-HT103', LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103), {12: 5, 13: 6}, '127.0.0.1', lt_ht103_server.sockets[0].getsockname()[1]),
+            AsyncVSPI('LT-HT107', LtdDriver([0x13, 0x14], DRIVER_CONFIG_LT_HT107), {12: 13}, '127.0.0.1', lt_ht107_server.sockets[0].getsockname()[1]),
+        ]
+        for async_vspi in async_vspis:
+            async_vspi.debug = False
+            async_vspi.stream_period = 0.01
+        await asyncio.wait_for(run_async_vspis(async_vspis, 'const'), 5)
+        lt_ht103_server.close()
+        lt_ht107_server.close()
+
+    asyncio.run(main())
+
+    # const stream values, then the feedback of WRITE_P_HEATER
+    assert lt_ht103_received[0].msg_value == 30
+    assert lt_ht103_received[-1].config.msg_name == 'P_HEATER'
+    assert lt_ht103_received[-1].msg_value == 42.5
+    assert lt_ht107_received[0].msg_value == 30
+    assert lt_ht107_received[-1].config.msg_name == 'P_HEATER'
+    assert lt_ht107_received[-1].msg_value == 42.5
+
+
+def test_from_vspi_copies_driver():
+    vspi = AsyncVSPI('LT-HT103', LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103), {12: 5})
+    async_vspis = [AsyncVSPI.from_vspi(vspi) for _ in range(2)]
+    assert async_vspis[0].device_driver is not vspi.device_driver
+    assert async_vspis[0].device_driver is not async_vspis[1].device_driver
+    assert async_vspis[0].device_driver.protocol_version == vspi.device_driver.protocol_version
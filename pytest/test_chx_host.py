@@ -0,0 +1,91 @@
+import asyncio
+from threading import Thread
+from e2e.chx_host import (
+    ChxHost,
+    parse_lt_bus_polls,
+    PROTOCOL_LTD,
+    PROTOCOL_LT_BUS,
+    PROTOCOL_UNKNOWN,
+)
+from e2e._vspi.async_vspi import AsyncVSPI
+from e2e.transport import TcpTransport
+from e2e._vspi.ltd_driver import LtdDriver
+from e2e._vspi.test_drivers import (
+    DRIVER_CONFIG_LT_HT103,
+    ltd_driver_lt_re600,
+)
+from e2e.lt_bus_vspi.lt_bus_vspi import (
+    LTBusVSPI,
+    DeviceBuffer,
+    DeviceRegisterConfig,
+)
+
+
+def _lt_bus_device(lt_bus_vspi: LTBusVSPI, port: int):
+    lt_bus_vspi.transport = TcpTransport('127.0.0.1', port)
+    lt_bus_vspi.connect()
+    lt_bus_vspi.lt_bus_loop()
+
+
+def test_chx_host_serves_ltd_and_lt_bus():
+    data_buffer = DeviceBuffer(0xD000, [DeviceRegisterConfig('FLOW', 0x000, 'f32')])
+    data_buffer.write_register('FLOW', 1.5)
+    lt_bus_vspi = LTBusVSPI('LT-TEST', [data_buffer], lt_bus_slave_id=0x01)
+    lt_bus_vspi.debug = False
+
+    async def main() -> tuple[ChxHost, ChxHost]:
+        ltd_host = ChxHost(port=0, detect_timeout=0.1)
+        lt_bus_host = ChxHost(port=0, lt_bus_polls=parse_lt_bus_polls(['0xD000:4', '0xD000=0000C03F'], 0x01), poll_rate_hz=200, protocol=PROTOCOL_LT_BUS)
+        await ltd_host.start()
+        await lt_bus_host.start()
+        Thread(target=_lt_bus_device, args=(lt_bus_vspi, lt_bus_host.port), daemon=True).start()
+
+        async_vspi = AsyncVSPI('LT-HT103', LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103), {}, '127.0.0.1', ltd_host.port)
+        async_vspi.debug = False
+        async_vspi.stream_period = 0.01
+        vspi_task = asyncio.create_task(async_vspi.run('const'))
+        await asyncio.sleep(0.5)
+        vspi_task.cancel()
+        await ltd_host.stop()
+        await lt_bus_host.stop()
+        return ltd_host, lt_bus_host
+
+    ltd_host, chx_host = asyncio.run(main())
+    sessions = {session.protocol: session for session in ltd_host.sessions + chx_host.sessions}
+
+    ltd_session = sessions[PROTOCOL_LTD]
+    assert ltd_session.rx_msgs > 0
+    assert ltd_session.rx_errors == 0
+    assert ltd_session.msg_counts['READ_T1'] > 0
+    assert ltd_session.latency_histograms['decode'].count == ltd_session.rx_msgs
+
+    lt_bus_session = sessions[PROTOCOL_LT_BUS]
+    assert lt_bus_session.rx_msgs > 0
+    assert lt_bus_session.tx_requests > lt_bus_session.rx_msgs
+    assert lt_bus_session.lt_bus_regions[0xD000] == data_buffer.read_region(0xD000, 4)
+    assert chx_host.stats()['latency']['poll_rtt']['count'] == lt_bus_session.rx_msgs
+
+
+def test_chx_host_detection():
+    async def main() -> ChxHost:
+        chx_host = ChxHost(port=0, lt_bus_polls=parse_lt_bus_polls(['0xD000:4'], 0x01), detect_timeout=0.05)
+        await chx_host.start()
+        # a silent connection is not taken for an LT-Bus device
+        _, silent_writer = await asyncio.open_connection('127.0.0.1', chx_host.port)
+        # FLTSQ frames are valid frames without a msg_type
+        _, fltsq_writer = await asyncio.open_connection('127.0.0.1', chx_host.port)
+        fltsq_writer.write(ltd_driver_lt_re600.fltsq_encode([1.0, 2.0]).ok * 3)
+        await asyncio.sleep(0.2)
+        silent_writer.close()
+        fltsq_writer.close()
+        await chx_host.stop()
+        return chx_host
+
+    chx_host = asyncio.run(main())
+    silent_session, fltsq_session = chx_host.sessions
+    assert silent_session.protocol == PROTOCOL_UNKNOWN
+    assert silent_session.tx_requests == 0
+    assert fltsq_session.protocol == PROTOCOL_LTD
+    assert fltsq_session.rx_unknown_frames == 3
+    assert fltsq_session.rx_errors == 0
+    assert chx_host.stats()['rx_unknown_frames'] == 3
@@ -0,0 +1,100 @@
+import time
+import socket
+import pytest
+from threading import Thread
+from e2e.clock import (
+    Clock,
+    RealClock,
+    VirtualClock,
+)
+from e2e.transport import SocketTransport
+from e2e.traffic_log import (
+    TrafficReplayer,
+    DIRECTION_TX,
+)
+from e2e._vspi.vspi import VSPI
+from e2e._vspi.ltd_driver import LtdDriver
+from e2e._vspi.stream_scheduler import StreamScheduler
+from e2e._vspi.signal_engine import (
+    SignalEngine,
+    RampSource,
+)
+from e2e._vspi.test_drivers import DRIVER_CONFIG_LT_HT107
+
+
+def test_virtual_clock():
+    clock = VirtualClock(wall_start_ns=1_000_000)
+    assert clock.monotonic_ns() == 0
+    clock.sleep(1.5)
+    assert clock.monotonic_ns() == 1_500_000_000
+    clock.sleep_until(1_000)  # never goes back
+    assert clock.monotonic_ns() == 1_500_000_000
+    clock.advance(10)
+    assert clock.time_ns() == 1_000_000 + 1_500_000_010
+
+    class NoSleepClock(Clock):
+        def monotonic_ns(self) -> int:
+            return 0
+
+        def time_ns(self) -> int:
+            return 0
+
+    # an incomplete clock fails when it is created, not mid-run
+    with pytest.raises(TypeError):
+        NoSleepClock()
+
+    real_clock = RealClock()
+    t0 = real_clock.monotonic_ns()
+    real_clock.sleep_until(t0 + 2_000_000)
+    assert real_clock.monotonic_ns() - t0 >= 2_000_000
+
+
+def test_stream_scheduler_virtual_time():
+    # a 2 hour 5 Hz stream next to a 1 Hz one, without waiting for it
+    clock = VirtualClock()
+    stream_scheduler = StreamScheduler(spin_ns=100_000, clock=clock)
+    written = []
+    stream_scheduler.add_stream('fast', 5, lambda tick: [(0, tick)], written.extend)
+    stream_scheduler.add_stream('slow', 1, lambda tick: [(1, tick)], written.extend)
+    t0 = time.monotonic()
+    stream_scheduler.run(duration=7200)
+    assert time.monotonic() - t0 < 30
+
+    stats = stream_scheduler.stats()
+    assert stats['fast']['ticks'] == 36000
+    assert stats['slow']['ticks'] == 7200
+    assert stats['fast']['achieved_rate_hz'] == 5
+    assert stats['fast']['skipped_ticks'] == 0
+    assert stats['fast']['lateness_max_us'] == 0
+    fast_sns = [sn for sn, msg_type, _ in written if msg_type == 0]
+    assert fast_sns == [x & 0xFFFF for x in range(36000)]
+    assert clock.monotonic_ns() < 7200 * 10**9
+
+
+def test_vspi_virtual_time_recording(tmp_path):
+    log_path = str(tmp_path / 'lt_ht107.lttl')
+    vspi_socket, host_socket = socket.socketpair()
+    received = bytearray()
+    host_thread = Thread(target=lambda: [received.extend(x) for x in iter(lambda: host_socket.recv(65536), b'')])
+    host_thread.start()
+
+    clock = VirtualClock(wall_start_ns=0)
+    vspi = VSPI('LT-HT107', LtdDriver([0x13, 0x14], DRIVER_CONFIG_LT_HT107), transport=SocketTransport(vspi_socket), clock=clock)
+    vspi.debug = False
+    vspi.start_recording(log_path)
+    signal_engine = SignalEngine(2, [(msg_type, RampSource(25, 1)) for msg_type in range(3)])
+    vspi.stream_signals_sync(signal_engine, duration=3600)
+    vspi.stop_recording()
+    vspi_socket.close()
+    host_thread.join()
+    host_socket.close()
+
+    traffic_replayer = TrafficReplayer(log_path)
+    assert traffic_replayer.wall_start_ns == 0
+    records = list(traffic_replayer.records(direction=DIRECTION_TX))
+    assert len(records) == 3 * 7200
+    assert sum(len(frame) for _, _, _, frame in records) == len(received)
+    # frames of one tick share its virtual timestamp, ticks are exactly 500 ms apart
+    assert [t_ns for t_ns, _, _, _ in records[::3]] == [x * 500_000_000 for x in range(7200)]
+    last_frame = records[-1][3]
+    assert int.from_bytes(last_frame[3:5], 'little') == 7199
@@ -0,0 +1,28 @@
+from e2e.codec_bench import run_benchmarks
+from e2e.lt_bus_vspi.device_buffers import lt_re850_data_buffer
+
+
+def test_run_benchmarks():
+    data_buffer = bytes(lt_re850_data_buffer.buffer)
+    data_buffer_seq = lt_re850_data_buffer._seq[0]
+    report = run_benchmarks(number=20)
+    results = report['results']
+    assert 'ltd.encode_packet[LT-CH000]' in results
+    assert 'crc16.compute_crc16[64B]' in results
+    assert 'lt_bus.handle_lt_bus_request[LT-RE850]' in results
+    for result in results.values():
+        assert result['packets'] > 0
+        assert result['ns_per_packet'] > 0
+
+    # name filter
+    report = run_benchmarks(number=20, name_filter='lt_bus.')
+    assert set(report['results']) == {
+        'lt_bus.read_register[LT-RE850]',
+        'lt_bus.read_region[LT-RE850]',
+        'lt_bus.encode_READ_RESP_packet[LT-RE850]',
+        'lt_bus.handle_lt_bus_request[LT-RE850]',
+    }
+
+    # the WRITE requests go to private buffer copies
+    assert bytes(lt_re850_data_buffer.buffer) == data_buffer
+    assert lt_re850_data_buffer._seq[0] == data_buffer_seq
@@ -0,0 +1,101 @@
+import random
+from e2e.crc16 import (
+    CRC16_TABLE,
+    Crc16,
+    compute_crc16,
+    crc16_many,
+)
+from e2e._vspi.ltd_driver import LtdDriver
+from e2e.lt_bus_vspi import lt_bus_utils
+from firmware.lt_bus_vspi import lt_bus_utils as firmware_lt_bus_utils
+
+
+# computed with the per-module table loops that were in place before e2e.crc16, a wrong generated table must not pass
+BASELINE_SINGLE_BYTE_CRC16 = [
+    0xF078, 0xE1F1, 0xD36A, 0xC2E3, 0xB65C, 0xA7D5, 0x954E, 0x84C7,
+    0x7C30, 0x6DB9, 0x5F22, 0x4EAB, 0x3A14, 0x2B9D, 0x1906, 0x088F,
+    0xE0F9, 0xF170, 0xC3EB, 0xD262, 0xA6DD, 0xB754, 0x85CF, 0x9446,
+    0x6CB1, 0x7D38, 0x4FA3, 0x5E2A, 0x2A95, 0x3B1C, 0x0987, 0x180E,
+    0xD17A, 0xC0F3, 0xF268, 0xE3E1, 0x975E, 0x86D7, 0xB44C, 0xA5C5,
+    0x5D32, 0x4CBB, 0x7E20, 0x6FA9, 0x1B16, 0x0A9F, 0x3804, 0x298D,
+    0xC1FB, 0xD072, 0xE2E9, 0xF360, 0x87DF, 0x9656, 0xA4CD, 0xB544,
+    0x4DB3, 0x5C3A, 0x6EA1, 0x7F28, 0x0B97, 0x1A1E, 0x2885, 0x390C,
+    0xB27C, 0xA3F5, 0x916E, 0x80E7, 0xF458, 0xE5D1, 0xD74A, 0xC6C3,
+    0x3E34, 0x2FBD, 0x1D26, 0x0CAF, 0x7810, 0x6999, 0x5B02, 0x4A8B,
+    0xA2FD, 0xB374, 0x81EF, 0x9066, 0xE4D9, 0xF550, 0xC7CB, 0xD642,
+    0x2EB5, 0x3F3C, 0x0DA7, 0x1C2E, 0x6891, 0x7918, 0x4B83, 0x5A0A,
+    0x937E, 0x82F7, 0xB06C, 0xA1E5, 0xD55A, 0xC4D3, 0xF648, 0xE7C1,
+    0x1F36, 0x0EBF, 0x3C24, 0x2DAD, 0x5912, 0x489B, 0x7A00, 0x6B89,
+    0x83FF, 0x9276, 0xA0ED, 0xB164, 0xC5DB, 0xD452, 0xE6C9, 0xF740,
+    0x0FB7, 0x1E3E, 0x2CA5, 0x3D2C, 0x4993, 0x581A, 0x6A81, 0x7B08,
+    0x7470, 0x65F9, 0x5762, 0x46EB, 0x3254, 0x23DD, 0x1146, 0x00CF,
+    0xF838, 0xE9B1, 0xDB2A, 0xCAA3, 0xBE1C, 0xAF95, 0x9D0E, 0x8C87,
+    0x64F1, 0x7578, 0x47E3, 0x566A, 0x22D5, 0x335C, 0x01C7, 0x104E,
+    0xE8B9, 0xF930, 0xCBAB, 0xDA22, 0xAE9D, 0xBF14, 0x8D8F, 0x9C06,
+    0x5572, 0x44FB, 0x7660, 0x67E9, 0x1356, 0x02DF, 0x3044, 0x21CD,
+    0xD93A, 0xC8B3, 0xFA28, 0xEBA1, 0x9F1E, 0x8E97, 0xBC0C, 0xAD85,
+    0x45F3, 0x547A, 0x66E1, 0x7768, 0x03D7, 0x125E, 0x20C5, 0x314C,
+    0xC9BB, 0xD832, 0xEAA9, 0xFB20, 0x8F9F, 0x9E16, 0xAC8D, 0xBD04,
+    0x3674, 0x27FD, 0x1566, 0x04EF, 0x7050, 0x61D9, 0x5342, 0x42CB,
+    0xBA3C, 0xABB5, 0x992E, 0x88A7, 0xFC18, 0xED91, 0xDF0A, 0xCE83,
+    0x26F5, 0x377C, 0x05E7, 0x146E, 0x60D1, 0x7158, 0x43C3, 0x524A,
+    0xAABD, 0xBB34, 0x89AF, 0x9826, 0xEC99, 0xFD10, 0xCF8B, 0xDE02,
+    0x1776, 0x06FF, 0x3464, 0x25ED, 0x5152, 0x40DB, 0x7240, 0x63C9,
+    0x9B3E, 0x8AB7, 0xB82C, 0xA9A5, 0xDD1A, 0xCC93, 0xFE08, 0xEF81,
+    0x07F7, 0x167E, 0x24E5, 0x356C, 0x41D3, 0x505A, 0x62C1, 0x7348,
+    0x8BBF, 0x9A36, 0xA8AD, 0xB924, 0xCD9B, 0xDC12, 0xEE89, 0xFF00,
+]
+BASELINE_CRC16_262B = 0x7870  # random.Random(0).randbytes(262)
+BASELINE_CRC16_0_255 = 0x303C  # bytes(range(256))
+
+
+def _reference_crc16(buffer: bytes) -> int:
+    res = 0xffff
+    for b in buffer:
+        res = (res >> 8) ^ CRC16_TABLE[(res ^ b) & 0xff]
+    return (~res) & 0xffff
+
+
+def test_compute_crc16():
+    # known LtdDriver packet: READ_WEIGHT=2.254
+    packet = bytes([0x87, 0x87, 0x0F, 0x00, 0x00, 0xA2, 0x00, 0x89, 0x41, 0x10, 0x40])
+    assert compute_crc16(packet) == 0x1AA4
+
+    assert [compute_crc16(bytes([x])) for x in range(256)] == BASELINE_SINGLE_BYTE_CRC16
+    assert compute_crc16(random.Random(0).randbytes(262)) == BASELINE_CRC16_262B
+    assert compute_crc16(bytes(range(256))) == BASELINE_CRC16_0_255
+    assert _reference_crc16(bytes(range(256))) == BASELINE_CRC16_0_255
+
+    rng = random.Random(0)
+    for buffer_size in [0, 1, 7, 8, 11, 15, 63, 64, 65, 262, 1000]:
+        buffer = rng.randbytes(buffer_size)
+        target_crc16 = _reference_crc16(buffer)
+        assert compute_crc16(buffer) == target_crc16
+        assert compute_crc16(bytearray(buffer)) == target_crc16
+        assert compute_crc16(memoryview(buffer)) == target_crc16
+        assert LtdDriver._compute_crc16(buffer) == target_crc16
+        assert lt_bus_utils.compute_crc16(buffer) == target_crc16
+        assert firmware_lt_bus_utils.compute_crc16(buffer) == target_crc16
+
+
+def test_crc16_incremental():
+    buffer = random.Random(1).randbytes(500)
+    crc16 = Crc16()
+    idx = 0
+    for chunk_size in [1, 3, 64, 7, 100, 200, 125]:
+        crc16.update(buffer[idx:idx + chunk_size])
+        idx += chunk_size
+    assert crc16.digest() == _reference_crc16(buffer)
+
+    crc16.reset()
+    assert crc16.digest() == _reference_crc16(b'')
+    assert Crc16(buffer[:10]).copy().update(buffer[10:]).digest() == _reference_crc16(buffer)
+
+
+def test_crc16_many():
+    rng = random.Random(2)
+    frames = [rng.randbytes(15) for _ in range(100)]
+    assert list(crc16_many(frames)) == [_reference_crc16(frame) for frame in frames]
+
+    lengths = [rng.randint(0, 15) for _ in range(100)]
+    assert list(crc16_many(frames, lengths)) == [_reference_crc16(frame[:length]) for frame, length in zip(frames, lengths)]
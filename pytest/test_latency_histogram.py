@@ -0,0 +1,65 @@
+import random
+import socket
+from e2e.latency_histogram import (
+    LatencyHistogram,
+    bucket_index,
+    bucket_upper_bound,
+    BUCKET_COUNT,
+)
+from e2e._vspi.vspi import VSPI
+from e2e.transport import SocketTransport
+from e2e._vspi.ltd_driver import LtdDriver
+from e2e._vspi.test_drivers import DRIVER_CONFIG_LT_HT103
+
+
+def test_latency_histogram_buckets():
+    # every value is at most its bucket upper bound and at most 1/16 (~6%) below it
+    for value in list(range(1000)) + [random.randrange(1, 1 << 39) for _ in range(10000)]:
+        upper_bound = bucket_upper_bound(bucket_index(value))
+        assert value <= upper_bound <= value + max(value // 16, 0) + 1
+    assert bucket_index(1 << 50) == BUCKET_COUNT - 1
+
+
+def test_latency_histogram_percentiles():
+    values = [random.randrange(1000, 5_000_000) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for q in (50, 95, 99):
+        exact = values[int(len(values) * q / 100) - 1]
+        assert exact <= histogram.percentile(q) <= exact * 1.07
+    assert histogram.percentile(100) == histogram.max == values[-1]
+    assert histogram.min == values[0]
+
+    # merge then reset
+    other = LatencyHistogram()
+    other.record(10_000_000)
+    histogram.merge(other)
+    assert histogram.count == 20001
+    assert histogram.stats()['max_us'] == 10000
+    histogram.reset()
+    assert histogram.count == 0
+    assert histogram.stats()['p99_us'] == 0
+
+
+def test_vspi_feedback_latency():
+    host_driver = LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103)
+    vspi = VSPI('LT-HT103', LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103), control_feedback_map={12: 5, 13: 6})
+    vspi.debug = False
+    vspi_socket, host_socket = socket.socketpair()
+    vspi.transport = SocketTransport(vspi_socket)
+
+    for value in range(5):
+        host_socket.sendall(host_driver.encode_packet(0, 12, value).ok)
+        vspi._handle_control_packet()
+        assert host_driver.decode_packet(host_socket.recv(4096)).ok.msg_value == value
+
+    stats = vspi.stats()
+    assert set(stats['WRITE_P_HEATER']) == {'decode', 'send', 'total'}
+    assert stats['WRITE_P_HEATER']['total']['count'] == 5
+    assert stats['WRITE_P_HEATER']['total']['max_us'] >= stats['WRITE_P_HEATER']['decode']['max_us']
+    vspi.reset_stats()
+    assert vspi.stats() == {'WRITE_P_HEATER': {}}
+    vspi.transport.close()
+    host_socket.close()
@@ -0,0 +1,62 @@
+import socket
+from threading import Thread
+from e2e.load_gen import (
+    run_load_gen,
+    shard_devices,
+    parse_devices,
+    parse_hosts,
+)
+from e2e._vspi.ltd_driver import LtdDriver
+from e2e._vspi.test_drivers import DRIVER_CONFIG_LT_HT103
+
+
+def _host_server(server_socket: socket.socket):
+    host_driver = LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103)
+
+    def session(conn: socket.socket):
+        # one control msg per received chunk, every one is answered with a feedback msg
+        with conn:
+            try:
+                while conn.recv(65536):
+                    conn.sendall(host_driver.encode_packet(0, 12, 42.5).ok)
+            except ConnectionError:
+                # devices close with feedback msgs still unread when the run ends
+                pass
+
+    while True:
+        try:
+            conn, _ = server_socket.accept()
+        except OSError:
+            return
+        Thread(target=session, args=(conn,), daemon=True).start()
+
+
+def test_shard_devices():
+    device_models = parse_devices(['LT-HT103:3', 'LT-TO101'])
+    assert device_models == ['LT-HT103', 'LT-HT103', 'LT-HT103', 'LT-TO101']
+    hosts = parse_hosts(['7001', '10.0.0.2:7002'])
+    assert hosts == [('127.0.0.1', 7001), ('10.0.0.2', 7002)]
+
+    shards = shard_devices(device_models, hosts, 2)
+    assert shards == [
+        [('LT-HT103', '127.0.0.1', 7001), ('LT-HT103', '127.0.0.1', 7001)],
+        [('LT-HT103', '10.0.0.2', 7002), ('LT-TO101', '10.0.0.2', 7002)],
+    ]
+    # never more workers than devices
+    assert len(shard_devices(device_models, hosts, 16)) == 4
+
+
+def test_run_load_gen():
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.bind(('127.0.0.1', 0))
+    server_socket.listen(16)
+    Thread(target=_host_server, args=(server_socket,), daemon=True).start()
+
+    summary = run_load_gen(['LT-HT103'] * 4, [server_socket.getsockname()], rate_hz=50, workers=2, duration=1.0, report_period=0.25, quiet=True)
+    server_socket.close()
+
+    assert summary['devices'] == 4
+    assert summary['workers'] == 2
+    assert summary['tx_msgs'] > 0
+    assert summary['tx_bytes'] > summary['tx_msgs']
+    assert summary['feedback_latency']['count'] > 0
@@ -1,15 +1,25 @@
+import os
+import time
+import socket
+import pytest
+import multiprocessing
+from threading import Thread
 from e2e.lt_bus_vspi.lt_bus_vspi import (
     DeviceBuffer,
     DeviceRegisterConfig,
     LTBusVSPI,
     LTBusVSPICommMode,
 )
+from e2e.transport import SocketTransport
 from e2e.lt_bus_vspi.lt_bus_utils import (
     compute_crc16,
     READ_FC,
     u16_to_2u8,
     LT_BUS_PACKET_DATA_START,
     WRITE_FC,
+    READ_RESP_FC,
+    encode_lt_bus_request,
+    LtBusFramer,
 )
 
 
@@ -53,3 +63,276 @@ def test_encode_read_packet():
 
     READ_packet = bus_vspi.device_read_register('PR1')
     assert READ_packet == target_packet
+
+
+def test_device_buffer_zero_copy_reads():
+    device_buffer = DeviceBuffer(0xA000, [
+        DeviceRegisterConfig('device_id', 0x000, 'u16'),
+        DeviceRegisterConfig('flow', 0x002, 'f32'),
+        DeviceRegisterConfig('msg_buffer', 0x006, 'u8[]', 255),
+    ])
+    assert device_buffer.write_register('flow', 0.1) == device_buffer.read_register('flow') != 0.1  # f32 rounding
+    device_buffer.write_register('msg_buffer', b'\x01\x02\x03')
+
+    msg_buffer = device_buffer.read_register('msg_buffer')
+    region = device_buffer.read_region(0xA000, 2)
+    assert isinstance(msg_buffer, memoryview) and isinstance(region, memoryview)
+    assert msg_buffer[:4] == b'\x01\x02\x03\x00' and len(msg_buffer) == 255
+    # views of the buffer, not copies
+    device_buffer.write_register('device_id', 0x1234)
+    device_buffer.write_region(0xA006, b'\xAA')
+    assert region == b'\x34\x12'
+    assert msg_buffer[0] == 0xAA
+
+
+def test_handle_read_request_with_memoryview_data():
+    data_buffer = DeviceBuffer(0xD000, [DeviceRegisterConfig('FLOW', 0x000, 'f32')])
+    data_buffer.write_register('FLOW', 1.5)
+    bus_vspi = LTBusVSPI('LT-XX000', [data_buffer], lt_bus_slave_id=0x01)
+    bus_vspi.debug = False
+    vspi_socket, host_socket = socket.socketpair()
+    bus_vspi.transport = SocketTransport(vspi_socket)
+
+    bus_vspi.handle_lt_bus_request(bus_vspi.encode_READ_packet(0xD000, 4))
+    assert host_socket.recv(64) == bus_vspi.encode_READ_RESP_packet(0xD000, b'\x00\x00\xc0\x3f')
+    vspi_socket.close()
+    host_socket.close()
+
+
+def test_lt_bus_framer_resync():
+    read_request = encode_lt_bus_request(0x01, READ_FC, 0xD000, 4)
+    write_request = encode_lt_bus_request(0x01, WRITE_FC, 0xD000, 4, b'\x00\x00\xc0\x3f')
+    read_resp = encode_lt_bus_request(0x01, READ_RESP_FC, 0xD000, 4, b'\x01\x02\x03\x04')
+    bad_crc = read_request[:-2] + b'\x00}'
+    oversized = encode_lt_bus_request(0x01, WRITE_FC, 0xD000, 0xFFFF)
+    stream = b'\x00{{' + bad_crc + read_request + oversized + write_request + b'{\x01\x77' + read_resp
+
+    lt_bus_framer = LtBusFramer(buffer_size=16)
+    frames = []
+    # one byte at a time, every frame is split across feeds
+    for x in range(len(stream)):
+        frames += [bytes(frame) for frame in lt_bus_framer.feed(stream[x:x + 1])]
+    assert frames == [read_request, write_request, read_resp]
+    assert lt_bus_framer.bad_frames == 5  # two in '{{', bad CRC-16, oversized, unknown fc
+    assert lt_bus_framer.dropped_bytes == len(stream) - len(read_request) - len(write_request) - len(read_resp)
+    assert lt_bus_framer.end == lt_bus_framer.start == 0
+
+    frame = next(lt_bus_framer.feed(read_request))
+    assert isinstance(frame, memoryview) and frame.obj is lt_bus_framer.buffer
+
+
+def test_lt_bus_loop_short_reads():
+    data_buffer = DeviceBuffer(0xD000, [DeviceRegisterConfig('FLOW', 0x000, 'f32')])
+    bus_vspi = LTBusVSPI('LT-XX000', [data_buffer], lt_bus_slave_id=0x01)
+    bus_vspi.debug = False
+    vspi_socket, host_socket = socket.socketpair()
+    bus_vspi.transport = SocketTransport(vspi_socket)
+    device_thread = Thread(target=bus_vspi.lt_bus_loop)
+    device_thread.start()
+
+    write_request = encode_lt_bus_request(0x01, WRITE_FC, 0xD000, 4, b'\x00\x00\xc0\x3f')
+    read_request = encode_lt_bus_request(0x01, READ_FC, 0xD000, 4)
+    # junk, a corrupted READ header and a WRITE split across writes
+    for chunk in (b'\xff\xff', read_request[:5] + b'\x00', write_request[:3], write_request[3:9], write_request[9:]):
+        host_socket.sendall(chunk)
+        time.sleep(0.01)
+    host_socket.sendall(read_request)
+    READ_RESP_packet = bus_vspi.encode_READ_RESP_packet(0xD000, b'\x00\x00\xc0\x3f')
+    rx_buffer = b''
+    while len(rx_buffer) < len(READ_RESP_packet):
+        rx_buffer += host_socket.recv(64)
+    assert rx_buffer == READ_RESP_packet
+    assert data_buffer.read_register('FLOW') == 1.5
+
+    # pipelined requests in large chunks
+    requests_count = 5000
+    host_socket.sendall(read_request * requests_count)
+    rx_size = 0
+    while rx_size < len(READ_RESP_packet) * requests_count:
+        rx_size += len(host_socket.recv(65536))
+    assert rx_size == len(READ_RESP_packet) * requests_count
+
+    host_socket.close()
+    device_thread.join()
+    assert not bus_vspi.is_connected
+    vspi_socket.close()
+
+
+def test_lt_bus_vspi_region_index():
+    # an LT-RE850 like map split freely, TMP channels in their own buffer right after the main registers
+    main_buffer = DeviceBuffer(0xD000, [DeviceRegisterConfig('FLOW', 0x000, 'f32'), DeviceRegisterConfig('PR1', 0x004, 'f32')])
+    tmp_buffer = DeviceBuffer(0xD008, [DeviceRegisterConfig(f"TMP{x + 1}", x * 4, 'f32') for x in range(20)])
+    fault_buffer = DeviceBuffer(0xD100, [DeviceRegisterConfig('FAULT_REG', 0x000, 'u16')])
+    bus_vspi = LTBusVSPI('LT-XX000', [fault_buffer, tmp_buffer, main_buffer], lt_bus_slave_id=0x01)
+    bus_vspi.debug = False
+    assert bus_vspi.buffer_bases == [0xD000, 0xD008, 0xD100]
+
+    assert bus_vspi.map_region(0xD00C, 4).ok == [(tmp_buffer, 0xD00C, 4)]
+    assert bus_vspi.map_region(0xD004, 8).ok == [(main_buffer, 0xD004, 4), (tmp_buffer, 0xD008, 4)]
+    assert bus_vspi.map_region(0xD056, 4).err == 'Unmapped Register Region 0xD056-0xD059: no Device Buffer at 0xD058'
+    assert bus_vspi.map_region(0xD050, 0x100).err == 'Unmapped Register Region 0xD050-0xD14F: no Device Buffer at 0xD058'
+    assert bus_vspi.map_region(0xCFFF, 2).err == 'Unmapped Register Region 0xCFFF-0xD000: no Device Buffer at 0xCFFF'
+    assert bus_vspi.map_region(0xD102, 1).err == 'Unmapped Register Region 0xD102-0xD102: no Device Buffer at 0xD102'
+
+    # WRITE and READ across the buffer boundary
+    vspi_socket, host_socket = socket.socketpair()
+    bus_vspi.transport = SocketTransport(vspi_socket)
+    bus_vspi.handle_lt_bus_request(encode_lt_bus_request(0x01, WRITE_FC, 0xD004, 8, b'\x00\x00\xc0\x3f\x00\x00\x20\x41'))
+    assert (main_buffer.read_register('PR1'), tmp_buffer.read_register('TMP1')) == (1.5, 10.0)
+    bus_vspi.handle_lt_bus_request(encode_lt_bus_request(0x01, READ_FC, 0xD000, 12))
+    assert host_socket.recv(64) == bus_vspi.encode_READ_RESP_packet(0xD000, bytes(4) + b'\x00\x00\xc0\x3f\x00\x00\x20\x41')
+    vspi_socket.close()
+    host_socket.close()
+
+    with pytest.raises(Exception, match='Device Buffers Overlap: 0xD000-0xD007 and 0xD004'):
+        LTBusVSPI('LT-XX000', [main_buffer, DeviceBuffer(0xD004, [DeviceRegisterConfig('X', 0x000, 'u8')])])
+
+
+def test_READ_RESP_cache(monkeypatch):
+    monkeypatch.setattr(LTBusVSPI, 'READ_RESP_CACHE_SIZE', 2)
+    data_buffer = DeviceBuffer(0xD000, [DeviceRegisterConfig('FLOW', 0x000, 'f32'), DeviceRegisterConfig('PR1', 0x004, 'f32')])
+    bus_vspi = LTBusVSPI('LT-XX000', [data_buffer], lt_bus_slave_id=0x01)
+    bus_vspi.debug = False
+    vspi_socket, host_socket = socket.socketpair()
+    bus_vspi.transport = SocketTransport(vspi_socket)
+
+    def poll(register_address: int, size: int) -> bytes:
+        bus_vspi.handle_lt_bus_request(encode_lt_bus_request(0x01, READ_FC, register_address, size))
+        return host_socket.recv(64)
+
+    assert poll(0xD000, 8) == bus_vspi.encode_READ_RESP_packet(0xD000, bytes(8))
+    assert poll(0xD000, 8) == bus_vspi.encode_READ_RESP_packet(0xD000, bytes(8))
+    assert (bus_vspi.READ_RESP_cache_hits, bus_vspi.READ_RESP_cache_misses) == (1, 1)
+
+    # a write bumps the buffer version, the cached packet is encoded again
+    version = data_buffer.version
+    data_buffer.write_register('PR1', 1.5)
+    assert data_buffer.version == version + 1
+    assert poll(0xD000, 8) == bus_vspi.encode_READ_RESP_packet(0xD000, bytes(4) + b'\x00\x00\xc0\x3f')
+    bus_vspi.handle_lt_bus_request(encode_lt_bus_request(0x01, WRITE_FC, 0xD000, 4, b'\x00\x00\x20\x41'))
+    assert poll(0xD000, 8) == bus_vspi.encode_READ_RESP_packet(0xD000, b'\x00\x00\x20\x41\x00\x00\xc0\x3f')
+    assert (bus_vspi.READ_RESP_cache_hits, bus_vspi.READ_RESP_cache_misses) == (1, 3)
+
+    # least recently used regions are evicted first
+    poll(0xD004, 4)
+    poll(0xD000, 8)
+    poll(0xD000, 4)
+    assert list(bus_vspi.READ_RESP_cache) == [(0xD000, 8), (0xD000, 4)]
+    vspi_socket.close()
+    host_socket.close()
+
+
+def test_device_register_view():
+    device_buffer = DeviceBuffer(0xD000, [
+        DeviceRegisterConfig('FLOW', 0x000, 'f32'),
+        DeviceRegisterConfig('INPUT_REG', 0x004, 'u16'),
+    ] + [DeviceRegisterConfig(f"TMP{x + 1}", 0x006 + x * 4, 'f32') for x in range(20)] + [
+        DeviceRegisterConfig('msg_buffer', 0x056, 'u8[]', 4),
+    ])
+    view = device_buffer.view
+    assert view.array.dtype.itemsize == len(device_buffer.buffer)
+
+    # contiguous registers of one type are a plain array over the buffer
+    tmp = view['TMP1':'TMP20']
+    assert tmp.shape == (20,) and tmp.base is not None
+    version = device_buffer.version
+    view['TMP1':'TMP20'] = [x * 0.5 for x in range(20)]
+    assert device_buffer.version == version + 1
+    assert device_buffer.read_register('TMP7') == 3.0
+    assert tmp[6] == 3.0
+
+    view['FLOW'] = 1.5
+    view[['INPUT_REG', 'msg_buffer']] = (6, [1, 2, 3, 4])
+    assert device_buffer.read_register('FLOW') == 1.5
+    assert device_buffer.read_register('msg_buffer') == b'\x01\x02\x03\x04'
+    assert view['FLOW':'TMP1'][['FLOW', 'INPUT_REG']].item() == (1.5, 6)
+
+    device_buffer.write_register('TMP20', 42.0)
+    snapshot = view.to_dict()
+    assert snapshot['TMP20'] == 42.0 and snapshot['INPUT_REG'] == 6 and snapshot['msg_buffer'] == b'\x01\x02\x03\x04'
+    assert list(snapshot) == [rc.register_name for rc in view.registers]
+    assert view.copy()['TMP20'] == 42.0
+
+
+def _shared_registers() -> list[DeviceRegisterConfig]:
+    return [DeviceRegisterConfig('FLOW', 0x000, 'f32'), DeviceRegisterConfig('PR1', 0x004, 'f32'), DeviceRegisterConfig('PR2', 0x008, 'f32')]
+
+
+def _shared_buffer_writer(shared_memory_name: str, writes: int):
+    # every write keeps PR1 == PR2, a torn snapshot would show them apart
+    device_buffer = DeviceBuffer(0xD000, _shared_registers(), shared_memory_name=shared_memory_name, attach=True)
+    for x in range(writes):
+        device_buffer.view[['PR1', 'PR2']] = (x, x)
+    device_buffer.write_register('FLOW', 1.5)
+    device_buffer.close()
+
+
+def test_shared_memory_device_buffer():
+    shared_memory_name = f"lt_bus_test_{os.getpid()}"
+    device_buffer = DeviceBuffer(0xD000, _shared_registers(), shared_memory_name=shared_memory_name)
+    assert device_buffer.is_shared
+    bus_vspi = LTBusVSPI('LT-XX000', [device_buffer], lt_bus_slave_id=0x01)
+    bus_vspi.debug = False
+    vspi_socket, host_socket = socket.socketpair()
+    bus_vspi.transport = SocketTransport(vspi_socket)
+    bus_vspi.handle_lt_bus_request(encode_lt_bus_request(0x01, READ_FC, 0xD000, 4))
+    assert host_socket.recv(64) == bus_vspi.encode_READ_RESP_packet(0xD000, bytes(4))
+
+    writer = multiprocessing.get_context('fork').Process(target=_shared_buffer_writer, args=(shared_memory_name, 20000))
+    writer.start()
+    snapshots = 0
+    while writer.is_alive() or not snapshots:
+        snapshot = device_buffer.view.to_dict()
+        assert snapshot['PR1'] == snapshot['PR2']
+        snapshots += 1
+    writer.join()
+    assert writer.exitcode == 0
+    assert device_buffer.version == 20001
+    assert device_buffer.view.to_dict() == {'FLOW': 1.5, 'PR1': 19999.0, 'PR2': 19999.0}
+
+    # the writes of the other process invalidate the cached READ_RESP
+    bus_vspi.handle_lt_bus_request(encode_lt_bus_request(0x01, READ_FC, 0xD000, 4))
+    assert host_socket.recv(64) == bus_vspi.encode_READ_RESP_packet(0xD000, b'\x00\x00\xc0\x3f')
+    vspi_socket.close()
+    host_socket.close()
+    device_buffer.close()
+
+
+def test_mmap_device_buffer(tmp_path):
+    mmap_path = str(tmp_path / 'lt_xx000_data.bin')
+    device_buffer = DeviceBuffer(0xD000, _shared_registers(), mmap_path=mmap_path)
+    observer = DeviceBuffer(0xD000, _shared_registers(), mmap_path=mmap_path, attach=True)
+    assert os.path.getsize(mmap_path) == 8 + 12
+
+    device_buffer.write_register('PR1', 2.5)
+    observer.view['PR2'] = 4.0
+    assert observer.read_register('PR1') == 2.5
+    assert device_buffer.read_register('PR2') == 4.0
+    assert device_buffer.version == observer.version == 2
+    assert observer.snapshot(0xD004, 8) == device_buffer.snapshot()[4:]
+
+    with pytest.raises(Exception, match='Shared Device Buffer too Small'):
+        DeviceBuffer(0xD000, _shared_registers() + [DeviceRegisterConfig('PR3', 0x00C, 'f32')], mmap_path=mmap_path, attach=True)
+    observer.close()
+    device_buffer.close()
+    assert not os.path.exists(mmap_path)
+
+
+def test_device_buffer_failed_writes_keep_seqlock():
+    device_buffer = DeviceBuffer(0xD000, [DeviceRegisterConfig('X', 0x000, 'u8'), DeviceRegisterConfig('msg_buffer', 0x001, 'u8[]', 2)])
+    with pytest.raises(Exception):
+        device_buffer.write_register('X', 300)
+    with pytest.raises(Exception, match='Register Value too Large'):
+        device_buffer.write_register('msg_buffer', b'\x01\x02\x03')
+    with pytest.raises(Exception, match='Register Region Out of Range'):
+        device_buffer.write_region(0xD002, b'\x01\x02')
+    assert device_buffer._seq[0] == 0
+    with pytest.raises(Exception):
+        device_buffer.view['X'] = 'x'
+    assert device_buffer._seq[0] == 2
+    assert device_buffer.snapshot() == bytes(3)
+
+    # a writer that died mid-write
+    device_buffer.begin_write()
+    with pytest.raises(Exception, match='Device Buffer Write in Progress Timeout'):
+        device_buffer.read_consistent(device_buffer.buffer.copy, timeout=0.05)
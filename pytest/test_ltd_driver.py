@@ -1,11 +1,16 @@
 import struct
 from e2e._vspi.ltd_driver import (
     LtdDriver,
+    LtdFramer,
     MsgTypeConfig,
     DeviceMsg,
     DATA_TYPE_UINT,
     DATA_TYPE_FLOAT,
     DATA_TYPE_COMMAND,
+    DATA_TYPE_INT,
+    ENCODING_SCALED,
+    ENCODING_DELTA,
+    DELTA_KEYFRAME_INTERVAL,
 )
 
 TEST_DRIVER_CONFIG: list[MsgTypeConfig] = [
@@ -128,3 +133,182 @@ def test_fltsq_encode():
         ith_float_buffer = packet[start_idx:start_idx + 4]
         ith_float = struct.unpack(float_binary_parser, ith_float_buffer)[0]
         assert round(ith_float, 2) == i / 10
+
+
+def test_ltd_framer():
+    ltd_driver_0x87 = LtdDriver([0x87, 0x87], TEST_DRIVER_CONFIG)
+    ltd_framer = LtdFramer(ltd_driver_0x87.protocol_version, buffer_size=16)
+
+    packets = [ltd_driver_0x87.encode_packet(sn, sn % 5, sn).ok for sn in range(20)]
+    garbage = bytes([0x00, 0x87, 0x0D, 0x0A, 0x87, 0x87, 0x03, 0xFF])
+    stream = garbage + b''.join(packets[:10]) + garbage + b''.join(packets[10:])
+
+    # feed the stream in uneven chunks
+    framed_packets = []
+    for idx in range(0, len(stream), 7):
+        framed_packets += list(ltd_framer.feed(memoryview(stream)[idx:idx + 7]))
+
+    assert framed_packets == packets
+    assert ltd_framer.dropped_bytes == 2 * len(garbage)
+    for packet in framed_packets:
+        assert ltd_driver_0x87.decode_packet(packet).ok
+
+
+def test_ltd_driver_0x87_decode_buffer():
+    ltd_driver_0x87 = LtdDriver([0x87, 0x87], TEST_DRIVER_CONFIG)
+    packet_1 = ltd_driver_0x87.encode_packet(1, ltd_driver_0x87.get_msg_type_by_name('READ_WEIGHT'), 2.5).ok
+    packet_2 = ltd_driver_0x87.encode_packet(2, ltd_driver_0x87.get_msg_type_by_name('DEVICE_ERROR'), 0xF0).ok
+    packet_3 = bytearray(ltd_driver_0x87.encode_packet(3, ltd_driver_0x87.get_msg_type_by_name('PISTON_PUMP'), 1000).ok)
+    packet_3[-4] ^= 0xFF  # invalid crc16
+    buffer = b'\x87\x00' + packet_1 + b'\x87\x87\x0F' + packet_2 + bytes(packet_3)
+
+    records = ltd_driver_0x87.decode_buffer(buffer).ok
+    assert len(records) == 3
+    assert list(records['seq_number']) == [1, 2, 3]
+    assert list(records['msg_type']) == [2, 14, 0]
+    assert list(records['crc_ok']) == [True, True, False]
+    assert list(records['value']) == [2.5, 240, 1000]
+
+
+def test_ltd_driver_0x87_encode_many():
+    ltd_driver_0x87 = LtdDriver([0x87, 0x87], TEST_DRIVER_CONFIG)
+    items = [(7, 2, 2.254), (7, 14, 0xF0), (7, 0, 1000), (7, 15, 0xFF)]
+    target_buffer = b''.join([ltd_driver_0x87.encode_packet(*item).ok for item in items])
+
+    # allocated output buffer
+    result = ltd_driver_0x87.encode_many(items)
+    assert result.ok == target_buffer
+
+    # reusable output buffer
+    out = bytearray(256)
+    result = ltd_driver_0x87.encode_many(items, out)
+    assert result.ok == target_buffer
+    assert out[:len(target_buffer)] == target_buffer
+
+    # error cases
+    assert ltd_driver_0x87.encode_many(items, bytearray(16)).err == 'Output Buffer Too Small'
+    assert ltd_driver_0x87.encode_many([(0, 10, 1)]).err == 'Unknown msg_type'
+
+    # cfg2 override, the shared msg configs are left untouched
+    packets = [ltd_driver_0x87.encode_packet(*item, cfg2=0x05).ok for item in items]
+    assert all(packet[6] == 0x05 for packet in packets)
+    assert ltd_driver_0x87.encode_many(items, cfg2=0x05).ok == b''.join(packets)
+    assert all(config.cfg2 == 0 for config in ltd_driver_0x87.driver_msg_type_config_map.values())
+
+
+def test_fltsq_decode():
+    import numpy as np
+
+    ltd_driver_fltsq = LtdDriver([0x99, 0x99], [])
+    msg_sequence = [(x / 10) for x in range(30)]
+
+    # list and numpy encode paths produce the same packet
+    packet = ltd_driver_fltsq.fltsq_encode(msg_sequence).ok
+    assert ltd_driver_fltsq.fltsq_encode(np.array(msg_sequence)).ok == packet
+
+    result = ltd_driver_fltsq.fltsq_decode(packet)
+    assert result.ok.dtype == np.dtype('<f4')
+    assert np.allclose(result.ok, msg_sequence)
+
+    # error cases
+    assert ltd_driver_fltsq.fltsq_encode([0.0] * 63).err == 'FLTSQ Sequence Too Long'
+    assert ltd_driver_fltsq.fltsq_decode(packet[:-1]).err == 'Invalid Packet Size'
+    invalid_packet = bytearray(packet)
+    invalid_packet[5] ^= 0xFF
+    assert ltd_driver_fltsq.fltsq_decode(invalid_packet).err['msg'] == 'Invalid CRC-16'
+    assert LtdDriver([0x99, 0x98], []).fltsq_decode(packet).err == 'Invalid Version Bytes'
+
+
+def test_device_msg_shared_config():
+    ltd_driver_0x87 = LtdDriver([0x87, 0x87], TEST_DRIVER_CONFIG)
+
+    # default configs are not aliased between instances
+    device_msg_1 = DeviceMsg()
+    device_msg_2 = DeviceMsg()
+    assert device_msg_1.config is not device_msg_2.config
+
+    # decoded messages share one read only config per cfg1 and cfg2
+    packet = bytes([0x87, 0x87, 0x0F, 0x00, 0x00, 0xA2, 0x00, 0x89, 0x41, 0x10, 0x40, 0xA4, 0x1A, 0x0D, 0x0A])
+    device_msg_3 = ltd_driver_0x87.decode_packet(packet).ok
+    device_msg_4 = ltd_driver_0x87.decode_packet(bytearray(packet)).ok
+    assert device_msg_3.config is device_msg_4.config
+    assert device_msg_3.config.msg_name == 'READ_WEIGHT'
+    try:
+        device_msg_3.config.cfg2 = 1
+        assert False
+    except AttributeError:
+        pass
+
+    # base64 value is computed lazily from the packet
+    assert device_msg_3.b64_msg_value == 'iUEQQA=='
+    assert device_msg_4.b64_msg_value == 'iUEQQA=='
+
+
+def test_ltd_driver_0x87_symbolic_api():
+    ltd_driver_0x87 = LtdDriver([0x87, 0x87], TEST_DRIVER_CONFIG)
+
+    # name <-> type index
+    for config in TEST_DRIVER_CONFIG:
+        assert ltd_driver_0x87.get_msg_type_by_name(config.msg_name) == config.msg_type
+        assert ltd_driver_0x87.get_msg_name_by_type(config.msg_type) == config.msg_name
+    assert ltd_driver_0x87.get_msg_name_by_type(5) is None
+
+    # encode by name
+    result_1 = ltd_driver_0x87.encode_by_name(0, 'DUMMY_MSG', 1)
+    assert result_1.err == 'Unknown msg_name'
+    result_2 = ltd_driver_0x87.encode_by_name(0, 'READ_WEIGHT', 2.254)
+    assert result_2.ok == ltd_driver_0x87.encode_packet(0, 2, 2.254).ok
+
+    # decode to dict
+    result_3 = ltd_driver_0x87.decode_to_dict(result_2.ok)
+    assert result_3.ok['msg_name'] == 'READ_WEIGHT'
+    assert result_3.ok['msg_type'] == 2
+    assert result_3.ok['seq_number'] == 0
+    assert result_3.ok['cfg2'] == 0
+    assert struct.pack('<f', result_3.ok['msg_value']) == struct.pack('<f', 2.254)
+    assert ltd_driver_0x87.decode_to_dict(result_2.ok[:-5]).err == 'Packet Too Small'
+
+
+COMPACT_DRIVER_CONFIG: list[MsgTypeConfig] = [
+    MsgTypeConfig(msg_type=0, msg_name='READ_T1', data_type=DATA_TYPE_FLOAT, size_bytes=2, cfg2=0),
+    MsgTypeConfig(msg_type=1, msg_name='READ_T2', data_type=DATA_TYPE_INT, size_bytes=2, cfg2=0, encoding=ENCODING_SCALED, scale=0.01),
+    MsgTypeConfig(msg_type=2, msg_name='READ_T3', data_type=DATA_TYPE_FLOAT, size_bytes=4, cfg2=0, encoding=ENCODING_DELTA, scale=0.001),
+]
+
+
+def test_ltd_driver_compact_encodings():
+    ltd_tx_driver = LtdDriver([0x13, 0x14], COMPACT_DRIVER_CONFIG)
+    ltd_rx_driver = LtdDriver([0x13, 0x14], COMPACT_DRIVER_CONFIG)
+
+    # f16 half float
+    packet = ltd_tx_driver.encode_packet(0, 0, 21.5).ok
+    assert len(packet) == LtdDriver.PACKET_MIN_SIZE + 2
+    assert ltd_rx_driver.decode_packet(packet).ok.msg_value == 21.5
+
+    # scaled fixed point i16
+    packet = ltd_tx_driver.encode_packet(0, 1, -123.456).ok
+    assert len(packet) == LtdDriver.PACKET_MIN_SIZE + 2
+    assert abs(ltd_rx_driver.decode_packet(packet).ok.msg_value + 123.456) <= 0.005
+    assert ltd_tx_driver.encode_packet(0, 1, 400.0).err == 'Value Out of Range'
+
+    # delta from previous, the first frame is a f32 keyframe
+    values = [20.0 + x * 0.0137 for x in range(40)] + [90.0, 90.001]
+    packets = [ltd_tx_driver.encode_packet(idx, 2, value).ok for idx, value in enumerate(values)]
+    assert ltd_rx_driver.decode_packet(packets[1]).err == 'Missing Delta Keyframe'
+    assert [len(packet) for packet in packets[:3]] == [15, 13, 13]
+    assert len(packets[DELTA_KEYFRAME_INTERVAL + 1]) == 15  # periodic keyframe
+    assert len(packets[40]) == 15  # delta out of i16 range
+    for value, packet in zip(values, packets):
+        assert abs(ltd_rx_driver.decode_packet(packet).ok.msg_value - value) <= 0.0005 + 1e-5
+
+    # batch encode and bulk decode match the per packet path
+    ltd_tx_driver = LtdDriver([0x13, 0x14], COMPACT_DRIVER_CONFIG)
+    ltd_rx_driver = LtdDriver([0x13, 0x14], COMPACT_DRIVER_CONFIG)
+    items = [(idx, idx % 3, 25.0 + idx * 0.01) for idx in range(60)]
+    stream = bytes(ltd_tx_driver.encode_many(items).ok)
+    records = ltd_rx_driver.decode_buffer(stream).ok
+    assert records.size == len(items)
+    assert records['crc_ok'].all()
+    for (_, msg_type, value), record_value in zip(items, records['value']):
+        tolerance = {0: 0.02, 1: 0.005, 2: 0.0005 + 1e-5}[msg_type]
+        assert abs(record_value - value) <= tolerance
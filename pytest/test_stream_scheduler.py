@@ -0,0 +1,60 @@
+import asyncio
+import time
+from e2e._vspi.stream_scheduler import StreamScheduler
+
+
+def test_stream_scheduler_batches_due_streams():
+    writes = []
+    stream_scheduler = StreamScheduler()
+    stream_scheduler.add_stream('FAST', 200, lambda tick: [(0, tick)], writes.append)
+    stream_scheduler.add_stream('SLOW', 50, lambda tick: [(1, tick), (2, tick)], writes.append)
+    stream_scheduler.run(duration=0.2)
+
+    stats = stream_scheduler.stats()
+    assert 36 <= stats['FAST']['ticks'] + stats['FAST']['skipped_ticks'] <= 40
+    assert 9 <= stats['SLOW']['ticks'] + stats['SLOW']['skipped_ticks'] <= 10
+
+    # both streams are due on the first tick, their msgs share one write
+    assert writes[0] == [(0, 0, 0), (0, 1, 0), (0, 2, 0)]
+    assert stream_scheduler.writes == len(writes) < stats['FAST']['ticks'] + stats['SLOW']['ticks']
+    fast_sns = [sn for items in writes for sn, msg_type, _ in items if msg_type == 0]
+    assert fast_sns == sorted(fast_sns)
+
+
+def test_stream_scheduler_skips_missed_ticks():
+    def slow_msg_source(tick: int):
+        if tick == 2:
+            time.sleep(0.035)
+        return [(0, tick)]
+
+    ticks = []
+    stream_scheduler = StreamScheduler()
+    stream_scheduler.add_stream('STALL', 100, slow_msg_source, lambda items: ticks.extend(x[2] for x in items))
+    stream_scheduler.run(duration=0.1)
+
+    # the first overdue tick is sent late, the rest are skipped instead of bursted and later ticks keep their phase
+    stats = stream_scheduler.stats()
+    assert stats['STALL']['skipped_ticks'] >= 2
+    assert stats['STALL']['ticks'] + stats['STALL']['skipped_ticks'] == 10
+    assert ticks[:4] == [0, 1, 2, 3]
+    assert ticks[4] >= 6
+    assert stats['STALL']['lateness_max_us'] >= 20000
+
+
+def test_stream_scheduler_on_event_loop():
+    writes = []
+
+    async def write_items(items):
+        writes.append(items)
+        await asyncio.sleep(0)
+
+    stream_scheduler = StreamScheduler()
+    stream_scheduler.add_stream('FAST', 200, lambda tick: [(0, tick)], write_items)
+    stream_scheduler.add_stream('SLOW', 50, lambda tick: [(1, tick)], write_items)
+    asyncio.run(stream_scheduler.run_on_event_loop(duration=0.2))
+
+    stats = stream_scheduler.stats()
+    assert 36 <= stats['FAST']['ticks'] + stats['FAST']['skipped_ticks'] <= 40
+    assert 9 <= stats['SLOW']['ticks'] + stats['SLOW']['skipped_ticks'] <= 10
+    assert writes[0] == [(0, 0, 0), (0, 1, 0)]
+    assert not stream_scheduler.running
@@ -0,0 +1,68 @@
+import time
+from e2e.traffic_log import (
+    TrafficRecorder,
+    TrafficReplayer,
+    DIRECTION_RX,
+    DIRECTION_TX,
+    MSG_TYPE_UNKNOWN,
+    TRAFFIC_LOG_INDEX_INTERVAL,
+)
+from e2e._vspi.ltd_driver import LtdDriver
+from e2e._vspi.test_drivers import DRIVER_CONFIG_LT_HT103
+
+
+def test_traffic_record_and_replay(tmp_path):
+    ltd_driver = LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103)
+    log_path = str(tmp_path / 'lt_ht103.ltl')
+
+    # bursts are recorded frame by frame
+    recorder = TrafficRecorder(log_path, 'LT-HT103')
+    for sn in range(100):
+        recorder.record_ltd(DIRECTION_TX, bytes(ltd_driver.encode_many([(sn, 0, 20.0 + sn), (sn, 1, 30.0)]).ok))
+    recorder.record_ltd(DIRECTION_RX, ltd_driver.encode_packet(0, 12, 55.0).ok)
+    recorder.record(DIRECTION_TX, b'\x01\x02', MSG_TYPE_UNKNOWN)
+    recorder.close()
+    assert recorder.records == 202
+
+    replayer = TrafficReplayer(log_path)
+    assert replayer.device_model == 'LT-HT103'
+    assert len(replayer.index) == 202 // TRAFFIC_LOG_INDEX_INTERVAL + 1
+    records = list(replayer.records())
+    assert len(records) == 202
+    assert [x[2] for x in records[:4]] == [0, 1, 0, 1]
+    assert records[200][1:3] == (DIRECTION_RX, 12)
+
+    # seek by timestamp
+    assert list(replayer.records(start_ns=records[150][0]))[0][0] == records[150][0]
+
+    # max speed replay of msg_type 0 device frames
+    frames = []
+    assert replayer.replay(frames.append, speed=0, msg_types={0}) == 100
+    assert ltd_driver.decode_packet(frames[99]).ok.msg_value == 119.0
+
+    # looped replay keeps sequence numbers increasing
+    frames = []
+
+    def write_packet(frame: bytes):
+        frames.append(frame)
+        if len(frames) == 250:
+            replayer.stop()
+    replayer.replay(write_packet, speed=0, loop=True, msg_types={1}, rewrite_seq_numbers=True)
+    assert [ltd_driver.decode_packet(x).ok.seq_number for x in frames] == list(range(250))
+
+
+def test_traffic_replay_speed(tmp_path):
+    log_path = str(tmp_path / 'speed.ltl')
+    recorder = TrafficRecorder(log_path)
+    recorder.record(DIRECTION_TX, b'A', 0)
+    time.sleep(0.1)
+    recorder.record(DIRECTION_TX, b'B', 0)
+    recorder.close()
+
+    replayer = TrafficReplayer(log_path)
+    t0 = time.monotonic()
+    replayer.replay(lambda frame: None, speed=1)
+    assert time.monotonic() - t0 >= 0.09
+    t0 = time.monotonic()
+    replayer.replay(lambda frame: None, speed=4)
+    assert time.monotonic() - t0 < 0.09
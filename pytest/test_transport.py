@@ -0,0 +1,192 @@
+import os
+import time
+import socket
+import pytest
+from threading import Thread
+from e2e.transport import (
+    Transport,
+    SocketTransport,
+    TcpTransport,
+    UnixTransport,
+    FdTransport,
+    PtyTransport,
+    SerialTransport,
+    transport_from_url,
+)
+from e2e._vspi.vspi import VSPI
+from e2e._vspi.ltd_driver import (
+    LtdDriver,
+    LtdFramer,
+)
+from e2e._vspi.test_drivers import DRIVER_CONFIG_LT_HT103
+
+
+def _recv_exact(transport, size: int) -> bytes:
+    rx_buffer = bytearray(size)
+    rx_size = 0
+    while rx_size < size:
+        rx_size += transport.recv_into(memoryview(rx_buffer)[rx_size:])
+    return bytes(rx_buffer)
+
+
+def _check_pair(device_transport, host_transport):
+    segments = [b'{\x01\xab', memoryview(bytes(range(200))), b'\x00\x00}']
+    assert device_transport.sendmsg(segments) == 206
+    assert _recv_exact(host_transport, 206) == b''.join(bytes(x) for x in segments)
+
+    assert host_transport.send(b'ping') == 4
+    assert _recv_exact(device_transport, 4) == b'ping'
+
+    # non-blocking without data
+    device_transport.set_blocking(False)
+    with pytest.raises(BlockingIOError):
+        device_transport.recv_into(bytearray(16))
+    assert not device_transport.wait_readable(0)
+    device_transport.set_blocking(True)
+
+
+def test_tcp_transport():
+    listener = socket.create_server(('127.0.0.1', 0))
+    tcp_transport = TcpTransport(*listener.getsockname())
+    tcp_transport.open()
+    host_transport = SocketTransport(listener.accept()[0])
+    assert tcp_transport.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    _check_pair(tcp_transport, host_transport)
+    tcp_transport.close()
+    assert host_transport.recv_into(bytearray(16)) == 0  # EOF
+    host_transport.close()
+    listener.close()
+
+
+def test_unix_transport(tmp_path):
+    unix_path = str(tmp_path / 'vspi.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(unix_path)
+    listener.listen(1)
+    unix_transport = transport_from_url(f"unix://{unix_path}")
+    assert isinstance(unix_transport, UnixTransport)
+    unix_transport.open()
+    host_transport = SocketTransport(listener.accept()[0])
+    _check_pair(unix_transport, host_transport)
+    unix_transport.close()
+    host_transport.close()
+    listener.close()
+
+
+def test_pty_transport(tmp_path):
+    link_path = str(tmp_path / 'ttyS90')
+    pty_transport = PtyTransport(link_path)
+    pty_transport.open()
+    assert os.path.realpath(link_path) == pty_transport.port_name
+    host_transport = FdTransport(os.open(link_path, os.O_RDWR | os.O_NOCTTY))
+    _check_pair(pty_transport, host_transport)
+
+    # raw mode, CR LF delimiters pass through untouched
+    pty_transport.send(b'\x0d\x0a\x03')
+    assert _recv_exact(host_transport, 3) == b'\x0d\x0a\x03'
+    host_transport.close()
+    pty_transport.close()
+    assert not os.path.lexists(link_path)
+
+
+def test_non_blocking_send():
+    device_socket, host_socket = socket.socketpair()
+    device_transport = SocketTransport(device_socket)
+    device_transport.set_blocking(False)
+    # fill the socket buffer so the first write of send() and sendmsg() raises BlockingIOError
+    while True:
+        try:
+            device_socket.send(bytes(65536))
+        except BlockingIOError:
+            break
+
+    received = bytearray()
+
+    def drain():
+        time.sleep(0.05)
+        for chunk in iter(lambda: host_socket.recv(1 << 20), b''):
+            received.extend(chunk)
+    host_thread = Thread(target=drain)
+    host_thread.start()
+    assert device_transport.send(b'ping') == 4
+    assert device_transport.sendmsg([b'{', bytes(100000), b'}']) == 100002
+    device_transport.close()
+    host_thread.join()
+    host_socket.close()
+    assert received.endswith(b'ping{' + bytes(100000) + b'}')
+
+    with pytest.raises(TypeError):
+        type('NoSendTransport', (Transport,), {'open': None, 'close': None, 'fileno': None, 'recv_into': None})()
+
+
+def test_transport_from_url():
+    tcp_transport = transport_from_url('tcp://10.0.0.2:7000')
+    assert (tcp_transport.host, tcp_transport.port) == ('10.0.0.2', 7000)
+    pty_transport = transport_from_url('pty://')
+    assert isinstance(pty_transport, PtyTransport) and pty_transport.link_path is None
+    serial_transport = transport_from_url('serial:///dev/ttyACM1?baud=921600')
+    assert isinstance(serial_transport, SerialTransport)
+    assert (serial_transport.port_name, serial_transport.baud_rate) == ('/dev/ttyACM1', 921600)
+    with pytest.raises(Exception, match='Unknown Transport'):
+        transport_from_url('udp://127.0.0.1:1')
+
+
+def test_vspi_over_pty():
+    host_driver = LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103)
+    pty_transport = PtyTransport()
+    vspi = VSPI('LT-HT103', LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103), control_feedback_map={12: 5}, transport=pty_transport)
+    vspi.debug = False
+    vspi.connect()
+    host_transport = FdTransport(os.open(pty_transport.port_name, os.O_RDWR | os.O_NOCTTY))
+
+    vspi.write_msg(0, 21.5)
+    packet = host_driver.encode_packet(0, 0, 21.5).ok
+    assert host_driver.decode_packet(_recv_exact(host_transport, len(packet))).ok.msg_value == 21.5
+
+    host_transport.send(host_driver.encode_packet(0, 12, 42.5).ok)
+    vspi._handle_control_packet()
+    feedback_msg = host_driver.decode_packet(_recv_exact(host_transport, len(packet))).ok
+    assert (feedback_msg.config.msg_name, feedback_msg.msg_value) == ('P_HEATER', 42.5)
+    host_transport.close()
+    vspi.disconnect()
+
+
+def test_vspi_write_errors_and_device_mode():
+    vspi_socket, host_socket = socket.socketpair()
+    ltd_driver = LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103)
+    vspi = VSPI('LT-HT103', ltd_driver, transport=SocketTransport(vspi_socket))
+    vspi.debug = False
+    vspi.device_cfg2 = 0x02
+    host_socket.setblocking(False)
+
+    # encode errors are logged and nothing is written
+    vspi.write_msg(99, 1)
+    vspi.burst_sequence([(0, 21.5), (99, 1)])
+    with pytest.raises(BlockingIOError):
+        host_socket.recv(64)
+
+    vspi.burst_sequence([(0, 21.5), (1, 22.5)])
+    frames = list(LtdFramer(ltd_driver.protocol_version).feed(host_socket.recv(64)))
+    assert [frame[6] for frame in frames] == [0x02, 0x02]
+    assert all(config.cfg2 != 0x02 for config in ltd_driver.driver_msg_type_config_map.values())
+    vspi_socket.close()
+    host_socket.close()
+
+
+def test_vspi_feedback_uses_device_mode():
+    vspi_socket, host_socket = socket.socketpair()
+    host_driver = LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103)
+    vspi = VSPI('LT-HT103', LtdDriver([0x13, 0x13], DRIVER_CONFIG_LT_HT103), {12: 5}, transport=SocketTransport(vspi_socket))
+    vspi.debug = False
+    host_framer = LtdFramer(host_driver.protocol_version)
+
+    vspi.switch_device_mode(0x03)
+    vspi._handle_device_packet(host_driver.encode_packet(0, 12, 42.5).ok)
+    frames = []
+    while len(frames) < 2:
+        frames.extend(bytes(x) for x in host_framer.feed(host_socket.recv(64)))
+    # the mode switch msg, then the feedback of the control msg in the new mode
+    assert [frame[6] for frame in frames] == [0x03, 0x03]
+    assert host_driver.decode_packet(frames[1]).ok.msg_value == 42.5
+    vspi_socket.close()
+    host_socket.close()
@@ -3,20 +3,38 @@ import sys
 import time
 import socket
 import code
-import math
-import random
 import readline
 import inspect
 import serial
 from typing import Literal
 from rlcompleter import Completer
 from test_drivers import *
+from e2e._vspi.ltd_driver import LtdFramer
+from e2e._vspi.stream_scheduler import StreamScheduler
+from e2e.clock import (
+    Clock,
+    VirtualClock,
+    real_clock,
+)
+from e2e._vspi.signal_engine import (
+    SignalEngine,
+    ConstSource,
+    SineSource,
+    SquareSource,
+    RampSource,
+    NoiseSource,
+    ClipSource,
+)
 
 
 vspi_socket: socket.socket = None
 device_comm_mode: Literal['W'] | Literal['V'] = None
 device_port: serial.Serial = None
 cfg2 = 0
+rx_buffer = bytearray(4096)
+tx_buffer = bytearray(4096)
+ltd_framers: dict[tuple[int, int], LtdFramer] = {}
+stream_clock: Clock = real_clock
 
 
 def vspi_connect() -> bool:
@@ -61,7 +79,7 @@ def write_test_error_packet():
 
 
 def write_error_packet_0x87(error_code: int):
-    ltd_driver: LtdDriver = ltd_driver_0x87
+    ltd_driver: LtdDriver = ltd_driver_lt_ch000
     error_codes = {
         0xF0: 'Low Liquid in the tank',
         0xF1: 'Stepper Motor Failed',
@@ -72,7 +90,7 @@ def write_error_packet_0x87(error_code: int):
     }
     if error_code in error_codes:
         print(f'Writing error msg "{error_codes[error_code]}"')
-    error_packet = ltd_driver.encode_packet(0, DRIVER_CONFIG_0x87[8].msg_type, error_code).ok
+    error_packet = ltd_driver.encode_packet(0, DRIVER_CONFIG_LT_CH000[8].msg_type, error_code).ok
     vspi_socket.send(error_packet)
 
 
@@ -92,139 +110,78 @@ def write_msg(_driver: LtdDriver, msg_type: int, msg_value: int):
         device_port.write(packet[3:])
 
 
-def stream_sine_waves_0x87():
-    ltd_driver: LtdDriver = ltd_driver_0x87
-    x = 0
-    while True:
-        _theta = 6 * math.pi * x / 100  # 3 Hz wave @ dt = 0.01
-        y_wght = math.sin(_theta) * 100
-        y_temp = 25 if y_wght >= 0 else 0
-        y_pres = y_wght / 10 if y_wght >= 0 else 0
-        packet_wght = ltd_driver.encode_packet(x, DRIVER_CONFIG_0x87[2].msg_type, y_wght).ok
-        packet_temp = ltd_driver.encode_packet(x, DRIVER_CONFIG_0x87[3].msg_type, y_temp).ok
-        packet_pres = ltd_driver.encode_packet(x, DRIVER_CONFIG_0x87[4].msg_type, y_pres).ok
-        vspi_socket.send(packet_wght)
-        vspi_socket.send(packet_temp)
-        vspi_socket.send(packet_pres)
-        x += 1
-        time.sleep(0.01)
-
-
-def stream_rand_waves_0x87():
-    ltd_driver: LtdDriver = ltd_driver_0x87
-    sn = 0
-    while True:
-        y_wght = random.uniform(1, 15)
-        y_temp = random.uniform(1, 10)
-        y_pres = random.uniform(1, 5)
-        packet_wght = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x87[2].msg_type, y_wght).ok
-        packet_temp = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x87[3].msg_type, y_temp).ok
-        packet_pres = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x87[4].msg_type, y_pres).ok
-        vspi_socket.send(packet_wght)
-        vspi_socket.send(packet_temp)
-        vspi_socket.send(packet_pres)
-        sn += 1
-        time.sleep(0.01)
-
-
-def stream_detr_waves_0x13():
-    ltd_driver: LtdDriver = ltd_driver_0x13
-    sn = 0
-    while True:
-        t1 = 1
-        t2 = 2
-        t_amb = 25
-        t_c = 4
-        t_h = t_amb + sn
-        packet_t1 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x13[0].msg_type, t1).ok
-        packet_t2 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x13[1].msg_type, t2).ok
-        packet_t_amb = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x13[2].msg_type, t_amb).ok
-        packet_t_c = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x13[3].msg_type, t_c).ok
-        packet_t_h = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x13[4].msg_type, t_h).ok
-        packet_p_h = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x13[5].msg_type, 0).ok
-        packet_p_p = ltd_driver.encode_packet(sn, DRIVER_CONFIG_0x13[6].msg_type, 0).ok
-        vspi_socket.send(packet_t1)
-        vspi_socket.send(packet_t2)
-        vspi_socket.send(packet_t_amb)
-        vspi_socket.send(packet_t_c)
-        vspi_socket.send(packet_t_h)
-        vspi_socket.send(packet_p_p)
-        vspi_socket.send(packet_p_h)
-        sn += 1
-        time.sleep(0.2)
-
-
-def stream_detr_waves_lt_to101():
-    ltd_driver: LtdDriver = ltd_driver_lt_to101
-    sn = 0
-    while True:
-        tc1 = 10
-        tc2 = 20
-        tc3 = 30
-        lvl = 4
-        pr1 = 15
-        pr2 = 25
-        pr3 = 35
-        packet_tc1 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_LT_TO101[0].msg_type, tc1).ok
-        packet_tc2 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_LT_TO101[1].msg_type, tc2).ok
-        packet_tc3 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_LT_TO101[2].msg_type, tc3).ok
-        packet_lvl = ltd_driver.encode_packet(sn, DRIVER_CONFIG_LT_TO101[3].msg_type, lvl).ok
-        packet_pr1 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_LT_TO101[4].msg_type, pr1).ok
-        packet_pr2 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_LT_TO101[5].msg_type, pr2).ok
-        packet_pr3 = ltd_driver.encode_packet(sn, DRIVER_CONFIG_LT_TO101[6].msg_type, pr3).ok
-        vspi_socket.send(packet_tc1)
-        vspi_socket.send(packet_tc2)
-        vspi_socket.send(packet_tc3)
-        vspi_socket.send(packet_lvl)
-        vspi_socket.send(packet_pr1)
-        vspi_socket.send(packet_pr2)
-        vspi_socket.send(packet_pr3)
-        sn += 1
-        time.sleep(0.2)
-
-
-def stream_detr_waves_lt_ht107():
-    ltd_driver: LtdDriver = ltd_driver_lt_ht107
-    sn = 0
-    while True:
-        sensors_reading = [(x - 1, x * 10) for x in range(1, 10)] + [(9, 75)]
-        for msg_type, msg_value in sensors_reading:
-            _packet = ltd_driver.encode_packet(sn, msg_type, msg_value).ok
-            vspi_socket.send(_packet)
-        time.sleep(0.2)
+def run_stream(ltd_driver: LtdDriver, rate_hz: float, msg_source, duration: float = None):
+    def write_items(items: list[tuple[int, int, int | float]]):
+        vspi_socket.sendall(ltd_driver.encode_many(items, tx_buffer).ok)
 
+    stream_scheduler = StreamScheduler(clock=stream_clock)
+    stream_scheduler.add_stream(f"LtdDriver-{ltd_driver.protocol_version}", rate_hz, msg_source, write_items)
+    stream_scheduler.run(duration)
+    print(stream_scheduler.stats())
 
-def stream_detr_waves_lt_ht113():
-    ltd_driver: LtdDriver = ltd_driver_lt_ht113
-    sn = 0
-    while True:
-        t_sam = 50
-        t_amb = 25
-        t_ref = 40
-        w_flw = 325 if math.sin(2 * math.pi * sn / 100) >= 0 else 0
-        packet_t_sam = ltd_driver.encode_packet(sn, 0, t_sam).ok
-        packet_t_amb = ltd_driver.encode_packet(sn, 1, t_amb).ok
-        packet_t_ref = ltd_driver.encode_packet(sn, 2, t_ref).ok
-        packet_w_flw = ltd_driver.encode_packet(sn, 3, w_flw).ok
-        vspi_socket.send(packet_t_sam)
-        vspi_socket.send(packet_t_amb)
-        vspi_socket.send(packet_t_ref)
-        vspi_socket.send(packet_w_flw)
-        sn += 1
-        time.sleep(0.2)
-
-
-def stream_lt_ht107_sample(mid_dt: list[int]):
-    ltd_driver: LtdDriver = ltd_driver_lt_ht107
+
+def use_virtual_clock(enabled: bool = True):
+    ''' streams with a duration run as fast as the host reads them instead of in wall clock time '''
+    global stream_clock
+    stream_clock = VirtualClock() if enabled else real_clock
+
+
+def stream_sine_waves_0x87(rate_hz: float = 100):
+    signal_engine = SignalEngine(rate_hz, [
+        (DRIVER_CONFIG_LT_CH000[2].msg_type, SineSource(100, 3)),
+        (DRIVER_CONFIG_LT_CH000[3].msg_type, SquareSource(25, 0, 3)),
+        (DRIVER_CONFIG_LT_CH000[4].msg_type, ClipSource(SineSource(10, 3), low=0)),
+    ])
+    run_stream(ltd_driver_lt_ch000, rate_hz, signal_engine.msg_source)
+
+
+def stream_rand_waves_0x87(rate_hz: float = 100):
+    signal_engine = SignalEngine(rate_hz, [
+        (DRIVER_CONFIG_LT_CH000[2].msg_type, NoiseSource(1, 15)),
+        (DRIVER_CONFIG_LT_CH000[3].msg_type, NoiseSource(1, 10)),
+        (DRIVER_CONFIG_LT_CH000[4].msg_type, NoiseSource(1, 5)),
+    ])
+    run_stream(ltd_driver_lt_ch000, rate_hz, signal_engine.msg_source)
+
+
+def stream_detr_waves_0x13(rate_hz: float = 5):
+    signal_engine = SignalEngine(rate_hz, [
+        (DRIVER_CONFIG_LT_HT103[0].msg_type, ConstSource(1)),
+        (DRIVER_CONFIG_LT_HT103[1].msg_type, ConstSource(2)),
+        (DRIVER_CONFIG_LT_HT103[2].msg_type, ConstSource(25)),
+        (DRIVER_CONFIG_LT_HT103[3].msg_type, ConstSource(4)),
+        (DRIVER_CONFIG_LT_HT103[4].msg_type, RampSource(25, rate_hz)),  # t_amb + sn
+        (DRIVER_CONFIG_LT_HT103[6].msg_type, ConstSource(0)),
+        (DRIVER_CONFIG_LT_HT103[5].msg_type, ConstSource(0)),
+    ])
+    run_stream(ltd_driver_lt_ht103, rate_hz, signal_engine.msg_source)
+
+
+def stream_detr_waves_lt_to101(rate_hz: float = 5):
+    signal_engine = SignalEngine(rate_hz, [(DRIVER_CONFIG_LT_TO101[idx].msg_type, ConstSource(value)) for idx, value in enumerate([10, 20, 30, 4, 15, 25, 35])])
+    run_stream(ltd_driver_lt_to101, rate_hz, signal_engine.msg_source)
+
+
+def stream_detr_waves_lt_ht107(rate_hz: float = 5):
+    signal_engine = SignalEngine(rate_hz, [(x - 1, ConstSource(x * 10)) for x in range(1, 10)] + [(9, ConstSource(75))])
+    run_stream(ltd_driver_lt_ht107, rate_hz, signal_engine.msg_source)
+
+
+def stream_detr_waves_lt_ht113(rate_hz: float = 5):
+    signal_engine = SignalEngine(rate_hz, [
+        (0, ConstSource(50)),
+        (1, ConstSource(25)),
+        (2, ConstSource(40)),
+        (3, SquareSource(325, 0, rate_hz / 100)),  # W_flw, 100 samples period
+    ])
+    run_stream(ltd_driver_lt_ht113, rate_hz, signal_engine.msg_source)
+
+
+def stream_lt_ht107_sample(mid_dt: list[int], rate_hz: float = 2):
     sample = [100, 100, 100] + [25, 25, 25] + [25, 25, 25]
     dt = [-1, -1, -1] + mid_dt + [1, 1, 1]
-    for sn in range(10):
-        sample_enum = list(enumerate(sample))
-        sample = [s + dt[idx] for idx, s in sample_enum]
-        for msg_type, msg_value in sample_enum:
-            _packet = ltd_driver.encode_packet(sn, msg_type, msg_value).ok
-            vspi_socket.send(_packet)
-        time.sleep(0.5)
+    signal_engine = SignalEngine(rate_hz, [(msg_type, RampSource(s, dt[msg_type] * rate_hz)) for msg_type, s in enumerate(sample)])
+    run_stream(ltd_driver_lt_ht107, rate_hz, signal_engine.msg_source, duration=10 / rate_hz)
 
 
 def switch_mode_lt_ht107(mode: int):
@@ -235,11 +192,14 @@ def switch_mode_lt_ht107(mode: int):
 
 def burst_lt_ht113_sample():
     ltd_driver: LtdDriver = ltd_driver_lt_ht113
-    vspi_socket.send(ltd_driver.encode_packet(0, 0, 11).ok)
-    vspi_socket.send(ltd_driver.encode_packet(0, 1, 22).ok)
-    vspi_socket.send(ltd_driver.encode_packet(0, 2, 33).ok)
-    vspi_socket.send(ltd_driver.encode_packet(0, 3, 44).ok)
-    vspi_socket.send(ltd_driver.encode_packet(0, 4, 1).ok)
+    burst = ltd_driver.encode_many([
+        (0, 0, 11),
+        (0, 1, 22),
+        (0, 2, 33),
+        (0, 3, 44),
+        (0, 4, 1),
+    ], tx_buffer).ok
+    vspi_socket.sendall(burst)
 
 
 def switch_mode_lt_ht113(mode: int):
@@ -257,29 +217,25 @@ def switch_mode_lt_to101(mode: int):
 
 def read_packet(_driver: LtdDriver, control_state_map: dict[int, int]):
     print(f"Listening for LtdDriver-{_driver.protocol_version} packet...")
-    packet = b''
-    while True:
-        try:
-            byte = vspi_socket.recv(1)
-        except BlockingIOError:
-            continue
+    ltd_framer = ltd_framers.get(tuple(_driver.protocol_version), None)
+    if not ltd_framer:
+        ltd_framer = LtdFramer(_driver.protocol_version)
+        ltd_framers[ltd_framer.protocol_version] = ltd_framer
 
-        packet += byte
-        if packet[-2:] == b'\r\n':
-            if packet[0] == _driver.protocol_version[0] and packet[1] == _driver.protocol_version[1]:
-                break
-            else:
-                print(f"Invalid LtdDriver-{_driver.protocol_version} packet")
-                packet = b''
-
-    device_msg_res = _driver.decode_packet(packet)
-    if device_msg_res.err:
-        print('Invalid LtdDriver packet')
+    try:
+        rx_size = vspi_socket.recv_into(rx_buffer)
+    except BlockingIOError:
         return
-    device_msg: DeviceMsg = device_msg_res.ok
-    if device_msg.config.msg_type in control_state_map:
-        vspi_socket.send(_driver.encode_packet(0, control_state_map[device_msg.config.msg_type], device_msg.msg_value).ok)
-    print(device_msg)
+
+    for packet in ltd_framer.feed(memoryview(rx_buffer)[:rx_size]):
+        device_msg_res = _driver.decode_packet(packet)
+        if device_msg_res.err:
+            print('Invalid LtdDriver packet')
+            continue
+        device_msg: DeviceMsg = device_msg_res.ok
+        if device_msg.config.msg_type in control_state_map:
+            vspi_socket.send(_driver.encode_packet(0, control_state_map[device_msg.config.msg_type], device_msg.msg_value).ok)
+        print(device_msg)
 
 
 def print_cli_funcs():
@@ -300,7 +256,7 @@ def print_func_src(func):
 
 def start_control_loop_0x87():
     while True:
-        read_packet(ltd_driver_0x87, {
+        read_packet(ltd_driver_lt_ch000, {
             12: 0,
             13: 1,
         })
@@ -308,7 +264,7 @@ def start_control_loop_0x87():
 
 def start_control_loop_0x13():
     while True:
-        read_packet(ltd_driver_0x13, {
+        read_packet(ltd_driver_lt_ht103, {
             12: 5,
             13: 6,
         })
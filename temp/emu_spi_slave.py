@@ -5,6 +5,7 @@ import code
 import readline
 from rlcompleter import Completer
 from test_drivers import *
+from e2e._vspi.ltd_driver import LtdFramer
 
 
 PORT_NAME = '/dev/ttyS90'
@@ -18,28 +19,36 @@ if not sp.is_open:
     sys.exit(1)
 print('Connecting to port:', (PORT_NAME, BAUD_RATE), '...OK')
 
+rx_buffer = bytearray(4096)
+rx_view = memoryview(rx_buffer)
+ltd_0x87_framer = LtdFramer(ltd_driver_lt_ch000.protocol_version)
+# bytes received after the last text msg, they start the next one
+text_pending = bytearray()
+
+
+def sp_read_chunk() -> memoryview:
+    rx_size = sp.readinto(rx_view[:max(1, min(sp.in_waiting, len(rx_buffer)))])
+    return rx_view[:rx_size]
+
 
 def text_listen():
     print('Listening for text msg...')
-    packet = b''
-    while True:
-        byte = sp.read()
-        packet += byte
-        if packet[-2:] == b'\r\n':
-            break
-    print('MSG:', packet.decode())
+    msg_end = text_pending.find(b'\r\n')
+    while msg_end == -1:
+        text_pending.extend(sp_read_chunk())
+        msg_end = text_pending.find(b'\r\n')
+    print('MSG:', text_pending[:msg_end + 2].decode())
+    del text_pending[:msg_end + 2]
 
 
 def ltd_0x87_packet_listen():
     print('Listening for LtdDriver_0x87 packet...')
-    packet = b''
     while True:
-        byte = sp.read()
-        packet += byte
-        if packet[-2:] == b'\r\n':
+        packet = next(ltd_0x87_framer.feed(sp_read_chunk()), None)
+        if packet:
             break
 
-    device_msg_res = ltd_driver_0x87.decode_packet(packet)
+    device_msg_res = ltd_driver_lt_ch000.decode_packet(packet)
     if device_msg_res.err:
         print('Invalid LtdDriver_0x87 packet')
         return
@@ -49,18 +58,14 @@ def ltd_0x87_packet_listen():
 
 def ltd_0x87_stream_listen():
     print('Listening for LtdDriver_0x87 stream...')
-    packet = b''
     while True:
-        byte = sp.read()
-        packet += byte
-        if packet[-2:] == b'\r\n':
-            device_msg_res = ltd_driver_0x87.decode_packet(packet)
+        for packet in ltd_0x87_framer.feed(sp_read_chunk()):
+            device_msg_res = ltd_driver_lt_ch000.decode_packet(packet)
             if device_msg_res.err:
                 print('Invalid LtdDriver_0x87 packet')
                 return
             device_msg: DeviceMsg = device_msg_res.ok
             print(device_msg)
-            packet = b''
 
 
 if __name__ == '__main__':